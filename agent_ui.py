@@ -2,9 +2,11 @@
 import os
 import sys
 import threading
+import queue
 
-# 1. GPU FIX (Ważne dla kart Intel/Windows)
-os.environ['KIVY_GL_BACKEND'] = 'angle_sdl2'
+# 1. GPU FIX (Ważne dla kart Intel/Windows); angle_sdl2 istnieje tylko na Windows
+if sys.platform == "win32":
+    os.environ['KIVY_GL_BACKEND'] = 'angle_sdl2'
 
 try:
     from kivy.config import Config
@@ -12,28 +14,21 @@ try:
     Config.set('graphics', 'height', '900')
     Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
 
+    # Tylko to, co potrzebne do pierwszej klatki; SDK Gemini, menu, toast i listy plików ładują się po niej
     from kivymd.app import MDApp
     from kivymd.uix.screen import MDScreen
     from kivymd.uix.boxlayout import MDBoxLayout
-    from kivymd.uix.card import MDCard
-    from kivymd.uix.list import OneLineIconListItem, IconLeftWidget, MDList
-    from kivymd.toast import toast
-    from kivymd.uix.menu import MDDropdownMenu
-    from kivymd.uix.button import MDIconButton, MDRaisedButton
-    from kivymd.uix.textfield import MDTextField
-    from kivymd.uix.label import MDLabel
-    from kivymd.uix.selectioncontrol import MDSwitch
-    from kivymd.uix.slider import MDSlider
     
     from kivy.core.window import Window
-    from kivy.core.clipboard import Clipboard
     from kivy.lang import Builder
     from kivy.clock import Clock
     from kivy.properties import StringProperty, ListProperty, BooleanProperty
     from kivy.metrics import dp
     
-    from dotenv import load_dotenv
-    from backend import GeminiBrain
+    from ui.deferred import Deferred, after_first_frame, warm_imports
+    from ui.markdown_render import escape
+    from ui.update_pump import UpdatePump
+    from ui.widgets.chat_list import ChatListView, RecycledRow
     
 except ImportError as e:
     print(f"CRITICAL ERROR - BRAKUJE BIBLIOTEK: {e}")
@@ -55,6 +50,8 @@ KV_UI = '''
         radius: [12]
         padding: dp(15)
         elevation: 0
+        size_hint_y: None
+        height: self.minimum_height
         
         MDLabel:
             text: root.text
@@ -72,8 +69,6 @@ KV_UI = '''
             text_color: (0.6, 0.6, 0.6, 1)
             icon_size: "16sp"
             pos_hint: {'right': 1}
-            size_hint: None, None
-            size: dp(20), dp(20)
             on_release: root.copy_content()
 
 <MainWindow>:
@@ -89,14 +84,14 @@ KV_UI = '''
             padding: dp(0)
             spacing: dp(0)
 
-            MDScrollView:
-                id: chat_scroll
-                effect_cls: "ScrollEffect"
-                
-                MDList:
-                    id: chat_list
-                    spacing: dp(20)
-                    padding: dp(20)
+            ChatListView:
+                id: chat_list
+                viewclass: 'ChatMessageBubble'
+                # Dymek: padding 5+5, karta 15+15, przycisk kopiowania 48; karta ma 85% szerokości
+                row_metrics: {'char_width': sp(7.4), 'line_height': sp(23), 'padding': dp(88), 'inset': dp(220)}
+                markdown: True
+                row_spacing: dp(20)
+                row_padding: [dp(20), dp(20), dp(20), dp(20)]
 
             # INPUT AREA
             MDCard:
@@ -129,6 +124,7 @@ KV_UI = '''
                         theme_text_color: "Custom"
                         text_color: (0, 0.8, 0, 1)
                         pos_hint: {'center_y': 0.5}
+                        disabled: app.is_streaming
                         on_release: app.send_message()
 
         # SEPARATOR
@@ -255,11 +251,13 @@ KV_UI = '''
 
 # --- LOGIKA APLIKACJI ---
 
-class ChatMessageBubble(MDBoxLayout):
+class ChatMessageBubble(RecycledRow, MDBoxLayout):
     text = StringProperty("")
     is_user = BooleanProperty(True)
     def copy_content(self):
-        Clipboard.copy(self.text)
+        from kivy.core.clipboard import Clipboard
+        from kivymd.toast import toast
+        Clipboard.copy(self.source or self.text)
         toast("Skopiowano!")
 
 class MainWindow(MDScreen):
@@ -268,20 +266,19 @@ class MainWindow(MDScreen):
 class DebugDruidApp(MDApp):
     dropped_files = ListProperty([])
     current_model = StringProperty("gemini-1.5-pro")
+    # Jedna odpowiedź naraz: dymek strumienia i chat_session są wspólne dla całej rozmowy
+    is_streaming = BooleanProperty(False)
+    streaming_index = None
+    pump_event = None
+    menu = None
 
     def build(self):
         self.title = "Agent 007 - Production Console"
         self.theme_cls.theme_style = "Dark"
         self.theme_cls.primary_palette = "Green"
         
-        load_dotenv()
-        try:
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                print("WARNING: Brak klucza API!")
-            self.brain = GeminiBrain(api_key=api_key)
-        except Exception as e:
-            print(f"Brain Error: {e}")
+        # Mózg (dotenv + backend + google.generativeai) buduje się w tle, dopiero po pierwszej klatce
+        self.brain_loader = Deferred(_load_brain, name="brain-loader")
 
         Window.bind(on_drop_file=self._on_file_drop)
         
@@ -291,28 +288,31 @@ class DebugDruidApp(MDApp):
         # --------------------
 
     def on_start(self):
-        # Menu Modeli
-        menu_items = [
-            {"text": "gemini-1.5-pro", "viewclass": "OneLineListItem", "on_release": lambda x="gemini-1.5-pro": self.set_model(x)},
-            {"text": "gemini-1.5-flash", "viewclass": "OneLineListItem", "on_release": lambda x="gemini-1.5-flash": self.set_model(x)},
-            {"text": "gemini-2.0-flash-exp", "viewclass": "OneLineListItem", "on_release": lambda x="gemini-2.0-flash-exp": self.set_model(x)},
-        ]
-        
-        if hasattr(self.root.ids, 'btn_model'):
-            self.menu = MDDropdownMenu(
-                caller=self.root.ids.btn_model, items=menu_items, width_mult=4
-            )
-            self.root.ids.chat_list.add_widget(
-                ChatMessageBubble(
-                    text="[color=#00ff00]SYSTEM ONLINE.[/color] Czekam na rozkazy.", 
-                    is_user=False
-                )
-            )
+        self.root.ids.chat_list.add_message(
+            "[color=#00ff00]SYSTEM ONLINE.[/color] Czekam na rozkazy.", is_user=False, formatted=True
+        )
+        after_first_frame(self._warm_up)
+
+    def _warm_up(self):
+        self.brain_loader.start()
+        warm_imports(WARM_WIDGET_MODULES)
 
     def open_model_menu(self):
+        if self.menu is None:
+            from kivymd.uix.menu import MDDropdownMenu
+            self.menu = MDDropdownMenu(
+                caller=self.root.ids.btn_model, items=self._menu_items(), width_mult=4
+            )
         self.menu.open()
 
+    def _menu_items(self):
+        return [
+            {"text": name, "viewclass": "OneLineListItem", "on_release": lambda x=name: self.set_model(x)}
+            for name in ("gemini-1.5-pro", "gemini-1.5-flash", "gemini-2.0-flash-exp")
+        ]
+
     def set_model(self, name):
+        from kivymd.toast import toast
         self.current_model = name
         self.root.ids.btn_model.text = name
         self.menu.dismiss()
@@ -322,6 +322,7 @@ class DebugDruidApp(MDApp):
         path_str = file_path.decode("utf-8")
         if path_str not in self.dropped_files:
             self.dropped_files.append(path_str)
+            from kivymd.uix.list import OneLineIconListItem, IconLeftWidget
             item = OneLineIconListItem(
                 text=os.path.basename(path_str),
                 theme_text_color="Custom",
@@ -332,14 +333,14 @@ class DebugDruidApp(MDApp):
             icon = IconLeftWidget(icon="file-document-outline", theme_text_color="Custom", text_color=(0,1,0,1))
             item.add_widget(icon)
             self.root.ids.file_list.add_widget(item)
-            self.root.ids.chat_list.add_widget(ChatMessageBubble(text=f"Dodano plik: {os.path.basename(path_str)}", is_user=True))
+            self.root.ids.chat_list.add_message(f"Dodano plik: `{os.path.basename(path_str)}`", is_user=True)
 
     def send_message(self):
         inp = self.root.ids.user_input
         txt = inp.text.strip()
-        if not txt: return
+        if not txt or self.is_streaming: return  # tekst zostaje w polu do wysłania po DONE
         
-        self.root.ids.chat_list.add_widget(ChatMessageBubble(text=txt, is_user=True))
+        self.root.ids.chat_list.add_message(txt, is_user=True)
         inp.text = ""
 
         settings = {
@@ -349,28 +350,84 @@ class DebugDruidApp(MDApp):
             'code': self.root.ids.switch_code.active,
             'temp': 1.0
         }
-        threading.Thread(target=self._brain_worker, args=(txt, settings, list(self.dropped_files))).start()
-
-    def _brain_worker(self, text, settings, files):
+        self.response_queue = queue.Queue()
+        self.streaming_index = None
+        self.is_streaming = True
+        threading.Thread(
+            target=self._brain_worker,
+            args=(txt, settings, list(self.dropped_files), self.response_queue),
+            daemon=True
+        ).start()
+        self.pump = UpdatePump(
+            self.response_queue,
+            on_text=self._append_to_stream,
+            on_error=self._stream_error,
+            on_done=self._on_stream_done,
+        )
+        if self.pump_event is not None:
+            self.pump_event.cancel()
+        self.pump_event = Clock.schedule_interval(self.pump.tick, 0)
+
+    def _brain_worker(self, text, settings, files, out_queue):
+        # Pierwsza wiadomość może wyprzedzić ładowanie w tle - czekamy tu, nie w wątku UI
+        brain = self.brain_loader.get()
+        if not brain:
+            reason = self.brain_loader.error
+            out_queue.put(("ERROR", f"Error: Backend offline. ({reason})" if reason else "Error: Backend offline."))
+            out_queue.put(("DONE", None))
+            return
         try:
-            if not self.brain:
-                response = "Error: Backend offline."
-            else:
-                self.brain.prepare_model(
-                    model_name=settings['model'],
-                    sys_instruct=settings['sys'],
-                    enable_search=settings['search'],
-                    enable_code=settings['code'],
-                    temp=settings['temp']
-                )
-                response = self.brain.send_query(text, files)
+            brain.prepare_model(
+                model_name=settings['model'],
+                sys_instruct=settings['sys'],
+                enable_search=settings['search'],
+                enable_code=settings['code'],
+                temp=settings['temp']
+            )
         except Exception as e:
-            response = f"Error: {e}"
-
-        Clock.schedule_once(lambda dt: self._update_chat(response))
+            out_queue.put(("ERROR", f"Error: {e}"))
+            out_queue.put(("DONE", None))
+            return
+        brain.worker_gemini_generator(text, out_queue, files)
+
+    def _on_stream_done(self):
+        if self.streaming_index is not None:
+            self.root.ids.chat_list.finish_message(self.streaming_index)
+        self.streaming_index = None
+        self.pump_event = None
+        self.is_streaming = False
+        self.root.ids.chat_list.flush_stale()
+
+    def _stream_error(self, content):
+        # Błąd jako osobny dymek z gotowym markupem - treść odpowiedzi idzie przez renderer Markdown
+        self._on_stream_done()
+        self.root.ids.chat_list.add_message(f"[color=#ff5555]{escape(content)}[/color]", is_user=False, formatted=True)
+
+    def _append_to_stream(self, text):
+        # Strumień żyje w modelu listy; widget dymka istnieje tylko gdy jest widoczny
+        chat_list = self.root.ids.chat_list
+        if self.streaming_index is None:
+            self.streaming_index = chat_list.add_message(text, is_user=False)
+        else:
+            chat_list.append_text(self.streaming_index, text)
+
+# Moduły widżetów spoza pierwszej klatki - importowane po jednym na klatkę, zanim użytkownik ich zażąda
+WARM_WIDGET_MODULES = ("kivymd.uix.menu", "kivymd.toast", "kivymd.uix.list")
+
+
+def _load_brain():
+    from dotenv import load_dotenv
+    from backend import GeminiBrain
 
-    def _update_chat(self, text):
-        self.root.ids.chat_list.add_widget(ChatMessageBubble(text=text, is_user=False))
+    load_dotenv()
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            print("WARNING: Brak klucza API!")
+        return GeminiBrain(api_key=api_key)
+    except Exception as e:
+        print(f"Brain Error: {e}")
+        raise  # Deferred zapamiętuje błąd - _brain_worker pokaże go w czacie
 
 if __name__ == "__main__":
     DebugDruidApp().run()
@@ -1,17 +1,37 @@
-import os
+from collections import OrderedDict
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
+from core.file_context import FileContextCache
+
+# Ustawienia bezpieczeństwa (mniej restrykcyjne dla developera)
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+}
+
 class GeminiBrain:
-    def __init__(self, api_key):
+    def __init__(self, api_key, max_cached_models=4):
         if not api_key:
             raise ValueError("Brak API KEY")
         genai.configure(api_key=api_key)
+        self.model = None
         self.chat_session = None
         self.uploaded_files = [] # Cache dla plików
+        self.file_cache = FileContextCache()
+        # (model_name, sys_instruct, tools, temp) -> {"model": ..., "chat": ...}
+        self.max_cached_models = max_cached_models
+        self._model_cache = OrderedDict()
+        self._active_key = None
 
     def prepare_model(self, model_name, sys_instruct, enable_search, enable_code, temp):
-        """Konfiguruje model z wybranymi narzędziami."""
+        """Zwraca model dla podanych ustawień - z cache, jeśli już był zbudowany.
+
+        Przy zmianie ustawień aktywna sesja czatu przechodzi na nowy model razem
+        z dotychczasową historią, więc zmiana faktycznie działa od następnej wiadomości.
+        """
         tools = []
         if enable_code:
             tools.append("code_execution")
@@ -20,62 +40,90 @@ class GeminiBrain:
             # Uwaga: Dostępność zależy od regionu/konta. Fallback jest bezpieczny.
             tools.append("google_search_retrieval")
 
+        key = (model_name, sys_instruct, tuple(tools), temp)
+        entry = self._model_cache.get(key)
+        if entry is None:
+            entry = {"model": self._build_model(model_name, sys_instruct, tools, temp), "chat": None}
+            self._model_cache[key] = entry
+            while len(self._model_cache) > self.max_cached_models:
+                self._model_cache.popitem(last=False)
+        else:
+            self._model_cache.move_to_end(key)
+
+        if key != self._active_key or entry["chat"] is None:
+            history = list(self.chat_session.history) if self.chat_session else []
+            entry["chat"] = entry["model"].start_chat(history=history)
+            self._active_key = key
+
+        self.model = entry["model"]
+        self.chat_session = entry["chat"]
+        return self.model
+
+    def _build_model(self, model_name, sys_instruct, tools, temp):
         # Konfiguracja generacji
         generation_config = genai.GenerationConfig(
             temperature=temp,
             max_output_tokens=8192,
         )
-
-        # Ustawienia bezpieczeństwa (mniej restrykcyjne dla developera)
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-        }
-
-        self.model = genai.GenerativeModel(
+        return genai.GenerativeModel(
             model_name=model_name,
             system_instruction=sys_instruct,
             tools=tools,
             generation_config=generation_config,
-            safety_settings=safety_settings
+            safety_settings=SAFETY_SETTINGS
         )
-        return self.model
 
     def start_chat(self, history=None):
         self.chat_session = self.model.start_chat(history=history or [])
+        if self._active_key in self._model_cache:
+            self._model_cache[self._active_key]["chat"] = self.chat_session
 
     def process_files(self, file_paths):
-        """Prosta obsługa kontekstu z plików tekstowych (Python, TXT, MD, JSON)."""
-        file_context = ""
-        for path in file_paths:
-            try:
-                # Sprawdzamy rozszerzenie - dla uproszczenia czytamy tekst
-                ext = os.path.splitext(path)[1].lower()
-                if ext in ['.py', '.txt', '.md', '.json', '.html', '.css', '.js', '.csv']:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        file_context += f"\n--- PLIK: {os.path.basename(path)} ---\n{content}\n"
-                else:
-                    file_context += f"\n[INFO] Plik {os.path.basename(path)} dołączony (tryb binarny pominięty w podglądzie).\n"
-            except Exception as e:
-                file_context += f"\n[ERROR] Nie udało się odczytać {os.path.basename(path)}: {e}\n"
-        return file_context
+        """Kontekst z plików tekstowych (Python, TXT, MD, JSON) - niezmienione pliki z cache."""
+        return self.file_cache.build_context(file_paths)
 
-    def send_query(self, user_text, file_paths=None):
-        if not self.chat_session:
-            self.start_chat()
-        
+    def build_prompt(self, user_text, file_paths=None):
         # Jeśli są pliki, doklejamy je do promptu (najbardziej niezawodna metoda dla kodu)
-        full_prompt = user_text
         if file_paths:
             context = self.process_files(file_paths)
             if context:
-                full_prompt = f"CONTEXT FILES:\n{context}\n\nUSER REQUEST:\n{user_text}"
+                return f"CONTEXT FILES:\n{context}\n\nUSER REQUEST:\n{user_text}"
+        return user_text
+
+    def send_query(self, user_text, file_paths=None):
+        if not self.chat_session:
+            self.start_chat()
+
+        full_prompt = self.build_prompt(user_text, file_paths)
 
         try:
             response = self.chat_session.send_message(full_prompt)
             return response.text
         except Exception as e:
-            return f"API ERROR: {str(e)}"
\ No newline at end of file
+            return f"API ERROR: {str(e)}"
+
+    def stream_query(self, user_text, file_paths=None):
+        """Generator fragmentów odpowiedzi - tekst trafia do UI zanim model skończy."""
+        if not self.chat_session:
+            self.start_chat()
+
+        full_prompt = self.build_prompt(user_text, file_paths)
+        response = self.chat_session.send_message(full_prompt, stream=True)
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Fragment bez tekstu (np. sam wynik narzędzia) - pomijamy
+                continue
+            if text:
+                yield text
+
+    def worker_gemini_generator(self, user_text, out_queue, file_paths=None):
+        """Wątek roboczy: wrzuca ("MSG_CHUNK", tekst) / ("ERROR", opis) i zawsze kończy ("DONE", None)."""
+        try:
+            for text in self.stream_query(user_text, file_paths):
+                out_queue.put(("MSG_CHUNK", text))
+        except Exception as e:
+            out_queue.put(("ERROR", f"API ERROR: {str(e)}"))
+        finally:
+            out_queue.put(("DONE", None))
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""Run the offline benchmark suite and compare it with a stored baseline.
+
+Examples::
+
+    python -m benchmarks --scale quick
+    python -m benchmarks --only detect db --output results.json
+    python -m benchmarks --save-baseline
+
+``benchmarks/baseline.json`` keeps one baseline per ``--scale`` and a run is
+compared with the one of its own scale. Exits with status 1 when a result is
+worse than that baseline by more than its tolerance, so the command can gate a
+CI job.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import sys
+
+from benchmarks.harness import (
+    DEFAULT_TOLERANCE,
+    SCALES,
+    SkipBenchmark,
+    compare,
+    for_scale,
+    load,
+    merge,
+    report,
+    save,
+    with_scale,
+)
+
+SUITES = {
+    "detect": "benchmarks.bench_architect",
+    "db": "benchmarks.bench_database",
+    "context": "benchmarks.bench_context",
+    "github": "benchmarks.bench_github",
+    "render": "benchmarks.bench_render",
+    "startup": "benchmarks.bench_startup",
+}
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline performance suite.")
+    parser.add_argument("--scale", choices=SCALES, default="default")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--output", help="write the JSON report here as well as printing it")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline for its scale; suites not run keep their stored results"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results, skipped = [], {}
+    for name in args.only:
+        print(f"[bench] {name} ({args.scale})...", file=sys.stderr)
+        try:
+            results.extend(importlib.import_module(SUITES[name]).suite(args.scale))
+        except SkipBenchmark as exc:
+            skipped[name] = str(exc)
+            print(f"[bench] {name} pominięty: {exc}", file=sys.stderr)
+
+    data = report(results, args.scale, skipped)
+    stored = load(args.baseline) if os.path.exists(args.baseline) else {}
+    baseline = for_scale(stored, args.scale)
+    if baseline and not args.save_baseline:
+        rows = compare(data, baseline, args.tolerance)
+    else:
+        rows = [{**row, "status": "new"} for row in data["results"]]
+    data["comparison"] = rows
+
+    if args.output:
+        save(args.output, data)
+    if args.save_baseline:
+        fresh = report(results, args.scale, skipped)
+        if baseline:
+            fresh = merge(baseline, fresh, args.only)
+        save(args.baseline, with_scale(stored, args.scale, fresh))
+        print(f"[bench] baseline zapisany ({args.scale}): {args.baseline}", file=sys.stderr)
+
+    _print_table(rows)
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+def _print_table(rows: list[dict]) -> None:
+    for row in rows:
+        change = "" if row.get("change") is None else f"{row['change']:+.1%}"
+        print(f"{row['name']:<40} {row['value']:>14,.3f} {row['unit']:<6} {change:>8}  {row['status']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
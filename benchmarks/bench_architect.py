@@ -0,0 +1,137 @@
+"""Benchmark for ``core.architect.detect_language`` marker scoring.
+
+Compares the shared, memoized marker counts with the previous loop that ran
+``str.count`` once per marker per language on synthetic pastes, then end-to-end detection with the full scan, the default bounded sample
+and a ``detection_cache`` hit::
+
+    python -m benchmarks.bench_architect
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from benchmarks.harness import Result, best_of_each, by_scale, ratio
+from core import architect
+
+# MB/s drifts up to ~1.7x between runs on a shared box (1 - 1/1.7 = 0.41, plus margin);
+# bounded_speedup keeps the default.
+TOLERANCE = 0.5
+SNIPPETS = (
+    "from fastapi import FastAPI\n\napp = FastAPI()\n\n@app.get('/')\nasync def index(self):\n    print('ok')\n",
+    "import React from 'react';\nexport default function App() {\n  const x = 1;\n  console.log(x);\n}\n",
+    "#include <iostream>\nint main() {\n  std::cout << \"hi\" << std::endl;\n  return 0;\n}\n",
+    "SELECT id, name FROM users WHERE active = 1;\nUPDATE users SET name = 'x' WHERE id = 2;\n",
+    "package main\n\nimport (\n  \"fmt\"\n)\n\nfunc main() {\n  fmt.Println(make([]int, 3))\n}\n",
+    "Zwykły tekst opisujący problem, bez kodu, z kilkoma zdaniami i liczbami 3.12 oraz 18.2.0.\n",
+)
+
+
+def make_sample(size: int) -> str:
+    chunk = "".join(SNIPPETS)
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def legacy_scores(sample: str) -> str | None:
+    """The previous behaviour: ``str.count`` per marker, per language and framework."""
+
+    best_language, best_score = "Plaintext", 0
+    for language, markers in architect._LOWER_KEYWORDS.items():
+        score = sum(sample.count(marker) for marker in markers)
+        if score > best_score:
+            best_language, best_score = language, score
+    frameworks = architect._LOWER_FRAMEWORK_MARKERS.get(best_language, {})
+    scores = {name: sum(sample.count(marker) for marker in markers) for name, markers in frameworks.items()}
+    return max(scores, key=scores.get, default=None)
+
+
+def current_scores(sample: str) -> str | None:
+    counts = architect._MarkerCounts(sample)
+    return architect._detect_framework(architect._detect_language(counts)[0], counts)
+
+
+def run(sizes: list[int], repeat: int = 5) -> list[dict]:
+    results = []
+    for size in sizes:
+        lowered = make_sample(size).lower()
+        number = max(1, 200_000 // size)
+        legacy = min(timeit.repeat(lambda: legacy_scores(lowered), number=number, repeat=repeat)) / number
+        current = min(timeit.repeat(lambda: current_scores(lowered), number=number, repeat=repeat)) / number
+        results.append({"size": size, "legacy_ms": legacy * 1000, "current_ms": current * 1000, "speedup": legacy / current})
+    return results
+
+
+def run_detect(sizes: list[int], repeat: int = 3) -> list[dict]:
+    results = []
+    for size in sizes:
+        sample = make_sample(size)
+        number = max(1, 200_000 // size)
+        budget = architect.DETECTION_BUDGET
+        full = min(timeit.repeat(lambda: architect._detect_bounded(sample, None), number=number, repeat=repeat)) / number
+        bounded = min(timeit.repeat(lambda: architect._detect_bounded(sample, budget), number=number, repeat=repeat)) / number
+        architect.detect_language(sample)
+        cached = min(timeit.repeat(lambda: architect.detect_language(sample), number=number, repeat=repeat)) / number
+        results.append(
+            {
+                "size": size,
+                "full_ms": full * 1000,
+                "bounded_ms": bounded * 1000,
+                "cached_ms": cached * 1000,
+                "speedup": full / bounded,
+            }
+        )
+    return results
+
+
+def suite(scale: str = "default") -> list[Result]:
+    """``detect_language`` throughput on generated corpora, cache bypassed."""
+
+    sizes = by_scale(
+        scale,
+        quick=[1_000, 10_000, 100_000, 1_000_000],
+        default=[1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+        full=[1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+    )
+    results = []
+    for size in sizes:
+        sample = make_sample(size)
+        repeat = 7 if size <= 100_000 else 3
+        seconds = best_of_each(
+            {
+                "bounded": lambda: architect.detect_language(sample, budget=architect.DETECTION_BUDGET),
+                "full": lambda: architect.detect_language(sample, budget=None),
+            },
+            repeat,
+            setup=architect.detection_cache.clear,
+        )
+        for mode in ("bounded", "full"):
+            results.append(
+                Result(f"detect.{mode}.{_label(size)}", round(size / seconds[mode] / 1e6, 3), "MB/s", better="higher", tolerance=TOLERANCE)
+            )
+        if size > architect.DETECTION_BUDGET:
+            results.append(ratio(f"detect.bounded_speedup.{_label(size)}", seconds["full"], seconds["bounded"]))
+    return results
+
+
+def _label(size: int) -> str:
+    return f"{size // 1_000_000}MB" if size >= 1_000_000 else f"{size // 1_000}KB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4_000, 64_000, 1_000_000])
+    args = parser.parse_args()
+    for row in run(args.sizes):
+        print(
+            f"{row['size']:>9} B  legacy {row['legacy_ms']:8.2f} ms  "
+            f"current {row['current_ms']:8.2f} ms  x{row['speedup']:.2f}"
+        )
+    for row in run_detect(args.sizes):
+        print(
+            f"{row['size']:>9} B  full scan {row['full_ms']:8.2f} ms  "
+            f"bounded {row['bounded_ms']:8.2f} ms  x{row['speedup']:.2f}  cached {row['cached_ms']:.4f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
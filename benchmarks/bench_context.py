@@ -0,0 +1,79 @@
+"""Attachment context assembly (``FileContextCache``) over a generated set.
+
+The set mixes many small sources, a few medium documents and one large log
+that goes through the excerpt path. ``cold`` builds from an empty cache per
+run, ``warm`` repeats the call on an unchanged set, ``serial`` renders every
+file with ``render_file_block`` on one thread and ``excerpt`` is the large log
+alone. ``GeminiBrain.process_files`` is a thin wrapper over the cache, so the
+Gemini SDK is not needed here.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from benchmarks.harness import Result, best_of, best_of_each, by_scale, ratio
+from core.file_context import FileContextCache, render_file_block
+
+# cold/warm/serial drift up to ~1.5x between runs (1 - 1/1.5 = 0.33, plus margin);
+# warm_speedup keeps the default.
+TOLERANCE = 0.4
+SOURCE_LINE = "def handler(request):  # obsługa żądania\n    return {'status': 'ok', 'items': list(range(10))}\n"
+LOG_LINE = "2024-05-01 12:00:00 INFO worker heartbeat ok\n"
+ERROR_LINE = "2024-05-01 12:00:01 ERROR Traceback (most recent call last): KeyError 'user'\n"
+
+
+def suite(scale: str = "default") -> list[Result]:
+    small, log_bytes = by_scale(scale, quick=[(20, 2_000_000)], default=[(50, 8_000_000)], full=[(200, 32_000_000)])[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _write_attachments(tmp, small, log_bytes)
+        total = sum(os.path.getsize(path) for path in paths)
+        warm_cache = FileContextCache()
+        warm_cache.build_context(paths)
+
+        def cold_run() -> None:
+            cache = FileContextCache()
+            try:
+                cache.build_context(paths)
+            finally:
+                cache.shutdown()
+
+        cold, warm = best_of_each({"cold": cold_run, "warm": lambda: warm_cache.build_context(paths)}).values()
+        serial = best_of(lambda: [render_file_block(path) for path in paths])
+        excerpt = best_of(lambda: render_file_block(paths[-1]))
+        warm_cache.shutdown()
+
+    label = f"{len(paths)}files"
+    return [
+        Result(f"context.cold.{label}", round(cold * 1000, 3), "ms", note=f"{total} B on disk", tolerance=TOLERANCE),
+        Result(f"context.warm.{label}", round(warm * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"context.serial.{label}", round(serial * 1000, 3), "ms", note="render_file_block, one thread, no cache", tolerance=TOLERANCE),
+        Result(f"context.excerpt.{_label(log_bytes)}", round(excerpt * 1000, 3), "ms", tolerance=TOLERANCE),
+        ratio(f"context.warm_speedup.{label}", cold, warm),
+    ]
+
+
+def _label(size: int) -> str:
+    return f"{size // 1_000_000}MB"
+
+
+def _write_attachments(root: str, small: int, log_bytes: int) -> list[str]:
+    paths = []
+    for index in range(small):
+        path = os.path.join(root, f"module_{index}.py")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(SOURCE_LINE * 400)
+        paths.append(path)
+    for index in range(3):
+        path = os.path.join(root, f"notes_{index}.md")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("# Notatki\n\n" + "Opis modułu i decyzji projektowych. " * 6_000)
+        paths.append(path)
+
+    log_path = os.path.join(root, "server.log")
+    with open(log_path, "w", encoding="utf-8") as handle:
+        block = LOG_LINE * 999 + ERROR_LINE
+        for _ in range(max(1, log_bytes // len(block))):
+            handle.write(block)
+    paths.append(log_path)
+    return paths
@@ -0,0 +1,109 @@
+"""``DatabaseManager`` insert and read rates at growing history sizes.
+
+Each size gets a fresh database in a temporary directory; messages are split
+over a handful of sessions so per-session reads see realistic interleaving.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from itertools import islice
+
+from benchmarks.harness import Result, best_of, best_of_each, by_scale, ratio
+from core.database import DatabaseManager
+
+# Rates and latencies drift up to 2x between runs (page cache, fsync): 1 - 1/2 plus margin.
+# The speedups are steadier.
+TOLERANCE = 0.55
+# Whole-session read over the first page swings up to ~1.4x even when interleaved.
+FIRST_PAGE_RATIO_TOLERANCE = 0.4
+SESSIONS = 8
+BROWSER_SESSIONS = 10_000
+BODY = "Jak naprawić wyjątek w FastAPI? Traceback pokazuje błąd w routerze i zależnościach. " * 3
+
+
+def suite(scale: str = "default") -> list[Result]:
+    sizes = by_scale(
+        scale,
+        quick=[1_000, 10_000],
+        default=[1_000, 10_000, 100_000],
+        full=[1_000, 10_000, 100_000, 1_000_000],
+    )
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.extend(_bench_size(os.path.join(tmp, "bench.db"), size))
+    with tempfile.TemporaryDirectory() as tmp:
+        results.extend(_bench_sessions(os.path.join(tmp, "sessions.db"), BROWSER_SESSIONS))
+    return results
+
+
+def _bench_sessions(path: str, count: int) -> list[Result]:
+    """Session browser: first and a deep page of ``count`` sessions vs. loading them all."""
+
+    db = DatabaseManager(path)
+    try:
+        for index in range(count):
+            session = db.create_session(f"sesja {index}")
+            if index % 10 == 0:
+                db.add_message(session, "user", BODY)
+        db.flush()
+        # różne znaczniki czasu; z CURRENT_TIMESTAMP tysiące sesji dzielą sekundę i koszt
+        # głębokiej strony zależy od tego, gdzie w tej grupie wypadnie kursor
+        with db._lock:
+            db.conn.execute("UPDATE sessions SET last_activity = datetime('2024-01-01', '+' || id || ' minutes')")
+            db.conn.commit()
+        middle = db.get_sessions_page(page_size=count // 2)[-1]
+        cursor = (middle["last_activity"], middle["id"])
+        seconds = best_of_each(
+            {
+                "first": lambda: db.get_sessions_page(page_size=50),
+                "deep": lambda: db.get_sessions_page(cursor, page_size=50),
+                "all": db.get_sessions,
+            }
+        )
+    finally:
+        db.close()
+    label = f"{count:.0e}".replace("+0", "").replace("+", "")
+    return [
+        Result(f"db.sessions_first_page.{label}", round(seconds["first"] * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"db.sessions_deep_page.{label}", round(seconds["deep"] * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"db.sessions_all.{label}", round(seconds["all"] * 1000, 3), "ms", note="get_sessions, for comparison", tolerance=TOLERANCE),
+        ratio(f"db.sessions_page_speedup.{label}", seconds["all"], seconds["deep"], note="get_sessions over the deep page"),
+    ]
+
+
+def _bench_size(path: str, size: int) -> list[Result]:
+    label = f"{size:.0e}".replace("+0", "").replace("+", "")
+    db = DatabaseManager(path)
+    try:
+        sessions = [db.create_session(f"bench {index}") for index in range(SESSIONS)]
+        start = time.perf_counter()
+        for index in range(size):
+            db.add_message(sessions[index % SESSIONS], "user" if index % 2 else "assistant", f"{index} {BODY}")
+        db.flush()
+        insert = time.perf_counter() - start
+
+        session = sessions[0]
+        per_session = size // SESSIONS
+        read, page = best_of_each(
+            {
+                "read": lambda: sum(1 for _ in db.iter_messages(session, page_size=500)),
+                "page": lambda: list(islice(db.iter_messages(session, page_size=100), 100)),
+            }
+        ).values()
+        context = best_of(lambda: db.get_context_messages(session))
+        search = best_of(lambda: db.search_messages("routerze", limit=20))
+        results = [
+            Result(f"db.insert.{label}", round(size / insert), "msg/s", better="higher", tolerance=TOLERANCE),
+            Result(f"db.read_session.{label}", round(per_session / read), "msg/s", better="higher", tolerance=TOLERANCE),
+            Result(f"db.first_page.{label}", round(page * 1000, 3), "ms", tolerance=TOLERANCE),
+            Result(f"db.context_window.{label}", round(context * 1000, 3), "ms", tolerance=TOLERANCE),
+            Result(f"db.search.{label}", round(search * 1000, 3), "ms", note="FTS5" if db.fts_enabled else "LIKE fallback", tolerance=TOLERANCE),
+        ]
+        if per_session >= 1_000:  # przy krótszej sesji pierwsza strona to prawie cała sesja
+            results.append(ratio(f"db.first_page_speedup.{label}", read, page, note="whole session over the first page", tolerance=FIRST_PAGE_RATIO_TOLERANCE))
+        return results
+    finally:
+        db.close()
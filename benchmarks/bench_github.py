@@ -0,0 +1,65 @@
+"""``GitHubFetcher`` pulls against the local stub server shared with the tests.
+
+The stub adds a small per-request delay to stand in for network latency, so
+the numbers reflect request count and concurrency rather than raw loopback
+speed.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from benchmarks.harness import Result, best_of, best_of_each, by_scale, ratio
+from core.github_cache import GitHubCache
+from core.github_client import GitHubFetcher
+from benchmarks.github_stub import StubGitHubServer
+
+REPOSITORY = "octocat/Hello-World"
+LATENCY = 0.005
+# The stub's fixed latency dominates, so these drift less than the CPU-bound suites
+# (up to 1.25x: 1 - 1/1.25 = 0.2, plus margin).
+TOLERANCE = 0.25
+
+
+def suite(scale: str = "default") -> list[Result]:
+    count = by_scale(scale, quick=[20], default=[60], full=[250])[0]
+    files = {
+        f"src/pkg{index % 5}/module_{index}.py": (f"# module {index}\n" + "value = compute(42)\n" * 400).encode("utf-8")
+        for index in range(count)
+    }
+    paths = list(files)
+    label = f"{count}files"
+
+    with StubGitHubServer(files, delay=LATENCY) as server, tempfile.TemporaryDirectory() as tmp:
+        def fetcher(cache: GitHubCache | None = None) -> GitHubFetcher:
+            return GitHubFetcher(api_url=server.url, cache=cache)
+
+        plain = fetcher()
+        cached = fetcher(GitHubCache(os.path.join(tmp, "cache")))
+        cached.fetch_files(REPOSITORY, paths)
+        cached.fetch_tree(REPOSITORY, ["src/**/*.py"])
+        contents, archive = best_of_each(
+            {
+                "contents": lambda: plain.fetch_files(REPOSITORY, paths),
+                "archive": lambda: plain.fetch_archive(REPOSITORY, ["src/**/*.py"]),
+            }
+        ).values()
+        tree, tree_cached = best_of_each(
+            {
+                "tree": lambda: plain.fetch_tree(REPOSITORY, ["src/**/*.py"]),
+                "tree_cached": lambda: cached.fetch_tree(REPOSITORY, ["src/**/*.py"]),
+            }
+        ).values()
+        revalidate = best_of(lambda: cached.fetch_files(REPOSITORY, paths))
+        plain.close()
+        cached.close()
+
+    return [
+        Result(f"github.contents.{label}", round(contents * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"github.contents_revalidate.{label}", round(revalidate * 1000, 3), "ms", note="304 from ETag cache", tolerance=TOLERANCE),
+        Result(f"github.tree.{label}", round(tree * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"github.tree_cached_blobs.{label}", round(tree_cached * 1000, 3), "ms", tolerance=TOLERANCE),
+        Result(f"github.archive.{label}", round(archive * 1000, 3), "ms", tolerance=TOLERANCE),
+        ratio(f"github.archive_speedup.{label}", contents, archive, note="contents API over one tarball"),
+        ratio(f"github.tree_cache_speedup.{label}", tree, tree_cached),
+    ]
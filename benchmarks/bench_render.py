@@ -0,0 +1,55 @@
+"""Streaming Markdown rendering: ``StreamRenderer`` versus re-rendering the whole message.
+
+A synthetic answer (paragraphs, lists and fenced code) is fed in small chunks,
+as the UI pump would deliver it. ``incremental`` keeps one renderer per
+message; ``full`` re-renders the accumulated text on every chunk with an empty
+block cache, i.e. what naive highlighting in the label would cost.
+"""
+from __future__ import annotations
+
+from benchmarks.harness import Result, best_of, best_of_each, by_scale, ratio
+from ui.markdown_render import StreamRenderer, render_cache, render_markdown
+
+PARAGRAPH = "Tekst z **pogrubieniem** i `kodem` oraz listą.\n- punkt jeden\n- punkt dwa\n\n"
+CODE = "```python\n" + "def handler(request):\n    return request.items[0] + 1  # komentarz\n" * 20 + "```\n\n"
+CHUNK = 20
+# Per-chunk times drift ~1.5x between runs (1 - 1/1.5 = 0.33, plus margin);
+# stream_speedup keeps the default.
+TOLERANCE = 0.4
+
+
+def make_answer(blocks: int) -> str:
+    return (PARAGRAPH * 3 + CODE) * blocks
+
+
+def suite(scale: str = "default") -> list[Result]:
+    results = []
+    for blocks in by_scale(scale, quick=[10], default=[10, 40], full=[10, 40, 160]):
+        answer = make_answer(blocks)
+        chunks = [answer[i:i + CHUNK] for i in range(0, len(answer), CHUNK)]
+
+        def incremental() -> None:
+            renderer = StreamRenderer()
+            for chunk in chunks:
+                renderer.feed(chunk)
+
+        def full() -> None:
+            text = ""
+            for chunk in chunks:
+                text += chunk
+                render_cache.clear()
+                render_markdown(text)
+
+        label = f"{len(answer) // 1000}KB"
+        if blocks > 10:
+            per_chunk = best_of(incremental) / len(chunks)
+            results.append(Result(f"render.stream_chunk.{label}", round(per_chunk * 1e6, 3), "us", tolerance=TOLERANCE))
+            continue
+        seconds = best_of_each({"stream": incremental, "full": full}, repeat=5)
+        per_chunk, full_chunk = seconds["stream"] / len(chunks), seconds["full"] / len(chunks)
+        results += [
+            Result(f"render.stream_chunk.{label}", round(per_chunk * 1e6, 3), "us", tolerance=TOLERANCE),
+            Result(f"render.full_chunk.{label}", round(full_chunk * 1e6, 3), "us", tolerance=TOLERANCE),
+            ratio(f"render.stream_speedup.{label}", full_chunk, per_chunk),
+        ]
+    return results
@@ -0,0 +1,155 @@
+"""Cold start of the desktop entry points: import cost and time to the first frame.
+
+Each entry script runs in a fresh interpreter, as a double-click would:
+
+* ``imports`` loads the script under ``-X importtime`` without starting the app and
+  sums the cumulative import time above a bare interpreter; the note lists heavy
+  modules (Gemini SDK, backend, SQLite layer) still imported on the critical path.
+* ``first_frame`` starts the app and stops it on the first ``Window.on_flip``.
+
+Needs Kivy/KivyMD and a display (on a headless Linux box ``SDL_VIDEODRIVER=offscreen``
+with Mesa works); the suite is skipped without Kivy, and an entry point that fails
+to start is skipped on its own. To see which imports dominate one entry point::
+
+    python -m benchmarks.bench_startup agent_ui
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import Result, SkipBenchmark, by_scale
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# nazwa -> (skrypt, klasa aplikacji)
+ENTRIES = {
+    "agent_ui": ("agent_ui.py", "DebugDruidApp"),
+    "main": ("main.py", "DebugDruidApp"),
+    "launcher_pro": ("launcher_pro — kopia.py", "DebugDruidUltimateApp"),
+}
+HEAVY = ("google.generativeai", "backend", "core.database", "kivymd.uix.menu")
+TIMEOUT = 120
+# świeży interpreter i kontekst GL przy każdym pomiarze - najbardziej rozchwiane wiersze
+TOLERANCE = 0.55  # do ~2.2x wolniej
+
+# Skrypt ładowany jako moduł zarejestrowany w sys.modules - App.load_kv szuka pliku klasy aplikacji
+_LOAD = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location('__bench__', {path!r})
+module = sys.modules['__bench__'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+"""
+_BARE = "import importlib.util, sys"
+_FIRST_FRAME = """
+import time
+start = time.perf_counter()
+""" + _LOAD + """
+from kivy.core.window import Window
+
+def _flip(*args):
+    Window.unbind(on_flip=_flip)
+    print('first_frame_ms=%.3f' % ((time.perf_counter() - start) * 1e3), flush=True)
+    app.stop()
+
+app = getattr(module, {app!r})()
+Window.bind(on_flip=_flip)
+app.run()
+"""
+
+
+def parse_importtime(text: str) -> list[tuple[int, str, int, int]]:
+    """``(depth, module, self_us, cumulative_us)`` rows from ``-X importtime`` stderr."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # nagłówek tabeli
+        name = parts[2].rstrip()[1:]
+        stripped = name.lstrip(" ")
+        rows.append(((len(name) - len(stripped)) // 2, stripped, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def total_import_us(rows: list[tuple[int, str, int, int]]) -> int:
+    return sum(cumulative for depth, _, _, cumulative in rows if depth == 0)
+
+
+def suite(scale: str = "default") -> list[Result]:
+    missing = [name for name in ("kivy", "kivymd") if importlib.util.find_spec(name) is None]
+    if missing:
+        raise SkipBenchmark(f"brak {', '.join(missing)}")
+    repeat = by_scale(scale, quick=[1], default=[3], full=[5])[0]
+    bare = min(total_import_us(_importtime(_BARE)) for _ in range(repeat))
+
+    results, failed = [], {}
+    for name, (script, app) in ENTRIES.items():
+        try:
+            results.extend(_entry(name, os.path.join(ROOT, script), app, repeat, bare))
+        except SkipBenchmark as exc:
+            failed[name] = str(exc)
+            print(f"[bench] startup.{name} pominięty: {exc}", file=sys.stderr)
+    if not results:
+        raise SkipBenchmark("; ".join(f"{name}: {reason}" for name, reason in failed.items()))
+    return results
+
+
+def _entry(name: str, path: str, app: str, repeat: int, bare: int) -> list[Result]:
+    runs = [_importtime(_LOAD.format(path=path)) for _ in range(repeat)]
+    eager = sorted({module for _, module, _, _ in runs[0] if module in HEAVY})
+    imports = min(total_import_us(rows) for rows in runs) - bare
+    note = f"eager: {', '.join(eager)}" if eager else None
+    results = [Result(f"startup.imports.{name}", round(imports / 1e3, 3), "ms", note=note, tolerance=TOLERANCE)]
+    try:
+        frame = min(_first_frame_ms(path, app) for _ in range(repeat))
+    except SkipBenchmark as exc:
+        # import da się zmierzyć nawet gdy okno nie wstaje
+        print(f"[bench] startup.first_frame.{name} pominięty: {exc}", file=sys.stderr)
+    else:
+        results.append(Result(f"startup.first_frame.{name}", round(frame, 3), "ms", tolerance=TOLERANCE))
+    return results
+
+
+def _env() -> dict:
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1", PYTHONPATH=ROOT)
+    # src.config kończy proces bez klucza; do pomiaru startu wystarczy atrapa
+    env.setdefault("GEMINI_API_KEY", "benchmark-placeholder-key")
+    return env
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    proc = subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=_env(), capture_output=True, text=True, timeout=TIMEOUT
+    )
+    if proc.returncode != 0:
+        tail = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        raise SkipBenchmark(f"start nieudany ({proc.returncode}): {tail}")
+    return proc
+
+
+def _importtime(code: str) -> list[tuple[int, str, int, int]]:
+    return parse_importtime(_run(["-X", "importtime", "-c", code]).stderr)
+
+
+def _first_frame_ms(path: str, app: str) -> float:
+    for line in _run(["-c", _FIRST_FRAME.format(path=path, app=app)]).stdout.splitlines():
+        if line.startswith("first_frame_ms="):
+            return float(line.split("=", 1)[1])
+    raise SkipBenchmark("brak pierwszej klatki (bez ekranu?)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    names = (argv if argv is not None else sys.argv[1:]) or list(ENTRIES)
+    for name in names:
+        rows = _importtime(_LOAD.format(path=os.path.join(ROOT, ENTRIES[name][0])))
+        print(f"{name}: {total_import_us(rows) / 1e3:,.1f} ms")
+        for _, module, _, cumulative in sorted(rows, key=lambda row: -row[3])[:20]:
+            print(f"  {cumulative / 1e3:>10,.1f} ms  {module}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Local stand-in for the GitHub API, shared by the GitHub client tests and benchmarks.
+
+Serves contents, trees, blobs and a tarball redirect for ``octocat/Hello-World``
+from an in-memory ``{path: bytes}`` map. ``faults`` queues canned responses,
+``delay`` simulates network latency and the counters record concurrency.
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import tarfile
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+COMMIT_SHA = "1234567890abcdef1234567890abcdef12345678"
+
+
+def git_blob_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class StubGitHubServer:
+    """Local stand-in for api.github.com serving ``/repos/<repo>/contents/<path>``."""
+
+    def __init__(self, files, delay=0.0, tar_extras=()):
+        self.files = dict(files)
+        self.delay = delay
+        self.tar_extras = list(tar_extras)
+        self.faults = []
+        self.extra_headers = {}
+        self.codeload_url = None  # inny origin dla pobierania archiwum (jak codeload.github.com)
+        self.requests = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append((self.path, self.headers))
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if stub.faults:
+                        status, headers, body = stub.faults.pop(0)
+                    else:
+                        status, headers, body = stub.respond(self)
+                        headers = {**headers, **stub.extra_headers}
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def tarball(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            root = tarfile.TarInfo("octocat-Hello-World-1234567")
+            root.type = tarfile.DIRTYPE
+            archive.addfile(root)
+            for name, body in list(self.files.items()) + self.tar_extras:
+                info = tarfile.TarInfo(f"octocat-Hello-World-1234567/{name}")
+                info.size = len(body)
+                archive.addfile(info, io.BytesIO(body))
+            link = tarfile.TarInfo("octocat-Hello-World-1234567/link.py")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "/etc/passwd"
+            archive.addfile(link)
+        return gzip.compress(buffer.getvalue())
+
+    def respond(self, handler):
+        path = unquote(urlsplit(handler.path).path)
+        repo_prefix = "/repos/octocat/Hello-World"
+        if path.startswith(repo_prefix + "/tarball/"):
+            ref = path.rsplit("/", 1)[1]
+            return 302, {"Location": f"{self.codeload_url or self.url}/codeload/octocat/Hello-World/tar.gz/{ref}"}, b""
+        if path.startswith("/codeload/octocat/Hello-World/tar.gz/"):
+            return 200, {"Content-Type": "application/x-gzip"}, self.tarball()
+        if path.startswith(repo_prefix + "/commits/"):
+            return 200, {"Content-Type": "application/vnd.github.sha"}, COMMIT_SHA.encode("ascii")
+        if path == f"{repo_prefix}/git/trees/{COMMIT_SHA}":
+            tree = [{"path": name, "type": "blob", "sha": git_blob_sha(body), "size": len(body)} for name, body in self.files.items()]
+            tree.append({"path": "src", "type": "tree", "sha": "0" * 40})
+            return 200, {"Content-Type": "application/json"}, json.dumps({"sha": COMMIT_SHA, "tree": tree, "truncated": False}).encode()
+        if path.startswith(repo_prefix + "/git/blobs/"):
+            wanted = path.rsplit("/", 1)[1]
+            for body in self.files.values():
+                if git_blob_sha(body) == wanted:
+                    payload = {"content": base64.encodebytes(body).decode("ascii"), "encoding": "base64", "size": len(body), "sha": wanted}
+                    return 200, {"Content-Type": "application/json"}, json.dumps(payload).encode()
+        prefix = "/repos/octocat/Hello-World/contents/"
+        if path.startswith(prefix) and path[len(prefix):] in self.files:
+            content = self.files[path[len(prefix):]]
+            sha = git_blob_sha(content)
+            etag = f'"{sha}"'
+            if handler.headers.get("If-None-Match") == etag:
+                return 304, {"ETag": etag}, b""
+            payload = {
+                "content": base64.encodebytes(content).decode("ascii"),
+                "encoding": "base64",
+                "size": len(content),
+                "sha": sha,
+            }
+            return 200, {"Content-Type": "application/json", "ETag": etag}, json.dumps(payload).encode("utf-8")
+        return 404, {"Content-Type": "application/json"}, b'{"message": "Not Found"}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,201 @@
+"""Shared timing, result and baseline helpers for the offline benchmark suite."""
+from __future__ import annotations
+
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+SCALES = ("quick", "default", "full")
+DEFAULT_TOLERANCE = 0.25
+# Shortest measured time per best_of sample; shorter calls are repeated within the sample.
+MIN_SAMPLE_TIME = 0.1
+
+
+class SkipBenchmark(Exception):
+    """Raised by a suite that cannot run here, e.g. when an optional dependency is missing."""
+
+
+@dataclass
+class Result:
+    """One measurement; ``better`` says which direction is an improvement."""
+
+    name: str
+    value: float
+    unit: str
+    better: str = "lower"
+    note: str | None = None
+    tolerance: float | None = None  # replaces --tolerance for this row; 1 - 1/s allows an s-fold swing
+
+
+def ratio(name: str, slow: float, fast: float, note: str | None = None, tolerance: float | None = None) -> Result:
+    """``slow / fast`` measured in the same run, e.g. full re-render over incremental.
+
+    Both sides see the same machine load, so the ratio stays put when the box as
+    a whole gets faster or slower between runs and can be gated tightly.
+    """
+
+    return Result(name, round(slow / fast, 3), "x", better="higher", note=note, tolerance=tolerance)
+
+
+def best_of(
+    func: Callable[[], object],
+    repeat: int = 7,
+    setup: Callable[[], object] | None = None,
+    min_time: float = MIN_SAMPLE_TIME,
+) -> float:
+    """Fastest per-call wall-clock time over ``repeat`` samples, in seconds.
+
+    A sample keeps calling ``func`` until at least ``min_time`` seconds have been
+    measured, so sub-millisecond calls are averaged over many runs instead of
+    being one timer tick and a scheduler hiccup. ``setup`` runs before every
+    call and is not timed.
+    """
+
+    return min(_sample(func, setup, min_time) for _ in range(max(1, repeat)))
+
+
+def best_of_each(
+    funcs: dict[str, Callable[[], object]],
+    repeat: int = 7,
+    setup: Callable[[], object] | None = None,
+    min_time: float = MIN_SAMPLE_TIME,
+) -> dict[str, float]:
+    """:func:`best_of` for several functions with their samples interleaved.
+
+    Sides of a :func:`ratio` measured this way share the same stretches of
+    machine load instead of one running while the box is busy and the other
+    while it is idle.
+    """
+
+    best = dict.fromkeys(funcs, float("inf"))
+    for _ in range(max(1, repeat)):
+        for name, func in funcs.items():
+            best[name] = min(best[name], _sample(func, setup, min_time))
+    return best
+
+
+def _sample(func: Callable[[], object], setup: Callable[[], object] | None, min_time: float) -> float:
+    elapsed, calls = 0.0, 0
+    while not calls or elapsed < min_time:
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+        calls += 1
+    return elapsed / calls
+
+
+def by_scale(scale: str, quick: Iterable, default: Iterable, full: Iterable) -> list:
+    return list({"quick": quick, "default": default, "full": full}[scale])
+
+
+def report(results: list[Result], scale: str, skipped: dict[str, str] | None = None) -> dict:
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "scale": scale,
+            "skipped": skipped or {},
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """Compare two reports by result name.
+
+    Each row carries ``change`` as the relative improvement (positive is
+    better regardless of unit direction) and a ``status`` of ``ok``,
+    ``improved``, ``regression`` or ``new``. A row's own ``tolerance`` wins over
+    the ``tolerance`` argument. ``change`` never drops below -1 (a slowdown of
+    ``s`` times is ``1/s - 1``), so a tolerance must stay under 1 to be able to
+    fail; use ``1 - 1/s`` to allow swings of up to ``s`` times.
+
+    Results missing from the current run are ignored and results missing from
+    the baseline come back as ``new``. Compare runs of the same scale: row names
+    carry workload sizes, and those differ between scales.
+    """
+
+    previous = {row["name"]: row for row in baseline.get("results", [])}
+    rows = []
+    for row in current.get("results", []):
+        old = previous.get(row["name"])
+        if old is None or not old["value"] or not row["value"]:
+            rows.append({**row, "baseline": None, "change": None, "status": "new"})
+            continue
+        if row.get("better", "lower") == "lower":
+            change = old["value"] / row["value"] - 1
+        else:
+            change = row["value"] / old["value"] - 1
+        allowed = tolerance if row.get("tolerance") is None else row["tolerance"]
+        if not 0 <= allowed < 1:
+            raise ValueError(f"{row['name']}: tolerance {allowed} must be in [0, 1) or no slowdown can fail")
+        if change < -allowed:
+            status = "regression"
+        elif change > allowed:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({**row, "baseline": old["value"], "change": round(change, 4), "status": status})
+    return rows
+
+
+def merge(previous: dict, current: dict, suites: Iterable[str]) -> dict:
+    """``current`` plus the rows of every suite it did not measure, carried over from ``previous``.
+
+    Result names start with their suite key (``db.insert.1e3`` belongs to ``db``),
+    so re-running a few suites replaces only their rows. A suite skipped in this
+    run keeps its old rows; it is listed as skipped only if it has none.
+    """
+
+    skipped_now = current["meta"].get("skipped", {})
+    measured = set(suites) - set(skipped_now)
+    kept = [row for row in previous.get("results", []) if _suite_of(row) not in measured]
+    with_rows = {_suite_of(row) for row in kept}
+    skipped = {
+        name: reason
+        for name, reason in {**previous.get("meta", {}).get("skipped", {}), **skipped_now}.items()
+        if name not in measured and name not in with_rows
+    }
+    return {**current, "meta": {**current["meta"], "skipped": skipped}, "results": kept + current["results"]}
+
+
+def for_scale(stored: dict, scale: str) -> dict | None:
+    """The report stored for ``scale`` in a baseline file, or ``None``.
+
+    A baseline file keeps one report per scale under ``scales``; a file holding
+    a single report (the older layout) counts for the scale in its ``meta``.
+    """
+
+    if "scales" in stored:
+        return stored["scales"].get(scale)
+    return stored if stored.get("meta", {}).get("scale") == scale else None
+
+
+def with_scale(stored: dict, scale: str, data: dict) -> dict:
+    """``stored`` with the report for ``scale`` replaced by ``data``."""
+
+    scales = {name: for_scale(stored, name) for name in SCALES}
+    scales[scale] = data
+    return {"scales": {name: report for name, report in scales.items() if report is not None}}
+
+
+def _suite_of(row: dict) -> str:
+    return row["name"].split(".", 1)[0]
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def save(path: str, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2, ensure_ascii=False)
+        handle.write("\n")
@@ -2,17 +2,34 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Iterable, Mapping
 
+# Inputs longer than this many characters are detected from a bounded excerpt.
+DETECTION_BUDGET = 64_000
+SAMPLE_WINDOWS = 8
+# Sampled results below this confidence are re-checked with a full scan.
+MIN_SAMPLED_CONFIDENCE = 0.6
+DETECTION_CACHE_SIZE = 1024
+
 
 @dataclass(frozen=True)
 class DetectionResult:
-    """Structured outcome of the lightweight detector."""
+    """Structured outcome of the lightweight detector.
+
+    ``confidence`` is the winning language's share of the evidence against the
+    runner-up (0.5 is a tie, close to 1.0 is clear-cut); ``sampled`` tells
+    whether only a bounded excerpt of the input was inspected. Neither takes
+    part in equality.
+    """
 
     language: str
     framework: str | None = None
     version: str | None = None
+    confidence: float | None = field(default=None, compare=False)
+    sampled: bool = field(default=False, compare=False)
 
     def formatted(self) -> str:
         parts: list[str] = [self.language]
@@ -23,6 +40,21 @@ class DetectionResult:
         return ", ".join(parts)
 
 
+@dataclass(frozen=True)
+class CodeBlock:
+    """One fenced block of a message; ``info`` is the fence's language tag, if any."""
+
+    index: int
+    code: str
+    info: str | None = None
+
+
+@dataclass(frozen=True)
+class BlockDetection:
+    block: CodeBlock
+    detection: DetectionResult
+
+
 _KEYWORDS: Mapping[str, tuple[str, ...]] = {
     "Python": ("def ", "import ", "from ", "async def", "self", "print("),
     "JavaScript": ("function ", "export ", "export default", "const ", "let ", "=>", "console.log"),
@@ -84,6 +116,28 @@ _LOWER_FRAMEWORK_MARKERS: Mapping[str, Mapping[str, tuple[str, ...]]] = {
     for language, frameworks in _FRAMEWORK_MARKERS.items()
 }
 
+_ALL_MARKERS: tuple[str, ...] = tuple(
+    dict.fromkeys(
+        [marker for markers in _LOWER_KEYWORDS.values() for marker in markers]
+        + [
+            marker
+            for frameworks in _LOWER_FRAMEWORK_MARKERS.values()
+            for markers in frameworks.values()
+            for marker in markers
+        ]
+    )
+)
+# A marker can only occur where every marker it contains occurs ("std::" needs "::").
+_CONTAINED_MARKERS: Mapping[str, tuple[str, ...]] = {
+    marker: tuple(inner for inner in _ALL_MARKERS if inner != marker and inner in marker)
+    for marker in _ALL_MARKERS
+}
+# Every language marker once, shortest first so contained markers are counted before their containers.
+_LANGUAGE_MARKER_PLAN: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+    (marker, _CONTAINED_MARKERS[marker])
+    for marker in sorted(dict.fromkeys(m for markers in _LOWER_KEYWORDS.values() for m in markers), key=len)
+)
+
 _VERSION_HINTS: Mapping[str, tuple[str, ...]] = {
     "Python": ("python", "py"),
     "JavaScript": ("node", "deno", "react", "next"),
@@ -95,37 +149,178 @@ _VERSION_HINTS: Mapping[str, tuple[str, ...]] = {
     "Rust": ("rust", "actix", "rocket"),
 }
 
+# Opening ``` or ~~~ fence, optional info string, body, and a matching close (or end of text).
+_FENCE_PATTERN = re.compile(
+    r"^(?P<fence>`{3,}|~{3,})[ \t]*(?P<info>[^\n`]*)\n(?P<code>.*?)(?:^(?P=fence)[ \t]*$|\Z)",
+    re.MULTILINE | re.DOTALL,
+)
 _SEMVER_PATTERN = re.compile(r"\b(\d+\.\d+(?:\.\d+)?)\b")
 _VERSION_PATTERN_CACHE: dict[str, re.Pattern[str]] = {}
 
 
-def detect_language(sample: str) -> DetectionResult:
+class DetectionCache:
+    """Bounded LRU of detection results keyed by ``(len, hash, budget)`` of a sample.
+
+    ``hash`` of a ``str`` is computed once and then cached on the object, so
+    replayed history and re-attached files cost a dictionary lookup; only the
+    small results are kept, never the samples themselves.
+    """
+
+    def __init__(self, max_entries: int = DETECTION_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[int, int, int | None], DetectionResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[int, int, int | None]) -> DetectionResult | None:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple[int, int, int | None], result: DetectionResult) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def info(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+detection_cache = DetectionCache()
+
+
+def detect_language(sample: str, budget: int | None = DETECTION_BUDGET) -> DetectionResult:
     """Best-effort heuristic language, framework, and version detection.
 
     The helper prefers clear keyword matches and falls back to "Plaintext".
     This avoids external dependencies while giving architect-mode responses a
     consistent AUTO-DETEKCJA preface with richer context when possible.
+
+    Inputs longer than ``budget`` characters are judged from their head, tail
+    and evenly spaced windows only, so latency does not grow with the paste;
+    when that sample is ambiguous the whole input is scanned after all.
+    ``budget=None`` always scans everything. Results are memoized in
+    :data:`detection_cache`.
     """
 
+    key = (len(sample), hash(sample), budget)
+    result = detection_cache.get(key)
+    if result is None:
+        result = _detect_bounded(sample, budget)
+        detection_cache.put(key, result)
+    return result
+
+
+def _detect_bounded(sample: str, budget: int | None) -> DetectionResult:
+    if budget is None or len(sample) <= budget:
+        return _detect(sample)
+    result = _detect(_bounded_excerpt(sample, budget), sampled=True)
+    if result.language != "Plaintext" and result.confidence < MIN_SAMPLED_CONFIDENCE:
+        return _detect(sample)
+    return result
+
+
+def _detect(sample: str, sampled: bool = False) -> DetectionResult:
     lowered = sample.lower()
-    language = _detect_language(lowered)
-    framework = _detect_framework(language, lowered)
+    counts = _MarkerCounts(lowered)
+    language, confidence = _detect_language(counts)
+    framework = _detect_framework(language, counts)
     version = _detect_version(language, framework, lowered)
-    return DetectionResult(language=language, framework=framework, version=version)
+    return DetectionResult(
+        language=language,
+        framework=framework,
+        version=version,
+        confidence=confidence,
+        sampled=sampled,
+    )
 
 
-def _detect_language(sample: str) -> str:
+def _bounded_excerpt(sample: str, budget: int) -> str:
+    """Head, tail and ``SAMPLE_WINDOWS`` evenly spaced windows, ``budget`` chars in total.
+
+    Windows are joined with newlines, which no marker contains, so the seams
+    cannot produce matches of their own.
+    """
+
+    edge = budget // 4
+    window = (budget - 2 * edge) // SAMPLE_WINDOWS
+    middle_start, middle_end = edge, len(sample) - edge
+    stride = (middle_end - middle_start) / SAMPLE_WINDOWS
+    parts = [sample[:edge]]
+    for index in range(SAMPLE_WINDOWS):
+        start = middle_start + int(index * stride + (stride - window) / 2)
+        parts.append(sample[start : start + window])
+    parts.append(sample[middle_end:])
+    return "\n".join(parts)
+
+
+class _MarkerCounts(dict):
+    """``str.count`` of each marker in one sample, shared by all scoring steps.
+
+    Language markers are counted up front, once each even when several
+    languages list them ("implements", "def "); framework markers are counted
+    on first use. A marker is skipped outright when a marker it contains is
+    already known to be absent.
+    """
+
+    def __init__(self, sample: str) -> None:
+        super().__init__()
+        self.sample = sample
+        count = sample.count
+        for marker, contained in _LANGUAGE_MARKER_PLAN:
+            if contained and not all(self[inner] for inner in contained):
+                self[marker] = 0
+            else:
+                self[marker] = count(marker)
+
+    def __missing__(self, marker: str) -> int:
+        if any(self[inner] == 0 for inner in _CONTAINED_MARKERS.get(marker, ())):
+            count = 0
+        else:
+            count = self.sample.count(marker)
+        self[marker] = count
+        return count
+
+
+def _detect_language(counts: Mapping[str, int]) -> tuple[str, float]:
     best_language = "Plaintext"
     best_score = 0
+    runner_up = 0
     for language, markers in _LOWER_KEYWORDS.items():
-        score = _match_score(sample, markers)
+        score = _match_score(counts, markers)
         if score > best_score:
+            runner_up = best_score
             best_score = score
             best_language = language
-    return best_language
+        elif score > runner_up:
+            runner_up = score
+    return best_language, _confidence(best_score, runner_up)
+
 
+def _confidence(best: int, runner_up: int) -> float:
+    """Share of the evidence held by the winner, smoothed so one stray hit stays unsure."""
 
-def _detect_framework(language: str, sample: str) -> str | None:
+    if not best:
+        return 1.0  # nothing code-like at all: confidently plain text
+    return round(best / (best + runner_up + 1), 3)
+
+
+def _detect_framework(language: str, counts: Mapping[str, int]) -> str | None:
     frameworks = _LOWER_FRAMEWORK_MARKERS.get(language)
     if not frameworks:
         return None
@@ -133,7 +328,7 @@ def _detect_framework(language: str, sample: str) -> str | None:
     best_framework: str | None = None
     best_score = 0
     for framework, markers in frameworks.items():
-        score = _match_score(sample, markers)
+        score = _match_score(counts, markers)
         if score > best_score:
             best_score = score
             best_framework = framework
@@ -166,16 +361,53 @@ def _search_version(sample: str, name: str) -> str | None:
     return match.group(1) if match else None
 
 
-def _match_score(sample: str, markers: Iterable[str]) -> int:
-    return sum(sample.count(marker) for marker in markers)
+def _match_score(counts: Mapping[str, int], markers: Iterable[str]) -> int:
+    return sum(counts[marker] for marker in markers)
+
+
+def split_code_blocks(message: str) -> list[CodeBlock]:
+    """Split ``message`` into its fenced code blocks.
+
+    A message without fences is treated as a single block, so plain pasted
+    code keeps working.
+    """
+
+    blocks = [
+        CodeBlock(index=index, code=match.group("code"), info=match.group("info").strip() or None)
+        for index, match in enumerate(_FENCE_PATTERN.finditer(message))
+    ]
+    return blocks or [CodeBlock(index=0, code=message)]
+
+
+def detect_blocks(message: str) -> list[BlockDetection]:
+    """Detect the language of every fenced block of ``message`` independently.
+
+    Results come from :data:`detection_cache`, so re-rendering a
+    conversation only pays for blocks that changed.
+    """
+
+    return [BlockDetection(block, detect_language(block.code)) for block in split_code_blocks(message)]
 
 
 def build_architect_response(code: str) -> str:
-    """Render the architect-mode template populated with auto-detection."""
+    """Render the architect-mode template populated with auto-detection.
+
+    When ``code`` contains fenced blocks, each one is listed with its own
+    detection and confidence under the overall AUTO-DETEKCJA line.
+    """
 
     detection = detect_language(code)
+    blocks = detect_blocks(code) if _FENCE_PATTERN.search(code) else []
+    per_block = "".join(
+        f"- blok {item.block.index + 1}"
+        + (f" ({item.block.info})" if item.block.info else "")
+        + f": {item.detection.formatted()} (pewność {item.detection.confidence:.0%})\n"
+        for item in blocks
+    )
     return (
-        f"AUTO-DETEKCJA: {detection.formatted()}\n\n"
+        f"AUTO-DETEKCJA: {detection.formatted()}\n"
+        + per_block
+        + "\n"
         "DIAGNOZA:\n"
         "- 🐛 ...\n"
         "- 🛡️ ...\n"
@@ -0,0 +1,99 @@
+"""Token-budgeted chat context selection."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, Mapping
+
+DEFAULT_CONTEXT_TOKENS = 8_000
+# Below this many free tokens a trimmed fragment is more noise than context.
+MIN_FRAGMENT_TOKENS = 64
+TRIM_MARKER = "\n[...]\n"
+_CHARS_PER_TOKEN = 4
+_MARKER_TOKENS = -(-len(TRIM_MARKER) // _CHARS_PER_TOKEN)
+
+
+@dataclass
+class ContextWindow:
+    """Messages selected for a request, oldest first."""
+
+    messages: list[dict] = field(default_factory=list)
+    total_tokens: int = 0
+    trimmed: int = 0
+    truncated: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token).
+
+    Good enough for budgeting without shipping a tokenizer; it errs on the
+    generous side for prose and is close for code.
+    """
+
+    if not text:
+        return 0
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of ``text`` so it fits ``max_tokens``.
+
+    Returns ``""`` when ``max_tokens`` cannot even hold :data:`TRIM_MARKER`.
+    """
+
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens < _MARKER_TOKENS:
+        return ""
+    keep = max(0, max_tokens * _CHARS_PER_TOKEN - len(TRIM_MARKER))
+    head = keep * 3 // 5
+    tail = keep - head
+    return text[:head] + TRIM_MARKER + (text[-tail:] if tail else "")
+
+
+def build_context_window(
+    newest_first: Iterable[Mapping],
+    token_budget: int = DEFAULT_CONTEXT_TOKENS,
+    max_message_tokens: int | None = None,
+) -> ContextWindow:
+    """Select the newest messages that fit ``token_budget``.
+
+    ``newest_first`` yields mappings with ``role`` and ``content`` and,
+    optionally, a cached ``token_count``; it is consumed lazily and iteration
+    stops as soon as the budget is spent. Each message is capped at
+    ``max_message_tokens`` (half the budget by default) and the oldest message
+    that only partly fits is trimmed rather than dropped.
+    """
+
+    if max_message_tokens is None:
+        max_message_tokens = max(MIN_FRAGMENT_TOKENS, token_budget // 2)
+
+    window = ContextWindow()
+    selected: list[dict] = []
+    remaining = token_budget
+    for message in newest_first:
+        if remaining < MIN_FRAGMENT_TOKENS and selected:
+            window.truncated = True
+            break
+
+        content = message["content"] or ""
+        tokens = message.get("token_count")
+        if tokens is None:
+            tokens = estimate_tokens(content)
+
+        limit = min(max_message_tokens, remaining)
+        if tokens > limit:
+            if limit < _MARKER_TOKENS:
+                # Not even the trim marker fits; a marker alone would overrun the budget
+                window.truncated = True
+                break
+            content = trim_text(content, limit)
+            tokens = estimate_tokens(content)
+            window.trimmed += 1
+
+        selected.append({"role": message["role"], "content": content})
+        remaining -= tokens
+        window.total_tokens += tokens
+
+    selected.reverse()
+    window.messages = selected
+    return window
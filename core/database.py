@@ -1,34 +1,408 @@
+import atexit
+import itertools
+import logging
+import queue
 import sqlite3
+import threading
+import time
+
+from core.context import DEFAULT_CONTEXT_TOKENS, build_context_window, estimate_tokens
+
+# Znaczniki sterujące kolejką zapisu
+_FLUSH = object()
+_STOP = object()
 
 class DatabaseManager:
-    def __init__(self, db_path="druid_history.db"):
+    """Historia czatu w SQLite z kolejką zapisu (write-behind).
+
+    Wiadomości trafiają do kolejki i są zapisywane przez osobny wątek w jednej
+    transakcji na paczkę (``batch_size`` wpisów lub ``flush_interval`` sekund).
+    Wpis to lista instrukcji wykonywana atomowo. Gdy paczka się nie powiedzie,
+    wpisy są ponawiane pojedynczo, więc przepada tylko błędny; błędy zapisu
+    zgłasza następne ``flush()``. Odczyty najpierw opróżniają kolejkę, więc
+    zawsze widzą własne zapisy.
+    """
+
+    def __init__(self, db_path="druid_history.db", batch_size=64, flush_interval=0.25):
         self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute("PRAGMA journal_mode = WAL;")
         self.conn.execute("PRAGMA synchronous = NORMAL;")
+        self.conn.create_function("estimate_tokens", 1, estimate_tokens, deterministic=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        # Chroni _closed i wkładanie do kolejki: po _STOP nic już do niej nie trafi
+        self._queue_lock = threading.Lock()
+        self._closed = False
+        self._write_errors = []
+        self.fts_enabled = False
         self.create_tables()
+        self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
 
     def create_tables(self):
-        self.conn.execute("""CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)""")
-        self.conn.execute("""CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER, role TEXT, content TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY(session_id) REFERENCES sessions(id))""")
-        self.conn.commit()
+        with self._lock:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INTEGER, role TEXT, content TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY(session_id) REFERENCES sessions(id))""")
+            self.conn.commit()
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            self._migrate()
+            if version >= 2 and not self._table_exists("messages_fts"):
+                # v2 przeszła kiedyś bez FTS5 - po aktualizacji SQLite indeks powstaje (z backfillem) przy otwarciu
+                self.conn.execute("BEGIN")
+                try:
+                    self._migration_search_index()
+                    self.conn.commit()
+                except Exception:
+                    self.conn.rollback()
+                    raise
+            self.fts_enabled = self._table_exists("messages_fts")
+
+    # --- Migracje schematu (numer wersji w PRAGMA user_version) ---
+    def _migrations(self):
+        return [
+            self._migration_session_index,
+            self._migration_search_index,
+            self._migration_token_counts,
+            self._migration_byte_counts,
+            self._migration_session_activity,
+        ]
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(self._migrations(), start=1):
+            if version >= target:
+                continue
+            self.conn.execute("BEGIN")
+            try:
+                migration()
+                self.conn.execute(f"PRAGMA user_version = {target:d}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            logging.info(f"DB schema migrated to v{target}")
+
+    def _migration_session_index(self):
+        # Historia sesji zawsze filtrowana po session_id i sortowana po id
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages (session_id, id)")
+
+    def _migration_search_index(self):
+        # Indeks pełnotekstowy (external content) + triggery + backfill istniejących wiadomości.
+        # Brak FTS5 w buildzie SQLite nie blokuje aplikacji - wyszukiwanie spada wtedy do LIKE.
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+        except sqlite3.OperationalError as e:
+            logging.warning(f"FTS5 unavailable, search falls back to LIKE: {e}")
+            return
+        self.conn.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END""")
+        self.conn.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END""")
+        self.conn.execute("""CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END""")
+        self.conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    def _migration_token_counts(self):
+        # Liczba tokenów liczona raz przy zapisie - budowanie kontekstu nie tokenizuje historii
+        if not self._column_exists("messages", "token_count"):
+            self.conn.execute("ALTER TABLE messages ADD COLUMN token_count INTEGER")
+        self.conn.execute("UPDATE messages SET token_count = estimate_tokens(content) WHERE token_count IS NULL")
+
+    def _migration_byte_counts(self):
+        # Rozmiar treści w bajtach UTF-8 (rozmiar payloadu) - również liczony raz przy zapisie
+        if not self._column_exists("messages", "byte_count"):
+            self.conn.execute("ALTER TABLE messages ADD COLUMN byte_count INTEGER")
+        self.conn.execute("UPDATE messages SET byte_count = length(CAST(content AS BLOB)) WHERE byte_count IS NULL")
+
+    def _migration_session_activity(self):
+        # Metadane listy sesji trzymane w sessions (liczba wiadomości, ostatnia aktywność),
+        # utrzymywane triggerami - przeglądarka sesji nie dotyka tabeli messages
+        if not self._column_exists("sessions", "message_count"):
+            self.conn.execute("ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+        if not self._column_exists("sessions", "last_activity"):
+            self.conn.execute("ALTER TABLE sessions ADD COLUMN last_activity DATETIME")
+        self.conn.execute("""UPDATE sessions SET
+            message_count = (SELECT COUNT(*) FROM messages WHERE session_id = sessions.id),
+            last_activity = COALESCE((SELECT timestamp FROM messages WHERE session_id = sessions.id ORDER BY id DESC LIMIT 1), created_at, CURRENT_TIMESTAMP)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity, id)")
+        self.conn.execute("""CREATE TRIGGER IF NOT EXISTS sessions_activity_ai AFTER INSERT ON messages BEGIN
+            UPDATE sessions SET message_count = message_count + 1, last_activity = COALESCE(new.timestamp, CURRENT_TIMESTAMP) WHERE id = new.session_id; END""")
+        self.conn.execute("""CREATE TRIGGER IF NOT EXISTS sessions_activity_ad AFTER DELETE ON messages BEGIN
+            UPDATE sessions SET message_count = message_count - 1 WHERE id = old.session_id; END""")
+
+    def rebuild_search_index(self):
+        """Odbudowuje indeks FTS z tabeli messages (np. po imporcie starej bazy)."""
+        if not self.fts_enabled:
+            return
+        self._sync()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    def _column_exists(self, table, column):
+        return any(row[1] == column for row in self.conn.execute(f"PRAGMA table_info({table})"))
+
+    def _table_exists(self, name):
+        row = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    # --- Zapisy ---
     def create_session(self, title):
-        cursor = self.conn.execute("INSERT INTO sessions (title) VALUES (?)", (title,))
-        self.conn.commit()
+        # Potrzebujemy id od razu, więc sesję zakładamy synchronicznie (rzadka operacja)
+        with self._lock, self.conn:
+            cursor = self.conn.execute("INSERT INTO sessions (title, last_activity) VALUES (?, CURRENT_TIMESTAMP)", (title,))
         return cursor.lastrowid
     def delete_session(self, session_id):
-        self.conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
-        self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-        self.conn.commit()
-    def get_sessions(self):
-        cursor = self.conn.execute("SELECT id, title FROM sessions ORDER BY id DESC")
-        return cursor.fetchall()
+        # Oba DELETE jako jeden wpis - zawsze w tej samej transakcji
+        self._enqueue_unit([
+            ("DELETE FROM messages WHERE session_id = ?", (session_id,)),
+            ("DELETE FROM sessions WHERE id = ?", (session_id,)),
+        ])
     def add_message(self, session_id, role, content):
-        self.conn.execute("INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)", (session_id, role, content))
-        self.conn.commit()
+        byte_count = len(content.encode("utf-8")) if content else 0
+        self._enqueue(
+            "INSERT INTO messages (session_id, role, content, token_count, byte_count) VALUES (?, ?, ?, ?, ?)",
+            (session_id, role, content, estimate_tokens(content), byte_count),
+        )
+
+    def flush(self):
+        """Blokuje do momentu zapisania wszystkiego, co trafiło do kolejki.
+
+        Rzuca sqlite3.DatabaseError, jeśli od poprzedniego flush() któryś wpis nie został zapisany.
+        """
+        self._drain()
+        with self._queue_lock:
+            errors, self._write_errors = self._write_errors, []
+        if errors:
+            raise sqlite3.DatabaseError(f"{len(errors)} queued write(s) failed: {errors[0]}") from errors[0]
+
+    def close(self):
+        """Zapisuje zaległe wiersze, zatrzymuje wątek zapisu i zamyka połączenie."""
+        with self._queue_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self.conn.close()
+        atexit.unregister(self.close)
+
+    def _enqueue(self, sql, params):
+        self._enqueue_unit([(sql, params)])
+
+    def _enqueue_unit(self, statements):
+        with self._queue_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("DatabaseManager is closed")
+            self._queue.put(statements)
+
+    def _drain(self):
+        with self._queue_lock:
+            if self._closed:
+                return
+            self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Dobieramy kolejne wpisy aż do limitu paczki, czasu lub znacznika sterującego
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._write_batch([item for item in batch if item is not _FLUSH and item is not _STOP])
+            for _ in batch:
+                self._queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def _write_batch(self, units):
+        if not units:
+            return
+        try:
+            self._write_units(units)
+        except sqlite3.Error as e:
+            if len(units) == 1:
+                self._write_failed(units[0], e)
+                return
+            # Paczka wycofana - ponawiamy wpisy pojedynczo, żeby przepadł tylko błędny
+            logging.warning(f"DB batch of {len(units)} writes failed, retrying one by one: {e}")
+            for unit in units:
+                try:
+                    self._write_units([unit])
+                except sqlite3.Error as e:
+                    self._write_failed(unit, e)
+
+    def _write_units(self, units):
+        with self._lock, self.conn:
+            for unit in units:
+                for sql, params in unit:
+                    self.conn.execute(sql, params)
+
+    def _write_failed(self, unit, error):
+        logging.error(f"DB write failed ({unit[0][0]}): {error}")
+        with self._queue_lock:
+            self._write_errors.append(error)
+
+    # --- Odczyty ---
+    def _sync(self):
+        # Odczyt tylko czeka na kolejkę; błędy zapisu zgłasza jawne flush()
+        if self._queue.unfinished_tasks:
+            self._drain()
+
+    def get_sessions(self):
+        self._sync()
+        with self._lock:
+            cursor = self.conn.execute("SELECT id, title FROM sessions ORDER BY id DESC")
+            return cursor.fetchall()
+    def get_sessions_page(self, before=None, page_size=50):
+        """Strona sesji od najświeższej aktywności; before = (last_activity, id) ostatniego wiersza poprzedniej strony.
+
+        Tylko tabela sessions (liczniki z triggerów) i indeks po (last_activity, id), więc koszt
+        strony nie zależy od liczby sesji ani wiadomości.
+        """
+        self._sync()
+        sql = "SELECT id, title, message_count, last_activity FROM sessions"
+        params = []
+        if before is not None:
+            sql += " WHERE (last_activity, id) < (?, ?)"
+            params.extend(before)
+        sql += " ORDER BY last_activity DESC, id DESC LIMIT ?"
+        params.append(page_size)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{"id": r[0], "title": r[1], "message_count": r[2], "last_activity": r[3]} for r in rows]
+    def get_session(self, session_id):
+        self._sync()
+        with self._lock:
+            r = self.conn.execute(
+                "SELECT id, title, message_count, last_activity FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return None if r is None else {"id": r[0], "title": r[1], "message_count": r[2], "last_activity": r[3]}
     def get_messages(self, session_id):
-        cursor = self.conn.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,))
-        return [{"role": r[0], "content": r[1]} for r in cursor.fetchall()]
-    def get_context_messages(self, session_id, limit=20):
-        cursor = self.conn.execute(f"SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT {limit}", (session_id,))
-        rows = cursor.fetchall()
-        return [{"role": r[0], "content": r[1]} for r in reversed(rows)]
+        self._sync()
+        with self._lock:
+            cursor = self.conn.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC", (session_id,))
+            return [{"role": r[0], "content": r[1]} for r in cursor.fetchall()]
+    def get_messages_page(self, session_id, after_id=0, page_size=100):
+        """Jedna strona wiadomości o id > after_id (paginacja po kluczu, bez OFFSET)."""
+        self._sync()
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id ASC LIMIT ?",
+                (session_id, after_id, page_size),
+            )
+            return [{"id": r[0], "role": r[1], "content": r[2]} for r in cursor.fetchall()]
+    def get_messages_before(self, session_id, before_id=None, page_size=50):
+        """Strona najnowszych wiadomości o id < before_id (None = od końca), zwracana chronologicznie.
+
+        Otwarcie sesji pobiera tylko ostatnią stronę; starsze doczytuje się z id pierwszego wiersza.
+        """
+        page = list(itertools.islice(self._iter_newest_first(session_id, page_size, before_id), page_size))
+        page.reverse()
+        return page
+    def iter_messages(self, session_id, after_id=0, page_size=100):
+        """Leniwie przechodzi po całej sesji, pobierając po page_size wierszy."""
+        while True:
+            page = self.get_messages_page(session_id, after_id, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+    def session_stats(self, session_id):
+        """Agregaty rozmiaru sesji z zapisanych liczników - bez ponownego tokenizowania historii."""
+        self._sync()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT role, COUNT(*), COALESCE(SUM(token_count), 0), COALESCE(SUM(byte_count), 0) FROM messages WHERE session_id = ? GROUP BY role",
+                (session_id,),
+            ).fetchall()
+        by_role = {r[0]: {"message_count": r[1], "token_count": r[2], "byte_count": r[3]} for r in rows}
+        return {
+            "message_count": sum(r[1] for r in rows),
+            "token_count": sum(r[2] for r in rows),
+            "byte_count": sum(r[3] for r in rows),
+            "by_role": by_role,
+        }
+    def get_context_messages(self, session_id, limit=None, token_budget=DEFAULT_CONTEXT_TOKENS):
+        """Najnowsze wiadomości mieszczące się w budżecie tokenów (opcjonalnie max limit wierszy)."""
+        return self.build_context(session_id, token_budget, limit).messages
+    def build_context(self, session_id, token_budget=DEFAULT_CONTEXT_TOKENS, limit=None, max_message_tokens=None):
+        rows = self._iter_newest_first(session_id, page_size=min(limit or 32, 32))
+        if limit is not None:
+            rows = itertools.islice(rows, limit)
+        return build_context_window(rows, token_budget, max_message_tokens)
+    def _iter_newest_first(self, session_id, page_size, before_id=None):
+        while True:
+            self._sync()
+            with self._lock:
+                if before_id is None:
+                    cursor = self.conn.execute(
+                        "SELECT id, role, content, token_count FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                        (session_id, page_size),
+                    )
+                else:
+                    cursor = self.conn.execute(
+                        "SELECT id, role, content, token_count FROM messages WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                        (session_id, before_id, page_size),
+                    )
+                page = cursor.fetchall()
+            for r in page:
+                yield {"id": r[0], "role": r[1], "content": r[2], "token_count": r[3]}
+            if len(page) < page_size:
+                return
+            before_id = page[-1][0]
+    def search_messages(self, query, limit=20, session_id=None):
+        """Wyszukiwanie w historii: najlepsze trafienia (bm25) z fragmentem treści."""
+        match = _fts_query(query)
+        if not match:
+            return []
+        self._sync()
+        if not self.fts_enabled:
+            return self._search_messages_like(query, limit, session_id)
+
+        sql = ("SELECT m.id, m.session_id, m.role, snippet(messages_fts, 0, char(2), char(3), '...', 16), bm25(messages_fts) AS rank "
+               "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid WHERE messages_fts MATCH ?")
+        params = [match]
+        if session_id is not None:
+            sql += " AND m.session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{"id": r[0], "session_id": r[1], "role": r[2], "snippet": _snippet_markup(r[3]), "rank": r[4]} for r in rows]
+    def _search_messages_like(self, query, limit, session_id):
+        sql = "SELECT id, session_id, role, substr(content, 1, 200) FROM messages WHERE content LIKE ?"
+        params = [f"%{query.strip()}%"]
+        if session_id is not None:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [{"id": r[0], "session_id": r[1], "role": r[2], "snippet": _snippet_markup(r[3]), "rank": 0.0} for r in rows]
+
+def _snippet_markup(snippet):
+    """Fragment gotowy do etykiety z markup=True: treść escapowana, trafienia w [b]...[/b]."""
+    text = (snippet or "").replace("&", "&amp;").replace("[", "&bl;").replace("]", "&br;")
+    return text.replace("\x02", "[b]").replace("\x03", "[/b]")
+
+def _fts_query(text):
+    """Zamienia wpis użytkownika na bezpieczne zapytanie FTS5 (AND słów, prefiks ostatniego)."""
+    terms = [t.replace('"', '""') for t in (text or "").split()]
+    if not terms:
+        return ""
+    return " ".join(f'"{t}"' for t in terms) + "*"
@@ -0,0 +1,234 @@
+"""Attachment context for prompts with an mtime-aware in-memory cache."""
+from __future__ import annotations
+
+import codecs
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable
+
+TEXT_EXTENSIONS = frozenset({".py", ".txt", ".md", ".json", ".html", ".css", ".js", ".csv", ".log"})
+DEFAULT_MAX_FILE_BYTES = 2_000_000
+# Larger files are summarised from head/tail windows plus lines that look relevant.
+EXCERPT_HEAD_BYTES = 64_000
+EXCERPT_TAIL_BYTES = 64_000
+EXCERPT_MAX_BYTES = 256_000
+EXCERPT_MAX_MATCHES = 400
+EXCERPT_MAX_LINE_BYTES = 400
+RELEVANT_LINE_PATTERN = re.compile(rb"(?i)error|exception|traceback|fatal|critical|warn|fail")
+# Tried in order; latin-1 maps every byte so decoding always succeeds in the end.
+FALLBACK_ENCODINGS = ("utf-8", "cp1250", "latin-1")
+
+
+@dataclass(frozen=True)
+class _Entry:
+    mtime_ns: int
+    size: int
+    block: str
+
+
+class FileContextCache:
+    """Rendered prompt blocks keyed by path and validated by ``(mtime, size)``.
+
+    A cached block is reused while the file's stat signature is unchanged, so
+    repeated prompts over the same attachment set cost one ``stat`` per file
+    instead of a full read. Memory is bounded by ``max_chars`` with LRU eviction.
+
+    Cache misses are loaded on a bounded thread pool so a large attachment set
+    costs roughly as much as its slowest file; results keep the input order.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 32_000_000,
+        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+        max_workers: int = 8,
+    ) -> None:
+        self.max_chars = max_chars
+        self.max_file_bytes = max_file_bytes
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def build_context(self, paths: Iterable[str]) -> str:
+        """Concatenate the blocks for ``paths`` in the given order."""
+
+        paths = list(paths)
+        if len(paths) <= 1 or self.max_workers <= 1:
+            return "".join(self.get_block(path) for path in paths)
+        return "".join(self._pool().map(self.get_block, paths))
+
+    def get_block(self, path: str) -> str:
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except OSError as exc:
+            return f"\n[ERROR] Nie udało się odczytać {name}: {exc}\n"
+
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.block
+            self.misses += 1
+
+        try:
+            block = render_file_block(path, self.max_file_bytes)
+        except OSError as exc:
+            return f"\n[ERROR] Nie udało się odczytać {name}: {exc}\n"
+        self._store(key, _Entry(stat.st_mtime_ns, stat.st_size, block))
+        return block
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-context")
+            return self._executor
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        if len(entry.block) > self.max_chars:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._chars -= len(previous.block)
+            self._entries[key] = entry
+            self._chars += len(entry.block)
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted.block)
+
+
+def render_file_block(path: str, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES) -> str:
+    """Render one attachment the way it is embedded in ``CONTEXT FILES``."""
+
+    name = os.path.basename(path)
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in TEXT_EXTENSIONS:
+        return f"\n[INFO] Plik {name} dołączony (tryb binarny pominięty w podglądzie).\n"
+    size = os.path.getsize(path)
+    if size > max_file_bytes:
+        return render_excerpt_block(path, min(EXCERPT_MAX_BYTES, max_file_bytes))
+    with open(path, "rb") as handle:
+        content = decode_text(handle.read())
+    return f"\n--- PLIK: {name} ---\n{content}\n"
+
+
+def render_excerpt_block(
+    path: str,
+    max_bytes: int = EXCERPT_MAX_BYTES,
+    pattern: re.Pattern[bytes] = RELEVANT_LINE_PATTERN,
+) -> str:
+    """Summarise a large text file without reading it into memory.
+
+    The file is memory-mapped; only the head and tail windows and the lines
+    matching ``pattern`` between them are copied out, all within ``max_bytes``.
+    """
+
+    name = os.path.basename(path)
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        size = len(view)
+        window = max_bytes // 4
+        head_end = _line_end(view, min(EXCERPT_HEAD_BYTES, window, size))
+        tail_start = max(head_end, _next_line(view, size - min(EXCERPT_TAIL_BYTES, window)))
+        head = _clip_utf8(view[:head_end])
+        tail = _clip_utf8(view[tail_start:])
+
+        budget = max_bytes - len(head) - len(tail)
+        matches: list[bytes] = []
+        last_line = -1
+        for match in pattern.finditer(view, head_end, tail_start):
+            start = max(head_end, _line_start(view, match.start()))
+            if start == last_line:
+                continue
+            last_line = start
+            end = view.find(b"\n", match.end(), start + EXCERPT_MAX_LINE_BYTES)
+            line = _clip_utf8(view[start:end if end != -1 else start + EXCERPT_MAX_LINE_BYTES])
+            budget -= len(line) + 16
+            if budget < 0 or len(matches) >= EXCERPT_MAX_MATCHES:
+                break
+            matches.append(b"@%d: %s" % (start, line.rstrip(b"\r")))
+
+    parts = [
+        f"\n--- PLIK: {name} (fragmenty, {size} B) ---\n",
+        "[POCZĄTEK]\n", decode_text(head).rstrip("\n"), "\n",
+    ]
+    if matches:
+        parts += ["[PASUJĄCE LINIE]\n", decode_text(b"\n".join(matches)), "\n"]
+    parts += ["[KONIEC]\n", decode_text(tail).rstrip("\n"), "\n"]
+    return "".join(parts)
+
+
+def _line_start(view: mmap.mmap, offset: int) -> int:
+    """Start of the line holding ``offset``, looking back at most half a line cap."""
+
+    floor = max(0, offset - EXCERPT_MAX_LINE_BYTES // 2)
+    newline = view.rfind(b"\n", floor, offset)
+    return newline + 1 if newline != -1 else floor
+
+
+def _line_end(view: mmap.mmap, offset: int) -> int:
+    """Cut a head window back to the last complete line, if there is one."""
+
+    if offset >= len(view):
+        return len(view)
+    newline = view.rfind(b"\n", 0, offset)
+    return newline + 1 if newline > 0 else offset
+
+
+def _next_line(view: mmap.mmap, offset: int) -> int:
+    """Move a tail window forward to the next line start, if there is one."""
+
+    newline = view.find(b"\n", offset)
+    return newline + 1 if 0 <= newline < len(view) - 1 else offset
+
+
+def _clip_utf8(line: bytes) -> bytes:
+    """Drop multi-byte UTF-8 sequences cut in half by a window edge."""
+
+    begin = 0
+    while begin < min(3, len(line)) and line[begin] & 0xC0 == 0x80:
+        begin += 1
+    for cut in range(4):
+        candidate = line[begin : len(line) - cut]
+        try:
+            candidate.decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        return candidate
+    return line  # not UTF-8 at all; decode_text falls back per encoding
+
+
+def decode_text(raw: bytes) -> str:
+    """Decode file bytes, honouring BOMs and falling back for legacy encodings."""
+
+    if raw.startswith(codecs.BOM_UTF8):
+        return raw[len(codecs.BOM_UTF8):].decode("utf-8", errors="replace")
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return raw.decode("utf-16", errors="replace")
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")  # pragma: no cover - latin-1 never fails
@@ -0,0 +1,197 @@
+"""Persistent on-disk cache for GitHub contents with ETag revalidation."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+
+@dataclass(frozen=True)
+class CachedContent:
+    """A cached repository file: validators plus the raw decoded bytes."""
+
+    etag: Optional[str]
+    sha: str
+    content: bytes
+
+
+class GitHubCache:
+    """Content cache stored under ``<root>/<owner_repo>/`` with shared blobs.
+
+    Each ``(repository, ref, path)`` maps to a small JSON record holding the
+    ETag and git blob SHA; file bodies live once per SHA under
+    ``<root>/.blobs/`` so identical files across refs (or later tree pulls)
+    share storage. Blob files are touched on every hit and the least recently
+    used ones are evicted, together with the records pointing at them, once
+    the blobs exceed ``max_bytes``. The blob sizes and the record index are
+    scanned from disk once, on the first write, and kept up to date in memory.
+    """
+
+    def __init__(self, root: str = "github_cache", max_bytes: int = 100_000_000) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._blob_root = os.path.join(root, ".blobs")
+        self._lock = threading.Lock()
+        self._total = 0
+        # sha -> size, least recently used first; None until the first write scans the disk
+        self._blobs: Optional["OrderedDict[str, int]"] = None
+        self._records: Dict[str, str] = {}  # record path -> sha
+        self._records_by_sha: Dict[str, Set[str]] = {}
+
+    def lookup(self, repository: str, ref: str, path: str) -> Optional[CachedContent]:
+        record_path = self._record_path(repository, ref, path)
+        try:
+            with open(record_path, "r", encoding="utf-8") as handle:
+                record = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        content = self.get_blob(record.get("sha", ""))
+        if content is None:
+            return None
+        return CachedContent(etag=record.get("etag"), sha=record["sha"], content=content)
+
+    def store(self, repository: str, ref: str, path: str, sha: str, content: bytes, etag: Optional[str] = None) -> None:
+        if not self._blob_path(sha):
+            return
+        sha = sha.lower()
+        record = {"path": path, "ref": ref, "sha": sha, "etag": etag}
+        record_path = self._record_path(repository, ref, path)
+        with self._lock:
+            if not self._add_blob(sha, content):
+                return
+            _atomic_write(record_path, json.dumps(record).encode("utf-8"))
+            self._track_record(record_path, sha)
+            self._evict()
+
+    def get_blob(self, sha: str) -> Optional[bytes]:
+        blob_path = self._blob_path(sha)
+        if not blob_path:
+            return None
+        try:
+            with open(blob_path, "rb") as handle:
+                content = handle.read()
+            os.utime(blob_path)
+        except OSError:
+            return None
+        with self._lock:
+            if self._blobs is not None and sha.lower() in self._blobs:
+                self._blobs.move_to_end(sha.lower())
+        return content
+
+    def store_blob(self, sha: str, content: bytes) -> None:
+        if not self._blob_path(sha):
+            return
+        with self._lock:
+            if self._add_blob(sha.lower(), content):
+                self._evict()
+
+    def _add_blob(self, sha: str, content: bytes) -> bool:
+        """Write the blob unless it is cached already; ``False`` if it can never fit."""
+        if len(content) > self.max_bytes:
+            return False
+        self._load()
+        if sha in self._blobs:
+            try:
+                os.utime(self._blob_path(sha))
+            except OSError:  # deleted behind our back: write it again
+                self._total -= self._blobs.pop(sha)
+            else:
+                self._blobs.move_to_end(sha)
+                return True
+        _atomic_write(self._blob_path(sha), content)
+        self._blobs[sha] = len(content)
+        self._total += len(content)
+        return True
+
+    def _track_record(self, record_path: str, sha: str) -> None:
+        previous = self._records.get(record_path)
+        if previous is not None:
+            self._records_by_sha.get(previous, set()).discard(record_path)
+        self._records[record_path] = sha
+        self._records_by_sha.setdefault(sha, set()).add(record_path)
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._blobs:
+            sha, size = self._blobs.popitem(last=False)
+            self._total -= size
+            _remove(self._blob_path(sha))
+            for record_path in self._records_by_sha.pop(sha, ()):
+                del self._records[record_path]
+                _remove(record_path)
+
+    def _load(self) -> None:
+        """Scan blobs and records once; records whose blob is gone are dropped."""
+        if self._blobs is not None:
+            return
+        blobs = []
+        for directory, _, names in os.walk(self._blob_root):
+            for name in names:
+                if name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                blobs.append((stat.st_mtime_ns, name, stat.st_size))
+        blobs.sort()
+        self._blobs = OrderedDict((name, size) for _, name, size in blobs)
+        self._total = sum(self._blobs.values())
+
+        try:
+            repositories = [entry.path for entry in os.scandir(self.root) if entry.is_dir() and entry.name != ".blobs"]
+        except OSError:
+            repositories = []
+        for repository in repositories:
+            index = os.path.join(repository, ".index")
+            try:
+                names = [name for name in os.listdir(index) if name.endswith(".json")]
+            except OSError:
+                continue
+            for name in names:
+                record_path = os.path.join(index, name)
+                try:
+                    with open(record_path, "r", encoding="utf-8") as handle:
+                        sha = str(json.load(handle).get("sha", "")).lower()
+                except (OSError, ValueError, AttributeError):
+                    sha = ""
+                if sha in self._blobs:
+                    self._track_record(record_path, sha)
+                else:
+                    _remove(record_path)
+
+    def _blob_path(self, sha: str) -> Optional[str]:
+        sha = (sha or "").lower()
+        if len(sha) < 4 or not all(ch in "0123456789abcdef" for ch in sha):
+            return None
+        return os.path.join(self._blob_root, sha[:2], sha)
+
+    def _record_path(self, repository: str, ref: str, path: str) -> str:
+        key = hashlib.sha1(f"{ref}\0{path}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, repository.replace("/", "_"), ".index", f"{key}.json")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _atomic_write(target: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -3,25 +3,75 @@ from __future__ import annotations
 
 import base64
 import binascii
+import http.client
 import json
 import os
-import urllib.error
+import random
+import re
+import tarfile
+import threading
+import time
 import urllib.request
-from urllib.parse import quote
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, unquote, urljoin, urlsplit
+from dataclasses import dataclass, field
 from pathlib import PurePosixPath
-from typing import Dict, Iterable, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.github_cache import GitHubCache
+
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+MAX_REDIRECTS = 5
+TRANSIENT_STATUSES = frozenset({500, 502, 503, 504})
 
 
 class GitHubFetchError(RuntimeError):
     """Raised when GitHub content cannot be retrieved."""
 
 
+@dataclass
+class FetchReport:
+    """Outcome of a batch fetch: decoded files plus per-path error messages."""
+
+    files: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+
+
+class GitHubBatchError(GitHubFetchError):
+    """Raised by :meth:`GitHubFetcher.fetch_files` when some paths failed.
+
+    The partial :class:`FetchReport` is attached so callers can still use the
+    files that did arrive.
+    """
+
+    def __init__(self, report: FetchReport):
+        details = "; ".join(f"{path}: {error}" for path, error in report.errors.items())
+        super().__init__(f"{len(report.errors)} file(s) failed: {details}")
+        self.report = report
+
+
 @dataclass
 class GitHubFetcher:
     token: Optional[str] = None
     user_agent: str = "DebugDruid/1.0"
     max_bytes: int = 1_000_000
+    api_url: str = "https://api.github.com"
+    max_workers: int = 8
+    timeout: float = 10.0
+    cache: Optional[GitHubCache] = None
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    scheduler: Optional["RateLimitScheduler"] = None
+    _pool: "_ConnectionPool" = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.api_url = self.api_url.rstrip("/")
+        if self.scheduler is None:
+            self.scheduler = RateLimitScheduler()
+        self._pool = _ConnectionPool()
 
     def fetch_files(self, repository: str, paths: Iterable[str], branch: str = "main") -> Dict[str, str]:
         """Return decoded contents for the requested repo paths.
@@ -31,33 +81,268 @@ class GitHubFetcher:
         repository: ``owner/name`` GitHub repository.
         paths: Iterable of file paths within the repository.
         branch: Branch or ref name; defaults to ``main``.
+
+        Files are fetched concurrently; if any of them fails a
+        :class:`GitHubBatchError` carrying the partial report is raised.
         """
+        report = self.fetch_report(repository, paths, branch)
+        if report.errors:
+            raise GitHubBatchError(report)
+        return report.files
+
+    def fetch_report(self, repository: str, paths: Iterable[str], branch: str = "main") -> FetchReport:
+        """Fetch ``paths`` concurrently, collecting per-file errors instead of raising."""
         repo = sanitize_repository(repository)
-        contents: Dict[str, str] = {}
+        normalized_paths: List[str] = []
         for path in paths:
             normalized = sanitize_repo_path(path)
-            if not normalized:
-                continue
-            contents[normalized] = self._fetch_single(repo, normalized, branch)
-        if not contents:
+            if normalized and normalized not in normalized_paths:
+                normalized_paths.append(normalized)
+        if not normalized_paths:
             raise GitHubFetchError("No valid paths requested")
-        return contents
+
+        results = self._map(lambda path: self._fetch_guarded(repo, path, branch), normalized_paths)
+        report = FetchReport()
+        for path, (content, error) in zip(normalized_paths, results):
+            if error is None:
+                report.files[path] = content
+            else:
+                report.errors[path] = error
+        return report
+
+    def fetch_tree(
+        self,
+        repository: str,
+        patterns: Iterable[str] = ("**",),
+        branch: str = "main",
+        extensions: Optional[Iterable[str]] = None,
+    ) -> FetchReport:
+        """Fetch every file under ``branch`` matching ``patterns`` in bulk.
+
+        The ref is resolved to a commit once and the whole tree is listed in a
+        single recursive Trees API call; only blobs that match a glob (``*``
+        stays within a directory, ``**`` spans directories), an optional
+        extension filter and ``max_bytes`` are downloaded. Blobs already in the
+        cache are reused by SHA without any request. Oversized matches are
+        listed in ``FetchReport.skipped``.
+        """
+        repo = sanitize_repository(repository)
+        wanted = _path_filter(patterns, extensions)
+
+        commit_sha = self._resolve_ref(repo, branch)
+        tree = self._get_json(f"/repos/{repo}/git/trees/{commit_sha}?recursive=1")
+        report = FetchReport()
+        if tree.get("truncated"):
+            report.errors["*"] = "Tree listing truncated by GitHub; narrow the patterns or use fetch_archive"
+
+        selected: List[Tuple[str, str]] = []
+        for entry in tree.get("tree", []):
+            path = entry.get("path", "")
+            if entry.get("type") != "blob" or sanitize_repo_path(path) != path or not wanted(path):
+                continue
+            if isinstance(entry.get("size"), int) and entry["size"] > self.max_bytes:
+                report.skipped.append(path)
+                continue
+            selected.append((path, entry.get("sha", "")))
+
+        results = self._map(lambda item: self._fetch_blob_guarded(repo, item[1]), selected)
+        for (path, _), (content, error) in zip(selected, results):
+            if error is None:
+                report.files[path] = content
+            else:
+                report.errors[path] = error
+        return report
+
+    def fetch_archive(
+        self,
+        repository: str,
+        patterns: Iterable[str] = ("**",),
+        branch: str = "main",
+        extensions: Optional[Iterable[str]] = None,
+    ) -> FetchReport:
+        """Download the tarball for ``branch`` and extract matching files.
+
+        The archive is decompressed straight off the socket and walked member
+        by member, so memory stays bounded by ``max_bytes`` per file rather
+        than by the repository size; non-matching members are skipped without
+        being buffered. The top-level ``owner-repo-sha/`` directory is
+        stripped, members whose path does not survive
+        :func:`sanitize_repo_path` unchanged (traversal, absolute names) and
+        non-regular entries such as symlinks are ignored, and files above
+        ``max_bytes`` are listed in ``FetchReport.skipped``.
+        """
+        repo = sanitize_repository(repository)
+        wanted = _path_filter(patterns, extensions)
+        request = self._api_request(f"/repos/{repo}/tarball/{quote(branch, safe='')}")
+
+        report = FetchReport()
+        with self._open_following_redirects(request) as response:
+            if response.status != 200:
+                raise GitHubFetchError(f"HTTP {response.status}: {_reason(response.status)}")
+            try:
+                with tarfile.open(fileobj=response, mode="r|*") as archive:
+                    for member in archive:
+                        _, _, path = member.name.partition("/")
+                        if not member.isfile() or not path or sanitize_repo_path(path) != path or not wanted(path):
+                            continue
+                        if member.size > self.max_bytes:
+                            report.skipped.append(path)
+                            continue
+                        stream = archive.extractfile(member)
+                        if stream is not None:
+                            report.files[path] = _decode_text(stream.read())
+            except (tarfile.TarError, EOFError, OSError, http.client.HTTPException) as exc:
+                raise GitHubFetchError(f"Unable to read repository archive: {exc}") from exc
+        return report
+
+    def close(self) -> None:
+        """Close pooled keep-alive connections."""
+        self._pool.close()
+
+    def _map(self, func, items: List[str]) -> List:
+        if len(items) == 1 or self.max_workers <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def _fetch_guarded(self, repository: str, path: str, branch: str) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            return self._fetch_single(repository, path, branch), None
+        except GitHubFetchError as exc:
+            return None, str(exc)
+
+    def _fetch_blob_guarded(self, repository: str, sha: str) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            return self._fetch_blob(repository, sha), None
+        except GitHubFetchError as exc:
+            return None, str(exc)
+
+    def _fetch_blob(self, repository: str, sha: str) -> str:
+        if not re.fullmatch(r"[0-9a-fA-F]{40,64}", sha or ""):
+            raise GitHubFetchError("Invalid blob SHA in tree listing")
+        cached = self.cache.get_blob(sha) if self.cache else None
+        if cached is not None:
+            return _decode_text(cached)
+        decoded_bytes = self._decode_content(self._get_json(f"/repos/{repository}/git/blobs/{sha}"))
+        if self.cache:
+            self.cache.store_blob(sha, decoded_bytes)
+        return _decode_text(decoded_bytes)
+
+    def _resolve_ref(self, repository: str, ref: str) -> str:
+        """Pin a branch/tag name to a commit SHA so the listing is consistent."""
+        if re.fullmatch(r"[0-9a-fA-F]{40}", ref):
+            return ref.lower()
+        request = self._api_request(f"/repos/{repository}/commits/{quote(ref, safe='')}", accept="application/vnd.github.sha")
+        status, _, payload = self._send(request)
+        if status != 200:
+            raise GitHubFetchError(f"HTTP {status}: {_reason(status)}")
+        sha = payload.decode("ascii", errors="replace").strip()
+        if not re.fullmatch(r"[0-9a-fA-F]{40}", sha):
+            raise GitHubFetchError("Unable to resolve ref to a commit")
+        return sha.lower()
+
+    def _get_json(self, api_path: str) -> dict:
+        status, _, payload = self._send(self._api_request(api_path))
+        if status != 200:
+            raise GitHubFetchError(f"HTTP {status}: {_reason(status)}")
+        return self._parse_json(payload)
 
     def _fetch_single(self, repository: str, path: str, branch: str) -> str:
+        cached = self.cache.lookup(repository, branch, path) if self.cache else None
         request = self._build_request(repository, path, branch)
+        if cached and cached.etag:
+            request.add_header("If-None-Match", cached.etag)
+
+        status, headers, payload = self._send(request)
+        if status == 304 and cached:
+            return _decode_text(cached.content)
+        if status != 200:
+            raise GitHubFetchError(f"HTTP {status}: {_reason(status)}")
+
+        data = self._parse_json(payload)
+        decoded_bytes = self._decode_content(data)
+        if self.cache and data.get("sha"):
+            self.cache.store(repository, branch, path, data["sha"], decoded_bytes, etag=headers.get("ETag"))
+        return _decode_text(decoded_bytes)
+
+    def _open_following_redirects(self, request: urllib.request.Request) -> "_PooledResponse":
+        """Open ``request``, following redirects without buffering the final body.
+
+        Archive downloads redirect to ``codeload.github.com``; the token is only
+        forwarded while the redirect stays on the original origin.
+        """
+        origin = urlsplit(request.full_url)[:2]
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._open(request)
+            if response.status not in REDIRECT_STATUSES:
+                return response
+            location = response.headers.get("Location")
+            response.read()
+            response.close()
+            if not location:
+                raise GitHubFetchError(f"HTTP {response.status}: redirect without Location")
+            url = urljoin(request.full_url, location)
+            headers = dict(request.header_items())
+            if urlsplit(url)[:2] != origin:
+                headers = {name: value for name, value in headers.items() if name.lower() != "authorization"}
+            request = urllib.request.Request(url, headers=headers)
+        raise GitHubFetchError("Too many redirects")
+
+    def _open(self, request: urllib.request.Request) -> "_PooledResponse":
+        """Open ``request`` through the rate-limit scheduler, retrying transient failures.
+
+        5xx responses and 429s are retried with jittered exponential backoff;
+        ``Retry-After`` (429/403 secondary limits, 503) pauses every worker
+        sharing the scheduler. The last response is returned once retries are
+        exhausted so the caller reports the real status.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire()
+            response = self._urlopen(request)
+            self.scheduler.observe(response.headers)
+            if attempt == self.max_retries:
+                return response
+            delay = self._retry_delay(response.status, response.headers, attempt)
+            if delay is None:
+                return response
+            response.read()
+            response.close()
+            if delay > 0:
+                self.scheduler.sleep(delay)
+        return response  # pragma: no cover - loop always returns
+
+    def _retry_delay(self, status: int, headers, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or ``None`` if ``status`` is final."""
+        retry_after = _retry_after_seconds(headers.get("Retry-After"), self.scheduler.clock())
+        if retry_after is not None and status in (403, 429, 503):
+            self.scheduler.block(retry_after)
+            return 0.0
+        if status in (403, 429) and headers.get("X-RateLimit-Remaining") == "0":
+            return 0.0  # primary limit: the scheduler waits for X-RateLimit-Reset
+        if status == 429 or status in TRANSIENT_STATUSES:
+            ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            return ceiling / 2 + random.uniform(0, ceiling / 2)
+        return None
+
+    def _send(self, request: urllib.request.Request):
         try:
-            with urllib.request.urlopen(request, timeout=10) as response:
-                payload = response.read()
-        except urllib.error.HTTPError as exc:  # pragma: no cover - network edge
-            raise GitHubFetchError(f"HTTP {exc.code}: {exc.reason}") from exc
-        except urllib.error.URLError as exc:  # pragma: no cover - network edge
-            raise GitHubFetchError(str(exc.reason)) from exc
+            with self._open(request) as response:
+                return response.status, response.headers, response.read()
+        except (OSError, http.client.HTTPException) as exc:  # pragma: no cover - network edge
+            raise GitHubFetchError(str(exc) or exc.__class__.__name__) from exc
 
+    @staticmethod
+    def _parse_json(payload: bytes) -> dict:
         try:
             data = json.loads(payload.decode("utf-8"))
-        except json.JSONDecodeError as exc:  # pragma: no cover - unexpected payload
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:  # pragma: no cover - unexpected payload
             raise GitHubFetchError("Invalid GitHub response") from exc
+        if not isinstance(data, dict):
+            raise GitHubFetchError("Invalid GitHub response")
+        return data
 
+    def _decode_content(self, data: dict) -> bytes:
+        """Validate a contents/blob payload and return the decoded bytes."""
         if data.get("encoding") not in (None, "base64"):
             raise GitHubFetchError("Unsupported GitHub content encoding")
 
@@ -72,26 +357,308 @@ class GitHubFetcher:
             raise GitHubFetchError("Requested file exceeds allowed size")
 
         try:
-            decoded_bytes = base64.b64decode(encoded_content, validate=True)
+            # GitHub wraps base64 at 60 columns; strip the newlines before strict decoding
+            decoded_bytes = base64.b64decode(encoded_content.replace("\n", ""), validate=True)
         except (binascii.Error, ValueError) as exc:  # pragma: no cover - corrupted data
             raise GitHubFetchError("Unable to decode GitHub content") from exc
 
         if len(decoded_bytes) > self.max_bytes:
             raise GitHubFetchError("Requested file exceeds allowed size")
+        return decoded_bytes
 
+    def _urlopen(self, request: urllib.request.Request) -> "_PooledResponse":
         try:
-            return decoded_bytes.decode("utf-8")
-        except UnicodeDecodeError:  # pragma: no cover - fallback path
-            return decoded_bytes.decode("utf-8", errors="replace")
+            return self._pool.open(request, self.timeout)
+        except (OSError, http.client.HTTPException) as exc:
+            raise GitHubFetchError(str(exc) or exc.__class__.__name__) from exc
 
     def _build_request(self, repository: str, path: str, branch: str) -> urllib.request.Request:
         encoded_path = quote(path, safe="/")
         encoded_branch = quote(branch, safe="")
-        url = f"https://api.github.com/repos/{repository}/contents/{encoded_path}?ref={encoded_branch}"
-        headers = {"Accept": "application/vnd.github.v3+json", "User-Agent": self.user_agent}
+        return self._api_request(f"/repos/{repository}/contents/{encoded_path}?ref={encoded_branch}")
+
+    def _api_request(self, api_path: str, accept: str = "application/vnd.github.v3+json") -> urllib.request.Request:
+        headers = {"Accept": accept, "User-Agent": self.user_agent}
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
-        return urllib.request.Request(url, headers=headers)
+        return urllib.request.Request(f"{self.api_url}{api_path}", headers=headers)
+
+
+class RateLimitScheduler:
+    """Shares GitHub's request budget between concurrent fetches.
+
+    The budget is read from ``X-RateLimit-Remaining``/``X-RateLimit-Reset`` on
+    every response. Once fewer than ``low_water`` requests remain, requests
+    are spaced evenly over what is left of the window; when the budget is
+    spent, or a ``Retry-After`` was received, every caller waits until the
+    window reopens. Waits longer than ``max_wait`` raise
+    :class:`GitHubFetchError` instead of stalling the UI for up to an hour.
+
+    ``clock`` (epoch seconds, like ``X-RateLimit-Reset``) and ``sleep`` are
+    injectable for tests. Share one instance between fetchers using the same
+    token.
+    """
+
+    def __init__(
+        self,
+        max_wait: float = 60.0,
+        low_water: int = 10,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_wait = max_wait
+        self.low_water = low_water
+        self.clock = clock
+        self.sleep = sleep
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self._blocked_until = 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a request may be sent and reserve it from the budget."""
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._blocked_until, self._next_slot)
+            remaining = self.remaining
+            interval = 0.0
+            if remaining is not None and self.reset_at is not None and self.reset_at > now:
+                if remaining <= 0:
+                    start = max(start, self.reset_at)
+                    remaining = None  # unknown until the next response
+                else:
+                    if remaining < self.low_water:
+                        interval = max(0.0, self.reset_at - start) / remaining
+                    remaining -= 1
+            delay = start - now
+            if delay > self.max_wait:
+                raise GitHubFetchError(f"GitHub rate limit exhausted; retry in {delay:.0f}s")
+            self.remaining = remaining
+            self._next_slot = start + interval
+        if delay > 0:
+            self.sleep(delay)
+
+    def observe(self, headers) -> None:
+        """Update the budget from a response's rate-limit headers."""
+        try:
+            remaining = int(headers.get("X-RateLimit-Remaining"))
+            reset_at = float(headers.get("X-RateLimit-Reset"))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            if self.remaining is None or self.reset_at != reset_at:
+                self.remaining, self.reset_at = remaining, reset_at
+            else:
+                # responses of concurrent requests arrive out of order
+                self.remaining = min(self.remaining, remaining)
+
+    def block(self, seconds: float) -> None:
+        """Hold every caller back for ``seconds`` (``Retry-After``)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self.clock() + seconds)
+
+
+class _PooledResponse:
+    """HTTP response that hands its connection back to the pool once drained."""
+
+    def __init__(self, pool: "_ConnectionPool", key: Tuple[str, str, int, str], connection, response):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+        self.status: int = response.status
+        self.reason: str = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool.release(self._key, connection)
+        else:
+            connection.close()
+
+    def __enter__(self) -> "_PooledResponse":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+
+class _ConnectionPool:
+    """Thread-safe pool of keep-alive ``http.client`` connections per origin.
+
+    ``proxies`` maps schemes to proxy URLs as :func:`urllib.request.getproxies`
+    returns them (``HTTPS_PROXY``/``HTTP_PROXY``/``NO_PROXY``), which is also the
+    default. HTTPS goes through a ``CONNECT`` tunnel; plain HTTP sends the
+    absolute URL to the proxy.
+    """
+
+    def __init__(self, max_idle_per_host: int = 8, proxies: Optional[Dict[str, str]] = None):
+        self.max_idle_per_host = max_idle_per_host
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self._idle: Dict[Tuple[str, str, int, str], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def open(self, request: urllib.request.Request, timeout: float) -> _PooledResponse:
+        parts = urlsplit(request.full_url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise GitHubFetchError(f"Unsupported URL scheme: {scheme}")
+        host = parts.hostname or ""
+        key = (scheme, host, parts.port or (443 if scheme == "https" else 80), self._proxy_for(scheme, host))
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = dict(request.header_items())
+        if key[3] and scheme == "http":
+            # Forward proxy: absolute URL in the request line, credentials per request
+            target = request.full_url
+            headers.update(_proxy_headers(key[3]))
+
+        connection, reused = self._acquire(key, timeout)
+        try:
+            connection.request(request.get_method(), target, headers=headers)
+            response = connection.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+            connection.close()
+            if not reused:
+                raise
+            # A pooled connection the server already dropped: retry once on a fresh one.
+            connection = self._connect(key, timeout)
+            try:
+                connection.request(request.get_method(), target, headers=headers)
+                response = connection.getresponse()
+            except BaseException:
+                connection.close()
+                raise
+        except BaseException:
+            connection.close()
+            raise
+        return _PooledResponse(self, key, connection, response)
+
+    def release(self, key: Tuple[str, str, int, str], connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def _proxy_for(self, scheme: str, host: str) -> str:
+        """Proxy URL for ``scheme://host`` or ``""`` when the request goes direct."""
+        proxy = self.proxies.get(scheme, "")
+        if proxy and urllib.request.proxy_bypass_environment(host, self.proxies):
+            return ""
+        return proxy
+
+    def _acquire(self, key: Tuple[str, str, int, str], timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                connection = idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+        return self._connect(key, timeout), False
+
+    @staticmethod
+    def _connect(key: Tuple[str, str, int, str], timeout: float) -> http.client.HTTPConnection:
+        scheme, host, port, proxy = key
+        if proxy:
+            proxy_parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            proxy_host, proxy_port = proxy_parts.hostname or "", proxy_parts.port
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=timeout)
+                connection.set_tunnel(host, port, headers=_proxy_headers(proxy))
+                return connection
+            return http.client.HTTPConnection(proxy_host, proxy_port, timeout=timeout)
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def _proxy_headers(proxy: str) -> Dict[str, str]:
+    """``Proxy-Authorization`` for credentials embedded in a proxy URL, if any."""
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    if parts.username is None:
+        return {}
+    credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}".encode("utf-8")
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(credentials).decode("ascii")}
+
+
+def _path_filter(patterns: Iterable[str], extensions: Optional[Iterable[str]]):
+    """Predicate accepting paths that match any glob and, if given, an extension."""
+    matchers = [_compile_glob(pattern) for pattern in patterns]
+    suffixes = tuple(ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions or ())
+
+    def wanted(path: str) -> bool:
+        if not any(matcher.match(path) for matcher in matchers):
+            return False
+        return not suffixes or path.lower().endswith(suffixes)
+
+    return wanted
+
+
+def _compile_glob(pattern: str) -> "re.Pattern[str]":
+    """Translate a repository glob: ``*``/``?`` stay within one segment, ``**`` spans many."""
+    pattern = pattern.strip().lstrip("/")
+    parts: List[str] = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+    return re.compile("".join(parts) + r"\Z")
+
+
+def _retry_after_seconds(value: Optional[str], now: float) -> Optional[float]:
+    """Parse ``Retry-After`` given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode_text(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:  # pragma: no cover - fallback path
+        return data.decode("utf-8", errors="replace")
+
+
+def _reason(status: int) -> str:
+    return http.client.responses.get(status, "Error")
 
 
 def sanitize_repo_path(path: str) -> Optional[str]:
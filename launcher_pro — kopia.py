@@ -3,35 +3,33 @@ import sys
 import threading
 from pathlib import Path
 
+# --- KONFIGURACJA WINDOWS ---
+# Wymuszenie twardego restartu OpenGL dla kart Intel (musi być przed pierwszym importem kivy);
+# angle_sdl2 istnieje tylko na Windows
+if sys.platform == "win32":
+    os.environ['KIVY_GL_BACKEND'] = 'angle_sdl2'
+
 # --- IMPORTY I SPRAWDZANIE ZALEŻNOŚCI ---
+# Tylko to, co rysuje pierwszą klatkę; google.generativeai, dotenv, menu i toast ładują się po niej
 try:
     from kivymd.app import MDApp
     from kivymd.uix.screen import MDScreen
     from kivymd.uix.boxlayout import MDBoxLayout
     from kivymd.uix.card import MDCard
     from kivymd.uix.list import OneLineIconListItem, IconLeftWidget
-    from kivymd.toast import toast
-    from kivymd.uix.menu import MDDropdownMenu
-    from kivymd.uix.button import MDIconButton
     
     from kivy.core.window import Window
-    from kivy.core.clipboard import Clipboard
     from kivy.lang import Builder
     from kivy.clock import Clock
     from kivy.properties import StringProperty, ListProperty, BooleanProperty
     from kivy.metrics import dp
     
-    import google.generativeai as genai
-    from dotenv import load_dotenv
+    from ui.deferred import Deferred, after_first_frame, warm_imports
 except ImportError as e:
     # Fallback dla braku bibliotek
     print(f"CRITICAL ERROR: {e}")
     sys.exit(1)
 
-# --- KONFIGURACJA WINDOWS ---
-# Wymuszenie twardego restartu OpenGL dla kart Intel
-os.environ['KIVY_GL_BACKEND'] = 'angle_sdl2'
-
 # --- UI LAYOUT (High Contrast Version) ---
 KV_ULTIMATE = '''
 <ChatMessageBubble>:
@@ -277,6 +275,8 @@ class ChatMessageBubble(MDBoxLayout):
     is_user = BooleanProperty(True)
 
     def copy_content(self):
+        from kivy.core.clipboard import Clipboard
+        from kivymd.toast import toast
         Clipboard.copy(self.text)
         toast("Skopiowano!")
 
@@ -286,6 +286,7 @@ class MainWindow(MDScreen):
 class DebugDruidUltimateApp(MDApp):
     dropped_files = ListProperty([])
     current_model_name = StringProperty("gemini-1.5-pro")
+    menu = None
 
     def build(self):
         self.title = "Agent 007 - Ultimate Console"
@@ -293,40 +294,40 @@ class DebugDruidUltimateApp(MDApp):
         self.theme_cls.primary_palette = "Green"
         self.theme_cls.material_style = "M3"
         
-        # Konfiguracja API
-        load_dotenv()
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
+        # Konfiguracja API w tle, po pierwszej klatce (import google.generativeai to większość zimnego startu)
+        self.api_loader = Deferred(_configure_api, name="api-loader")
         
         Window.bind(on_drop_file=self._on_file_drop)
         return Builder.load_string(KV_ULTIMATE)
 
     def on_start(self):
-        # Menu Modeli
-        menu_items = [
-            {"text": "gemini-1.5-pro", "viewclass": "OneLineListItem", 
-             "on_release": lambda x="gemini-1.5-pro": self.set_model(x)},
-            {"text": "gemini-1.5-flash", "viewclass": "OneLineListItem",
-             "on_release": lambda x="gemini-1.5-flash": self.set_model(x)},
-            {"text": "gemini-1.0-pro", "viewclass": "OneLineListItem",
-             "on_release": lambda x="gemini-1.0-pro": self.set_model(x)},
-        ]
-        self.menu = MDDropdownMenu(caller=self.root.ids.btn_model, items=menu_items, width_mult=4)
-
         # TEST RENDEROWANIA - Powiadomienie powitalne
         self.root.ids.chat_list.add_widget(
             ChatMessageBubble(text="[b]SYSTEM START:[/b] Jeśli to widzisz, rendering działa poprawnie!", is_user=False)
         )
         # Dodaj dummy plik żeby zobaczyć prawy panel
         self._add_file_to_ui("instrukcja_startowa.txt")
+        after_first_frame(self._warm_up)
+
+    def _warm_up(self):
+        self.api_loader.start()
+        warm_imports(("kivymd.uix.menu", "kivymd.toast"))
 
     def open_model_menu(self):
+        if self.menu is None:
+            from kivymd.uix.menu import MDDropdownMenu
+            # Menu Modeli
+            menu_items = [
+                {"text": name, "viewclass": "OneLineListItem", "on_release": lambda x=name: self.set_model(x)}
+                for name in ("gemini-1.5-pro", "gemini-1.5-flash", "gemini-1.0-pro")
+            ]
+            self.menu = MDDropdownMenu(caller=self.root.ids.btn_model, items=menu_items, width_mult=4)
         self.menu.open()
 
     def set_model(self, model_name):
         self.current_model_name = model_name
         self.root.ids.btn_model.text = model_name
+        from kivymd.toast import toast
         self.menu.dismiss()
         toast(f"Wybrano: {model_name}")
 
@@ -336,6 +337,7 @@ class DebugDruidUltimateApp(MDApp):
             if path_str not in self.dropped_files:
                 self.dropped_files.append(path_str)
                 self._add_file_to_ui(os.path.basename(path_str))
+                from kivymd.toast import toast
                 toast("Plik dodany!")
         except Exception as e:
             print(f"Drop error: {e}")
@@ -373,5 +375,15 @@ class DebugDruidUltimateApp(MDApp):
     def _update_chat(self, text):
         self.root.ids.chat_list.add_widget(ChatMessageBubble(text=text, is_user=False))
 
+def _configure_api():
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if api_key:
+        genai.configure(api_key=api_key)
+    return genai
+
 if __name__ == "__main__":
     DebugDruidUltimateApp().run()
\ No newline at end of file
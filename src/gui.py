@@ -10,10 +10,14 @@ from queue import Queue, Empty
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
+from kivymd.uix.label import MDLabel
 from kivy.lang import Builder
 from kivy.clock import Clock, mainthread
 from kivy.properties import BooleanProperty 
 
+from ui.update_pump import UpdatePump
+from ui.widgets.chat_list import ChatListView, RecycledRow
+
 # Definicja layout w KV String jednolitym
 # Zawiera fixy colorow READ-ONLY, juz zahardcowone bezpieczeni (md_bg_color)
 CORE_KV_SOURCE_STRING = """
@@ -22,6 +26,12 @@ CORE_KV_SOURCE_STRING = """
 # Aliasy metod dla przycisków
 #:set safe_entry_point app.invoke_action_sequence
 
+<ChatLine>:
+    markup: True
+    adaptive_height: True
+    theme_text_color: "Custom"
+    shorten: False
+
 <SystemAgentFrame_V2@MDBoxLayout>:
     orientation: 'vertical'
     # Hack - ciemne tlo ręczne aby MD3 nie rzucał warninga
@@ -43,27 +53,12 @@ CORE_KV_SOURCE_STRING = """
             adaptive_height: True
             pos_hint: {'center_y': 0.5}
 
-    MDScrollView:
-        id: body_scroll
-        scroll_y: 0 # trzyma spod
-        do_scroll_x: False
-        
-        MDBoxLayout:
-            id: chat_container
-            valign: 'top'
-            orientation: 'vertical'
-            adaptive_height: True
-            size_hint_y: None
-            height: self.minimum_height
-            spacing: dp(14)
-            padding: dp(22)
-            
-            # Message 0
-            MDLabel:
-                text: "[color=#4fef4f]SYSTEM HEURISTICS:[/color] All Threads operational (34ms tic)."
-                markup: True
-                adaptive_height: True
-                theme_text_color:"Hint"
+    # RecycleView: etykiety tylko dla widocznych linii, reszta siedzi w modelu
+    ChatListView:
+        id: chat_container
+        viewclass: 'ChatLine'
+        row_spacing: dp(14)
+        row_padding: [dp(22), dp(22), dp(22), dp(22)]
 
     MDBoxLayout:
         orientation:'vertical'
@@ -108,6 +103,10 @@ MDScreen:
                
 """
 
+class ChatLine(RecycledRow, MDLabel):
+    def natural_height(self):
+        return self.texture_size[1]
+
 class CoreKivyApp(MDApp):
     buffer = Queue()
     
@@ -118,6 +117,10 @@ class CoreKivyApp(MDApp):
         return Builder.load_string(CORE_KV_SOURCE_STRING)
 
     def on_start(self):
+         # Message 0
+         self._chat_list().add_message(
+             "[color=#4fef4f]SYSTEM HEURISTICS:[/color] All Threads operational (34ms tic).",
+             text_color=(0.6, 0.6, 0.6, 1), font_style="Body1")
          # UI Ready - Wait for Brain (Lazy load to speed up visual render)
          Clock.schedule_once(self._bind_brain, 0.5)
 
@@ -142,8 +145,18 @@ class CoreKivyApp(MDApp):
         self.push_chat_info("Operator", txt, user=True)
         # Delegacja do Worker Thgread 
         threading.Thread(target=self._run_task_bg, args=(txt,), daemon=True).start()
-        # Sluchaaacz
-        self._list_event = Clock.schedule_interval(self._listener, 1.0/30) # 33ms ferqunecyny
+        # Sluchaaacz - co klatke, w budzecie czasu zamiast sztywnych 20 elementow / 33ms
+        # (stare kody AGENTE_SPRECHEN / S / END obok protokolu MSG_CHUNK / ERROR / DONE)
+        self._pump = UpdatePump(
+            self.buffer,
+            on_text=self._process_chunk,
+            on_error=lambda pack: self.push_chat_info("AI ERROR", str(pack)),
+            on_done=self._stream_done,
+            chunk_types=("MSG_CHUNK", "AGENTE_SPRECHEN"),
+            error_types=("ERROR", "S"),
+            done_types=("DONE", "END"),
+        )
+        self._list_event = Clock.schedule_interval(self._pump.tick, 0)
 
     def _run_task_bg(self, promp):
         if not self.brain_mod:
@@ -152,53 +165,31 @@ class CoreKivyApp(MDApp):
         else:
            self.brain_mod.worker_gemini_generator(promp, self.buffer)
 
-    def push_chat_info(self, actor, txt, good=False,user=False):
-        c_code_hex ="d0d"if not user else "e0d00f"
+    def _chat_list(self):
         # Access nested IDS without crasdh 1
-        layout = self.root.ids['live_agent_view'].ids['chat_container']
-        
-        prefix = f"" if user else "[System MSG]"
+        return self.root.ids['live_agent_view'].ids['chat_container']
+
+    def push_chat_info(self, actor, txt, good=False,user=False):
         col = (0.2,1,.2,1) if good else (1,0,0,1)
-        
         if user: col=(1,1,1,1)
 
-        from kivymd.uix.card import MDCard # better spacing
-        from kivymd.uix.label import MDLabel
-               
-        # Hack wizualny dla dymkow:     
-        l = MDLabel(
-             text=f"[b]{actor}[/b]: {txt} ", 
-             markup=True, adaptive_height=True,theme_text_color='Custom', text_color=col,
-             shorten=False
-             
-             )
-        layout.add_widget(l, index=0) # add botoom most logic
+        # Wiersz w modelu listy - ChatLine powstaje dopiero gdy wiersz jest widoczny
+        # (recykling: kazdy wiersz musi podac komplet atrybutow widoku)
+        self._chat_list().add_message(
+             f"[b]{actor}[/b]: {txt} ", is_user=user, text_color=col, font_style="Body1")
 
     def _process_chunk(self, txt):
-           layout = self.root.ids.live_agent_view.ids.chat_container
+           chat_list = self._chat_list()
            
            # Check if last msg is system stream
-           if hasattr(self, '_active_stream_widget') and self._active_stream_widget:
-               # Jest widzet aktywna odopwiekdzi - dopisyzjey text
-                self._active_stream_widget.text += txt 
+           if getattr(self, '_active_stream_index', None) is not None:
+               # Jest aktywna odpowiedz - dopisujemy text w modelu
+                chat_list.append_text(self._active_stream_index, txt)
            else:
-               # Utworj widget nowy (First Chunk arival)
-               from kivymd.uix.label import MDLabel
-               w = MDLabel(text="[color=#0ff]System[/color]: " +txt, markup=True, adaptive_height=True,  font_style='Body1') 
-                               
-               layout.add_widget(w) # To Doda na same doły, jeski index 0 uylwywy.
-               self._active_stream_widget = w        
+               # Nowy wiersz (First Chunk arival)
+               self._active_stream_index = chat_list.add_message(
+                   "[color=#0ff]System[/color]: " + txt, text_color=(0.9, 0.9, 0.9, 1), font_style="Body1")
     
-    def _listener(self, dt): 
-         """Glowny update cycle KIVY"""
-         loops = 0 
-         while not self.buffer.empty() and loops <20:
-            pk = self.buffer.get_nowait()
-            code, pack = pk 
-            if code == "AGENTE_SPRECHEN": self._process_chunk(pack)
-            if code == "ERROR": self.push_chat_info("AI ERROR", str(pack))
-            if code == "DONE":
-                   self._active_stream_widget = None
-                   Clock.unschedule(self._listener)
-            loops +=1 
-            # Dziek itamu KIvy rendering nie zddycha przy massive load 
+    def _stream_done(self):
+         self._active_stream_index = None
+         self._chat_list().flush_stale()
@@ -1,9 +1,14 @@
 import unittest
+from unittest import mock
 
-from core.architect import build_architect_response, detect_language, DetectionResult
+from core import architect
+from core.architect import build_architect_response, detect_blocks, detect_language, DetectionResult, split_code_blocks
 
 
 class ArchitectModeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        architect.detection_cache.clear()
+
     def test_detect_python(self) -> None:
         code = """\
 import os
@@ -141,6 +146,110 @@ int main() {
         self.assertIsNone(result.framework)
         self.assertEqual(result.version, "13.2")
 
+    def test_shared_marker_counts_match_str_count(self) -> None:
+        sample = "std::vector<int>::iterator it; export default x; fastapi from fastapi :::: <!doctype html>".lower()
+        counts = architect._MarkerCounts(sample)
+        for marker in architect._ALL_MARKERS:
+            self.assertEqual(counts[marker], sample.count(marker), marker)
+
+        empty = architect._MarkerCounts("plain words only")
+        self.assertEqual(empty["std::"], 0)
+        self.assertEqual(empty["from fastapi"], 0)
+
+    def test_large_input_detected_from_bounded_sample(self) -> None:
+        unit = "from fastapi import FastAPI\napp = FastAPI()\n\ndef handler(self):\n    print(self)\n"
+        code = unit * 20_000  # ~1.4 MB
+        with mock.patch.object(architect, "_MarkerCounts", wraps=architect._MarkerCounts) as counts:
+            result = detect_language(code, budget=16_000)
+
+        self.assertTrue(result.sampled)
+        self.assertEqual(result, detect_language(code, budget=None))
+        self.assertGreater(result.confidence, 0.6)
+        self.assertLess(len(counts.call_args.args[0]), 16_100)
+
+    def test_ambiguous_sample_falls_back_to_full_scan(self) -> None:
+        code = "puts x\nprint(x)\n" * 10_000
+        result = detect_language(code, budget=8_000)
+        self.assertFalse(result.sampled)
+        self.assertLess(result.confidence, 0.6)
+
+    def test_plaintext_sample_is_confident(self) -> None:
+        result = detect_language("Zwykły akapit tekstu bez kodu.\n" * 50_000, budget=8_000)
+        self.assertEqual(result.language, "Plaintext")
+        self.assertTrue(result.sampled)
+        self.assertEqual(result.confidence, 1.0)
+
+
+class FencedBlockTests(unittest.TestCase):
+    MESSAGE = """\
+Popraw proszę:
+
+```python
+from fastapi import FastAPI
+app = FastAPI()
+```
+
+~~~js
+import React from "react";
+export default function App() { return <div />; }
+~~~
+
+```
+SELECT * FROM users WHERE id = 1;
+"""
+
+    def setUp(self) -> None:
+        architect.detection_cache.clear()
+
+    def test_split_code_blocks(self) -> None:
+        blocks = split_code_blocks(self.MESSAGE)
+        self.assertEqual([block.info for block in blocks], ["python", "js", None])
+        self.assertEqual(blocks[0].code, "from fastapi import FastAPI\napp = FastAPI()\n")
+        self.assertTrue(blocks[2].code.startswith("SELECT"))  # unclosed fence runs to the end
+        self.assertEqual(split_code_blocks("print(1)")[0].code, "print(1)")
+
+    def test_blocks_detected_independently_and_memoized(self) -> None:
+        with mock.patch.object(architect, "_detect_bounded", wraps=architect._detect_bounded) as detect:
+            first = detect_blocks(self.MESSAGE)
+            second = detect_blocks(self.MESSAGE)
+
+        self.assertEqual([item.detection.language for item in first], ["Python", "JavaScript", "SQL"])
+        self.assertEqual(first[1].detection.framework, "React")
+        self.assertEqual(first, second)
+        self.assertEqual(detect.call_count, 3)
+        for item in first:
+            self.assertTrue(0.0 < item.detection.confidence <= 1.0)
+
+    def test_response_lists_blocks(self) -> None:
+        response = build_architect_response(self.MESSAGE)
+        self.assertIn("- blok 1 (python): Python, FastAPI (pewność", response)
+        self.assertIn("- blok 2 (js): JavaScript, React", response)
+        self.assertIn("- blok 3: SQL", response)
+
+
+class DetectionCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        architect.detection_cache.clear()
+
+    def test_repeated_samples_hit_the_cache(self) -> None:
+        code = "import os\n\ndef main():\n    return 1\n"
+        first = detect_language(code)
+        second = detect_language("".join(["import os\n", "\ndef main():\n    return 1\n"]))  # equal, new object
+
+        self.assertIs(first, second)
+        self.assertEqual(architect.detection_cache.info()["hits"], 1)
+        self.assertEqual(architect.detection_cache.info()["misses"], 1)
+        detect_language(code, budget=None)  # budget is part of the key
+        self.assertEqual(architect.detection_cache.info()["misses"], 2)
+
+    def test_cache_is_bounded(self) -> None:
+        cache = architect.DetectionCache(max_entries=2)
+        for index in range(3):
+            cache.put((index, index, None), DetectionResult(language="Python"))
+        self.assertEqual(cache.info()["size"], 2)
+        self.assertIsNone(cache.get((0, 0, None)))
+        self.assertIsNotNone(cache.get((2, 2, None)))
+
 
 if __name__ == "__main__":
     unittest.main()
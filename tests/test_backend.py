@@ -0,0 +1,154 @@
+import queue
+import sys
+import types
+from unittest import TestCase, mock
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("chunk has no text part")
+        return self._text
+
+
+class FakeChat:
+    def __init__(self, history):
+        self.history = list(history)
+        self.script = []
+        self.pulled = 0
+
+    def send_message(self, prompt, stream=False):
+        self.history.append(prompt)
+        return self._stream()
+
+    def _stream(self):
+        for item in self.script:
+            self.pulled += 1
+            if isinstance(item, Exception):
+                raise item
+            yield FakeChunk(item)
+
+
+class FakeModel:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.chats = []
+
+    def start_chat(self, history=None):
+        chat = FakeChat(history or [])
+        self.chats.append(chat)
+        return chat
+
+
+def _fake_genai():
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: None
+    genai.GenerationConfig = lambda **kwargs: kwargs
+    genai.GenerativeModel = FakeModel
+    genai.types = types.ModuleType("google.generativeai.types")
+    genai.types.HarmCategory = types.SimpleNamespace(
+        HARM_CATEGORY_HARASSMENT="harassment",
+        HARM_CATEGORY_HATE_SPEECH="hate",
+        HARM_CATEGORY_SEXUALLY_EXPLICIT="sexual",
+        HARM_CATEGORY_DANGEROUS_CONTENT="dangerous",
+    )
+    genai.types.HarmBlockThreshold = types.SimpleNamespace(BLOCK_ONLY_HIGH="high")
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    return {"google": google, "google.generativeai": genai, "google.generativeai.types": genai.types}
+
+
+def _import_backend():
+    # backend importuje SDK na poziomie modułu - podmieniamy je tylko na czas importu
+    with mock.patch.dict(sys.modules, _fake_genai()):
+        sys.modules.pop("backend", None)
+        import backend
+    return backend
+
+
+backend = _import_backend()
+
+
+def _settings(**overrides):
+    settings = {"model_name": "gemini-1.5-pro", "sys_instruct": "be brief", "enable_search": False, "enable_code": False, "temp": 0.2}
+    settings.update(overrides)
+    return settings
+
+
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.brain = backend.GeminiBrain(api_key="test-key")
+        self.brain.prepare_model(**_settings())
+        self.chat = self.brain.chat_session
+
+    def drain(self, out_queue):
+        items = []
+        while not out_queue.empty():
+            items.append(out_queue.get_nowait())
+        return items
+
+    def test_chunks_arrive_in_order_and_empty_parts_are_skipped(self):
+        self.chat.script = ["Hel", None, "", "lo", " world"]
+        out_queue = queue.Queue()
+        self.brain.worker_gemini_generator("hi", out_queue)
+
+        self.assertEqual(
+            self.drain(out_queue),
+            [("MSG_CHUNK", "Hel"), ("MSG_CHUNK", "lo"), ("MSG_CHUNK", " world"), ("DONE", None)],
+        )
+
+    def test_error_mid_stream_puts_error_then_done(self):
+        self.chat.script = ["partial", RuntimeError("quota exceeded")]
+        out_queue = queue.Queue()
+        self.brain.worker_gemini_generator("hi", out_queue)
+
+        self.assertEqual(
+            self.drain(out_queue),
+            [("MSG_CHUNK", "partial"), ("ERROR", "API ERROR: quota exceeded"), ("DONE", None)],
+        )
+
+    def test_closing_the_stream_stops_pulling_chunks(self):
+        self.chat.script = ["one", "two", "three"]
+        stream = self.brain.stream_query("hi")
+
+        self.assertEqual(next(stream), "one")
+        stream.close()
+        self.assertEqual(self.chat.pulled, 1)
+
+
+class ModelCacheTests(TestCase):
+    def setUp(self):
+        self.brain = backend.GeminiBrain(api_key="test-key", max_cached_models=2)
+
+    def test_same_settings_hit_the_cache(self):
+        first = self.brain.prepare_model(**_settings())
+        self.assertIs(self.brain.prepare_model(**_settings()), first)
+        self.assertEqual(len(self.brain._model_cache), 1)
+
+    def test_any_differing_setting_misses(self):
+        for change in ({"model_name": "gemini-1.5-flash"}, {"sys_instruct": "be verbose"}, {"enable_search": True}, {"temp": 0.9}):
+            brain = backend.GeminiBrain(api_key="test-key")
+            base = brain.prepare_model(**_settings())
+            self.assertIsNot(brain.prepare_model(**_settings(**change)), base, change)
+            self.assertEqual(len(brain._model_cache), 2, change)
+
+    def test_least_recently_used_model_is_evicted(self):
+        a = self.brain.prepare_model(**_settings(temp=0.1))
+        self.brain.prepare_model(**_settings(temp=0.2))
+        self.assertIs(self.brain.prepare_model(**_settings(temp=0.1)), a)  # a jest teraz najświeższy
+        self.brain.prepare_model(**_settings(temp=0.3))  # wypycha temp=0.2
+
+        keys = [key[3] for key in self.brain._model_cache]
+        self.assertEqual(keys, [0.1, 0.3])
+        self.assertIs(self.brain.prepare_model(**_settings(temp=0.1)), a)
+        self.assertEqual(len(self.brain._model_cache), 2)
+
+    def test_switching_models_carries_chat_history(self):
+        self.brain.prepare_model(**_settings())
+        self.brain.chat_session.history.append("earlier turn")
+        self.brain.prepare_model(**_settings(temp=0.7))
+        self.assertEqual(self.brain.chat_session.history, ["earlier turn"])
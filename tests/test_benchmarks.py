@@ -0,0 +1,136 @@
+from unittest import TestCase
+
+from benchmarks.harness import DEFAULT_TOLERANCE, Result, best_of, best_of_each, compare, for_scale, merge, ratio, report, with_scale
+
+
+class BenchmarkCompareTests(TestCase):
+    def test_compare_flags_regressions_in_both_directions(self):
+        baseline = report([Result("latency", 10.0, "ms"), Result("rate", 100.0, "msg/s", better="higher")], "quick")
+        current = report(
+            [
+                Result("latency", 14.0, "ms"),
+                Result("rate", 160.0, "msg/s", better="higher"),
+                Result("brand_new", 1.0, "ms"),
+            ],
+            "quick",
+        )
+
+        rows = {row["name"]: row for row in compare(current, baseline, tolerance=0.25)}
+        self.assertEqual(rows["latency"]["status"], "regression")
+        self.assertAlmostEqual(rows["latency"]["change"], 10 / 14 - 1, places=4)
+        self.assertEqual(rows["rate"]["status"], "improved")
+        self.assertEqual(rows["brand_new"]["status"], "new")
+
+    def test_small_changes_are_ok(self):
+        baseline = report([Result("latency", 10.0, "ms")], "quick")
+        current = report([Result("latency", 11.0, "ms")], "quick")
+        self.assertEqual(compare(current, baseline)[0]["status"], "ok")
+
+    def test_a_row_tolerance_replaces_the_default(self):
+        baseline = report([Result("noisy", 10.0, "ms", tolerance=0.5), Result("speedup", 4.0, "x", better="higher")], "quick")
+        current = report([Result("noisy", 18.0, "ms", tolerance=0.5), ratio("speedup", 2.5, 1.0)], "quick")
+
+        rows = {row["name"]: row for row in compare(current, baseline, tolerance=0.25)}
+        self.assertEqual(rows["noisy"]["status"], "ok")
+        self.assertEqual(rows["speedup"]["status"], "regression")
+
+
+    def test_a_tenfold_regression_fails_at_every_tolerance_the_suites_use(self):
+        from benchmarks import bench_architect, bench_context, bench_database, bench_github, bench_render, bench_startup
+
+        tolerances = {
+            DEFAULT_TOLERANCE,
+            bench_architect.TOLERANCE,
+            bench_context.TOLERANCE,
+            bench_database.TOLERANCE,
+            bench_database.FIRST_PAGE_RATIO_TOLERANCE,
+            bench_github.TOLERANCE,
+            bench_render.TOLERANCE,
+            bench_startup.TOLERANCE,
+        }
+        for tolerance in tolerances:
+            baseline = report([Result("latency", 1.0, "ms", tolerance=tolerance), Result("rate", 10.0, "x", better="higher", tolerance=tolerance)], "quick")
+            current = report([Result("latency", 10.0, "ms", tolerance=tolerance), Result("rate", 1.0, "x", better="higher", tolerance=tolerance)], "quick")
+            statuses = {row["name"]: row["status"] for row in compare(current, baseline)}
+            self.assertEqual(statuses, {"latency": "regression", "rate": "regression"}, tolerance)
+
+    def test_a_tolerance_that_cannot_fail_is_rejected(self):
+        baseline = report([Result("latency", 1.0, "ms")], "quick")
+        current = report([Result("latency", 1000.0, "ms", tolerance=1.0)], "quick")
+        with self.assertRaises(ValueError):
+            compare(current, baseline)
+
+
+class BaselineScaleTests(TestCase):
+    def test_each_scale_keeps_its_own_report(self):
+        quick = report([Result("context.cold.24files", 5.0, "ms")], "quick")
+        full = report([Result("context.cold.204files", 1500.0, "ms")], "full")
+
+        stored = with_scale(with_scale({}, "full", full), "quick", quick)
+        self.assertEqual(list(stored["scales"]), ["quick", "full"])
+        self.assertIs(for_scale(stored, "quick"), quick)
+        self.assertIs(for_scale(stored, "full"), full)
+        self.assertIsNone(for_scale(stored, "default"))
+
+    def test_a_single_report_file_counts_for_its_own_scale(self):
+        legacy = report([Result("db.insert.1e3", 100.0, "msg/s")], "full")
+        self.assertIs(for_scale(legacy, "full"), legacy)
+        self.assertIsNone(for_scale(legacy, "quick"))
+
+        stored = with_scale(legacy, "quick", report([], "quick"))
+        self.assertIs(stored["scales"]["full"], legacy)
+
+
+class BestOfTests(TestCase):
+    def test_short_calls_are_repeated_until_the_sample_is_long_enough(self):
+        calls = []
+        seconds = best_of(lambda: calls.append(1), repeat=2, min_time=0.01)
+        self.assertGreater(len(calls), 2)
+        self.assertLess(seconds, 0.01)
+
+    def test_each_function_gets_its_own_best_time(self):
+        order = []
+        best = best_of_each({"a": lambda: order.append("a"), "b": lambda: order.append("b")}, repeat=2, min_time=0)
+        self.assertEqual(order, ["a", "b", "a", "b"])
+        self.assertEqual(set(best), {"a", "b"})
+
+
+class BaselineMergeTests(TestCase):
+    def test_only_the_suites_run_are_replaced(self):
+        previous = report([Result("db.insert.1e3", 100.0, "msg/s"), Result("detect.full.1KB", 5.0, "MB/s")], "quick")
+        current = report([Result("db.insert.1e3", 120.0, "msg/s"), Result("db.search.1e3", 1.0, "ms")], "quick")
+
+        merged = merge(previous, current, ["db"])
+        values = {row["name"]: row["value"] for row in merged["results"]}
+        self.assertEqual(values, {"detect.full.1KB": 5.0, "db.insert.1e3": 120.0, "db.search.1e3": 1.0})
+
+    def test_rows_of_a_dropped_benchmark_go_with_their_suite(self):
+        previous = report([Result("db.old_metric.1e3", 1.0, "ms")], "quick")
+        merged = merge(previous, report([Result("db.insert.1e3", 1.0, "msg/s")], "quick"), ["db"])
+        self.assertEqual([row["name"] for row in merged["results"]], ["db.insert.1e3"])
+
+    def test_a_skipped_suite_keeps_its_stored_rows(self):
+        previous = report([Result("startup.imports.main", 400.0, "ms")], "default", {"context": "no SDK"})
+        current = report([], "quick", {"startup": "no display", "github": "offline"})
+
+        merged = merge(previous, current, ["startup", "github"])
+        self.assertEqual([row["name"] for row in merged["results"]], ["startup.imports.main"])
+        self.assertEqual(merged["meta"]["skipped"], {"context": "no SDK", "github": "offline"})
+
+
+class ImportTimeParseTests(TestCase):
+    def test_parse_keeps_depth_and_sums_top_level(self):
+        from benchmarks.bench_startup import parse_importtime, total_import_us
+
+        text = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     _json",
+            "import time:       300 |        420 |   json.decoder",
+            "import time:       500 |        920 | json",
+            "import time:        80 |         80 | backend",
+            "unrelated stderr line",
+        ])
+        rows = parse_importtime(text)
+        self.assertEqual(rows[0], (2, "_json", 120, 120))
+        self.assertEqual(rows[2], (0, "json", 500, 920))
+        self.assertEqual(total_import_us(rows), 1000)
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from ui.chat_model import ChatTranscript, estimate_height
+
+
+class ChatTranscriptTests(TestCase):
+    def test_estimate_grows_with_wrapped_lines_and_ignores_markup(self):
+        short = estimate_height("hello", 400)
+        wrapped = estimate_height("x" * 200, 400)
+        self.assertGreater(wrapped, short)
+        self.assertEqual(estimate_height("[b]hello[/b]", 400), short)
+        self.assertEqual(estimate_height("a\nb\nc", 400), estimate_height("a", 400) + 40)
+
+    def test_estimate_separates_row_chrome_from_text_width(self):
+        # 100 chars in 400 - 220 = 180 px at 9 px per char: 20 per line, 5 lines
+        self.assertEqual(estimate_height("x" * 100, 400, char_width=9, line_height=20, padding=88, inset=220), 188)
+        self.assertEqual(estimate_height("x" * 100, 400, padding=88), estimate_height("x" * 100, 400, padding=88, inset=88))
+
+        transcript = ChatTranscript(estimate=lambda text, width: 42.0)
+        index = transcript.append("hello")
+        self.assertEqual(transcript.row(index, 400)["height"], 42.0)
+
+    def test_rows_use_measured_height_per_width(self):
+        transcript = ChatTranscript()
+        index = transcript.append("hello", is_user=True, text_color=(1, 1, 1, 1))
+
+        self.assertEqual(transcript.row(index, 400)["height"], estimate_height("hello", 400))
+        self.assertTrue(transcript.remember_height(index, 400, 73))
+        self.assertFalse(transcript.remember_height(index, 400, 73))
+
+        row = transcript.row(index, 400)
+        self.assertEqual(
+            row,
+            {"text": "hello", "is_user": True, "source": "hello", "index": 0, "height": 73, "text_color": (1, 1, 1, 1)},
+        )
+        self.assertEqual(transcript.row(index, 250)["height"], estimate_height("hello", 250))
+
+    def test_text_change_drops_measured_heights(self):
+        transcript = ChatTranscript()
+        index = transcript.append("part")
+        transcript.remember_height(index, 400, 50)
+
+        transcript.append_text(index, " two")
+        self.assertEqual(transcript[index].text, "part two")
+        self.assertEqual(transcript.height(index, 400), estimate_height("part two", 400))
+        self.assertFalse(transcript.remember_height(5, 400, 50))
+
+    def test_prepend_shifts_indices_and_keeps_measurements(self):
+        transcript = ChatTranscript()
+        transcript.extend([("newer", False)])
+        transcript.remember_height(0, 400, 61)
+
+        self.assertEqual(transcript.prepend([("old 1", True), ("old 2", False)]), 2)
+        self.assertEqual([row["text"] for row in transcript.rows(400)], ["old 1", "old 2", "newer"])
+        self.assertEqual(transcript.row(2, 400)["index"], 2)
+        self.assertEqual(transcript.height(2, 400), 61)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from core.context import (
+    TRIM_MARKER,
+    build_context_window,
+    estimate_tokens,
+    trim_text,
+)
+
+
+def _messages(*contents):
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": text} for i, text in enumerate(contents)]
+
+
+class ContextWindowTests(TestCase):
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd"), 1)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+    def test_trim_text_keeps_head_and_tail_within_budget(self):
+        text = "HEAD" + "x" * 4000 + "TAIL"
+        trimmed = trim_text(text, 100)
+        self.assertTrue(trimmed.startswith("HEAD"))
+        self.assertTrue(trimmed.endswith("TAIL"))
+        self.assertIn(TRIM_MARKER, trimmed)
+        self.assertLessEqual(estimate_tokens(trimmed), 100)
+        self.assertEqual(trim_text("short", 100), "short")
+
+    def test_small_budgets_are_never_exceeded(self):
+        history = _messages("a" * 4000, "b" * 9, "c" * 30)
+        for budget in range(0, 20):
+            for max_message_tokens in (None, 1, 5):
+                window = build_context_window(reversed(history), token_budget=budget, max_message_tokens=max_message_tokens)
+                used = sum(estimate_tokens(m["content"]) for m in window.messages)
+                self.assertLessEqual(used, budget, (budget, max_message_tokens))
+                self.assertEqual(window.total_tokens, used)
+            self.assertLessEqual(estimate_tokens(trim_text("z" * 400, budget)), budget)
+
+    def test_selects_newest_messages_that_fit(self):
+        history = _messages("a" * 400, "b" * 400, "c" * 400)  # 100 tokens each, oldest first
+        window = build_context_window(reversed(history), token_budget=250, max_message_tokens=200)
+
+        self.assertEqual([m["content"][0] for m in window.messages], ["b", "c"])
+        self.assertEqual(window.trimmed, 0)
+        self.assertTrue(window.truncated)
+        self.assertEqual(window.total_tokens, 200)
+
+    def test_partially_fitting_message_is_trimmed(self):
+        history = _messages("a" * 4000, "b" * 400)
+        window = build_context_window(reversed(history), token_budget=400)
+
+        self.assertEqual(len(window.messages), 2)
+        self.assertIn(TRIM_MARKER, window.messages[0]["content"])
+        self.assertEqual(window.trimmed, 1)
+        self.assertLessEqual(window.total_tokens, 400)
+
+    def test_huge_single_message_is_capped(self):
+        window = build_context_window([{"role": "user", "content": "z" * 200_000}], token_budget=1_000)
+        self.assertLessEqual(window.total_tokens, 500)
+
+    def test_uses_cached_token_counts_and_stops_early(self):
+        consumed = []
+
+        def rows():
+            for i in range(1000):
+                consumed.append(i)
+                yield {"role": "user", "content": "x", "token_count": 100}
+
+        window = build_context_window(rows(), token_budget=1_000, max_message_tokens=500)
+        self.assertEqual(len(window.messages), 10)
+        self.assertLess(len(consumed), 20)
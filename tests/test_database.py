@@ -0,0 +1,286 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase
+
+from core.database import DatabaseManager
+
+
+class DatabaseManagerTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "history.db")
+        self.db = DatabaseManager(self.db_path, batch_size=8, flush_interval=5.0)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_reads_see_queued_writes(self):
+        session_id = self.db.create_session("demo")
+        self.db.add_message(session_id, "user", "hello")
+        self.db.add_message(session_id, "assistant", "hi")
+
+        self.assertEqual(
+            self.db.get_messages(session_id),
+            [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}],
+        )
+
+    def test_flush_persists_for_other_connections(self):
+        session_id = self.db.create_session("demo")
+        for i in range(20):
+            self.db.add_message(session_id, "user", f"msg {i}")
+        self.db.flush()
+
+        with sqlite3.connect(self.db_path) as other:
+            count = other.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        self.assertEqual(count, 20)
+
+    def test_close_writes_pending_messages(self):
+        session_id = self.db.create_session("demo")
+        self.db.add_message(session_id, "user", "last words")
+        self.db.close()
+
+        reopened = DatabaseManager(self.db_path)
+        try:
+            self.assertEqual(reopened.get_messages(session_id), [{"role": "user", "content": "last words"}])
+        finally:
+            reopened.close()
+
+    def test_add_message_after_close_raises(self):
+        self.db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db.add_message(1, "user", "late")
+
+    def test_failed_write_drops_only_bad_row_and_surfaces_on_flush(self):
+        session_id = self.db.create_session("demo")
+        with self.db.conn:
+            self.db.conn.execute(
+                "CREATE TRIGGER reject_bad BEFORE INSERT ON messages WHEN new.content = 'bad' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        for content in ("a", "bad", "b"):
+            self.db.add_message(session_id, "user", content)
+
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.db.flush()
+        self.assertEqual([m["content"] for m in self.db.get_messages(session_id)], ["a", "b"])
+        self.db.flush()  # błąd zgłaszany tylko raz
+
+    def test_delete_session_is_atomic(self):
+        session_id = self.db.create_session("demo")
+        self.db.add_message(session_id, "user", "keep me")
+        with self.db.conn:
+            self.db.conn.execute(
+                "CREATE TRIGGER keep_sessions BEFORE DELETE ON sessions BEGIN SELECT RAISE(ABORT, 'locked'); END"
+            )
+        self.db.delete_session(session_id)
+
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.db.flush()
+        self.assertEqual(self.db.get_messages(session_id), [{"role": "user", "content": "keep me"}])
+
+    def test_delete_session_removes_messages(self):
+        keep = self.db.create_session("keep")
+        drop = self.db.create_session("drop")
+        self.db.add_message(keep, "user", "a")
+        self.db.add_message(drop, "user", "b")
+        self.db.delete_session(drop)
+
+        self.assertEqual([row[0] for row in self.db.get_sessions()], [keep])
+        self.assertEqual(self.db.get_messages(drop), [])
+
+    def test_session_index_migration(self):
+        indexes = [row[1] for row in self.db.conn.execute("PRAGMA index_list('messages')")]
+        self.assertIn("idx_messages_session_id", indexes)
+        plan = " ".join(
+            str(row[-1])
+            for row in self.db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT role FROM messages WHERE session_id = ? ORDER BY id", (1,)
+            )
+        )
+        self.assertIn("idx_messages_session_id", plan)
+        self.assertGreaterEqual(self.db.conn.execute("PRAGMA user_version").fetchone()[0], 1)
+
+    def test_iter_messages_pages_by_key(self):
+        session_id = self.db.create_session("long")
+        other = self.db.create_session("other")
+        for i in range(25):
+            self.db.add_message(session_id, "user", f"msg {i}")
+            self.db.add_message(other, "user", "noise")
+
+        contents = [m["content"] for m in self.db.iter_messages(session_id, page_size=10)]
+        self.assertEqual(contents, [f"msg {i}" for i in range(25)])
+
+        first_page = self.db.get_messages_page(session_id, page_size=10)
+        resumed = list(self.db.iter_messages(session_id, after_id=first_page[-1]["id"], page_size=10))
+        self.assertEqual(resumed[0]["content"], "msg 10")
+        self.assertEqual(len(resumed), 15)
+
+    def test_search_messages_ranks_and_filters_by_session(self):
+        first = self.db.create_session("first")
+        second = self.db.create_session("second")
+        self.db.add_message(first, "user", "Jak naprawić błąd w FastAPI?")
+        self.db.add_message(first, "assistant", "Sprawdź router w fastapi i dependency injection.")
+        self.db.add_message(second, "user", "Kivy layout problem")
+
+        hits = self.db.search_messages("fastapi")
+        self.assertEqual({hit["session_id"] for hit in hits}, {first})
+        self.assertEqual(len(hits), 2)
+        self.assertIn("[b]", hits[0]["snippet"])
+
+        self.assertEqual(self.db.search_messages("kivy", session_id=first), [])
+        self.assertEqual(len(self.db.search_messages("bład")), 1)  # bez polskich znaków
+        self.assertEqual(self.db.search_messages('"unbalanced'), [])
+        self.assertEqual(self.db.search_messages("   "), [])
+
+    def test_search_index_follows_deletes_and_backfills(self):
+        session_id = self.db.create_session("temp")
+        self.db.add_message(session_id, "user", "ephemeral needle")
+        self.db.delete_session(session_id)
+        self.assertEqual(self.db.search_messages("needle"), [])
+
+        self.db.close()
+        with sqlite3.connect(self.db_path) as raw:
+            raw.execute("DROP TABLE messages_fts")
+            raw.execute("DROP TRIGGER messages_fts_ai")
+            raw.execute("PRAGMA user_version = 1")
+            raw.execute("INSERT INTO messages (session_id, role, content) VALUES (1, 'user', 'legacy haystack')")
+
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(len(self.db.search_messages("haystack")), 1)
+
+    def test_missing_search_index_is_created_on_open(self):
+        # Baza zmigrowana na SQLite bez FTS5: wersja już podbita, tabeli brak
+        self.db.close()
+        with sqlite3.connect(self.db_path) as raw:
+            raw.execute("DROP TABLE messages_fts")
+            for trigger in ("messages_fts_ai", "messages_fts_ad", "messages_fts_au"):
+                raw.execute(f"DROP TRIGGER {trigger}")
+            raw.execute("INSERT INTO messages (session_id, role, content) VALUES (1, 'user', 'orphan haystack')")
+
+        self.db = DatabaseManager(self.db_path)
+        self.assertTrue(self.db.fts_enabled)
+        self.assertEqual(len(self.db.search_messages("haystack")), 1)
+
+    def test_search_snippet_escapes_markup(self):
+        session_id = self.db.create_session("markup")
+        self.db.add_message(session_id, "user", "list[0] & [color=ff0000]needle[/color]")
+
+        snippet = self.db.search_messages("needle")[0]["snippet"]
+        self.assertEqual(snippet, "list&bl;0&br; &amp; &bl;color=ff0000&br;[b]needle[/b]&bl;/color&br;")
+
+    def test_context_messages_follow_token_budget(self):
+        session_id = self.db.create_session("ctx")
+        self.db.add_message(session_id, "user", "old " * 5000)
+        for i in range(5):
+            self.db.add_message(session_id, "assistant", f"reply {i}")
+
+        context = self.db.get_context_messages(session_id, token_budget=200)
+        self.assertEqual(context[-1], {"role": "assistant", "content": "reply 4"})
+        self.assertEqual(len(context), 6)
+        self.assertLess(len(context[0]["content"]), 1000)
+
+        self.assertEqual(len(self.db.get_context_messages(session_id, 3)), 3)
+
+    def test_token_counts_stored_and_backfilled(self):
+        session_id = self.db.create_session("tokens")
+        self.db.add_message(session_id, "user", "x" * 40)
+        self.db.flush()
+        self.assertEqual(self.db.conn.execute("SELECT token_count FROM messages").fetchone()[0], 10)
+
+        self.db.close()
+        with sqlite3.connect(self.db_path) as raw:
+            raw.execute("UPDATE messages SET token_count = NULL")
+            raw.execute("ALTER TABLE messages DROP COLUMN token_count")
+            raw.execute("PRAGMA user_version = 2")
+
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(self.db.conn.execute("SELECT token_count FROM messages").fetchone()[0], 10)
+
+    def test_session_stats_from_cached_counts(self):
+        session_id = self.db.create_session("stats")
+        self.db.add_message(session_id, "user", "zażółć")  # 6 znaków, 10 bajtów
+        self.db.add_message(session_id, "assistant", "y" * 400)
+        self.db.add_message(self.db.create_session("other"), "user", "ignored")
+
+        stats = self.db.session_stats(session_id)
+        self.assertEqual(stats["message_count"], 2)
+        self.assertEqual(stats["token_count"], 2 + 100)
+        self.assertEqual(stats["byte_count"], 10 + 400)
+        self.assertEqual(stats["by_role"]["user"], {"message_count": 1, "token_count": 2, "byte_count": 10})
+        self.assertEqual(self.db.session_stats(9999)["message_count"], 0)
+
+    def test_byte_counts_backfilled(self):
+        session_id = self.db.create_session("bytes")
+        self.db.add_message(session_id, "user", "ąę")
+        self.db.close()
+        with sqlite3.connect(self.db_path) as raw:
+            raw.execute("ALTER TABLE messages DROP COLUMN byte_count")
+            raw.execute("PRAGMA user_version = 3")
+
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(self.db.session_stats(session_id)["byte_count"], 4)
+
+    def test_sessions_page_reads_cached_metadata_by_key(self):
+        ids = [self.db.create_session(f"s{i}") for i in range(7)]
+        for i in range(3):
+            self.db.add_message(ids[2], "user", f"m{i}")
+        self.db.flush()
+        with self.db.conn:
+            for offset, session_id in enumerate(ids):
+                self.db.conn.execute(
+                    "UPDATE sessions SET last_activity = ? WHERE id = ?", (f"2024-05-01 12:00:0{offset}", session_id)
+                )
+            self.db.conn.execute("UPDATE sessions SET last_activity = '2024-06-01 00:00:00' WHERE id = ?", (ids[2],))
+
+        seen, before = [], None
+        while True:
+            page = self.db.get_sessions_page(before, page_size=3)
+            seen.extend(page)
+            if len(page) < 3:
+                break
+            before = (page[-1]["last_activity"], page[-1]["id"])
+
+        self.assertEqual([row["id"] for row in seen], [ids[2], ids[6], ids[5], ids[4], ids[3], ids[1], ids[0]])
+        self.assertEqual(seen[0]["message_count"], 3)
+        plan = " ".join(
+            str(row[-1])
+            for row in self.db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id, title, message_count, last_activity FROM sessions "
+                "WHERE (last_activity, id) < (?, ?) ORDER BY last_activity DESC, id DESC LIMIT 50",
+                ("2024-05-01", 1),
+            )
+        )
+        self.assertIn("idx_sessions_last_activity", plan)
+        self.assertNotIn("messages", plan)
+
+    def test_session_activity_follows_messages_and_backfills(self):
+        session_id = self.db.create_session("activity")
+        self.db.add_message(session_id, "user", "a")
+        self.db.add_message(session_id, "assistant", "b")
+        meta = self.db.get_session(session_id)
+        newest = self.db.conn.execute("SELECT MAX(timestamp) FROM messages").fetchone()[0]
+        self.assertEqual((meta["message_count"], meta["last_activity"]), (2, newest))
+
+        self.db.close()
+        with sqlite3.connect(self.db_path) as raw:
+            raw.execute("UPDATE sessions SET message_count = 0, last_activity = NULL")
+            raw.execute("PRAGMA user_version = 4")
+
+        self.db = DatabaseManager(self.db_path)
+        self.assertEqual(self.db.get_session(session_id)["message_count"], 2)
+        self.db.delete_session(session_id)
+        self.assertIsNone(self.db.get_session(session_id))
+
+    def test_messages_before_returns_newest_page_first(self):
+        session_id = self.db.create_session("long")
+        for i in range(12):
+            self.db.add_message(session_id, "user", f"msg {i}")
+
+        newest = self.db.get_messages_before(session_id, page_size=5)
+        self.assertEqual([m["content"] for m in newest], [f"msg {i}" for i in range(7, 12)])
+        older = self.db.get_messages_before(session_id, newest[0]["id"], page_size=5)
+        self.assertEqual([m["content"] for m in older], [f"msg {i}" for i in range(2, 7)])
+        oldest = self.db.get_messages_before(session_id, older[0]["id"], page_size=5)
+        self.assertEqual([m["content"] for m in oldest], ["msg 0", "msg 1"])
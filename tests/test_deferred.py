@@ -0,0 +1,37 @@
+import threading
+from unittest import TestCase
+
+from ui.deferred import Deferred, import_modules
+
+
+class DeferredTests(TestCase):
+    def test_factory_runs_once_and_reports_ready(self):
+        calls, seen = [], []
+        gate = threading.Event()
+
+        def factory():
+            gate.wait(1)
+            calls.append(1)
+            return "brain"
+
+        loader = Deferred(factory, on_ready=seen.append)
+        loader.start()
+        self.assertIsNone(loader.get(timeout=0))
+        gate.set()
+
+        self.assertEqual(loader.get(timeout=1), "brain")
+        self.assertEqual(loader.get(), "brain")
+        self.assertTrue(loader.ready)
+        self.assertEqual(calls, [1])
+        self.assertEqual(seen, ["brain"])
+
+    def test_failure_is_kept_and_yields_none(self):
+        def factory():
+            raise RuntimeError("no api key")
+
+        loader = Deferred(factory)
+        self.assertIsNone(loader.get(timeout=1))
+        self.assertIsInstance(loader.error, RuntimeError)
+
+    def test_import_modules_returns_failures(self):
+        self.assertEqual(import_modules(["json", "no_such_module_here"]), ["no_such_module_here"])
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from core.file_context import FileContextCache, render_excerpt_block, render_file_block
+
+
+class FileContextCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def test_build_context_preserves_order_and_format(self):
+        first = self._write("a.py", "print(1)")
+        second = self._write("image.png", "not text")
+
+        context = FileContextCache().build_context([first, second])
+
+        self.assertEqual(
+            context,
+            "\n--- PLIK: a.py ---\nprint(1)\n"
+            "\n[INFO] Plik image.png dołączony (tryb binarny pominięty w podglądzie).\n",
+        )
+
+    def test_unchanged_files_are_not_reread(self):
+        paths = [self._write(f"f{i}.txt", f"content {i}") for i in range(5)]
+        cache = FileContextCache()
+        first = cache.build_context(paths)
+
+        with mock.patch("builtins.open", side_effect=AssertionError("disk read")):
+            second = cache.build_context(paths)
+
+        self.assertEqual(first, second)
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+
+    def test_changed_file_is_reread(self):
+        path = self._write("notes.md", "v1")
+        cache = FileContextCache()
+        cache.get_block(path)
+
+        self._write("notes.md", "version two")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertIn("version two", cache.get_block(path))
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        block_len = len(render_file_block(self._write("a.txt", "x" * 100)))
+        cache = FileContextCache(max_chars=block_len * 2)
+        a, b, c = (self._write(n, "x" * 100) for n in ("a.txt", "b.txt", "c.txt"))
+        cache.build_context([a, b])
+        cache.get_block(a)
+        cache.get_block(c)
+
+        cache.get_block(a)
+        cache.get_block(b)
+        self.assertEqual(cache.misses, 4)
+
+    def test_missing_file_reports_error(self):
+        block = FileContextCache().get_block(os.path.join(self.tmp.name, "missing.py"))
+        self.assertIn("[ERROR]", block)
+
+    def test_parallel_loading_keeps_input_order(self):
+        paths = [self._write(f"f{i:03d}.txt", f"body {i}") for i in range(50)]
+        context = FileContextCache(max_workers=8).build_context(paths)
+
+        positions = [context.index(f"--- PLIK: f{i:03d}.txt ---") for i in range(50)]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_oversized_file_is_excerpted(self):
+        lines = [f"line {i} ok" for i in range(20_000)]
+        lines[10_000] = "line 10000 ERROR database exploded"
+        path = self._write("big.log", "\n".join(lines) + "\n")
+
+        block = FileContextCache(max_file_bytes=50_000).get_block(path)
+
+        self.assertIn("(fragmenty,", block)
+        self.assertIn("line 0 ok", block)
+        self.assertIn("ERROR database exploded", block)
+        self.assertIn("line 19999 ok", block)
+        self.assertNotIn("line 5000 ok", block)
+        self.assertLess(len(block.encode("utf-8")), 60_000)
+
+    def test_encoding_fallbacks(self):
+        path = os.path.join(self.tmp.name, "legacy.txt")
+        with open(path, "wb") as handle:
+            handle.write("zażółć gęślą jaźń".encode("cp1250"))
+        self.assertIn("zażółć gęślą jaźń", render_file_block(path))
+
+        with open(path, "wb") as handle:
+            handle.write("﻿bom text".encode("utf-8"))
+        self.assertIn("\nbom text\n", render_file_block(path))
+
+        with open(path, "wb") as handle:
+            handle.write("utf16 tekst".encode("utf-16"))
+        self.assertIn("utf16 tekst", render_file_block(path))
+
+    def test_excerpt_respects_byte_cap_with_many_matches(self):
+        path = self._write("noisy.log", "".join(f"warn {i}\n" for i in range(200_000)))
+        block = render_excerpt_block(path, max_bytes=20_000)
+        self.assertIn("[PASUJĄCE LINIE]", block)
+        self.assertLess(len(block.encode("utf-8")), 22_000)
+
+    def test_excerpt_of_single_huge_line_stays_bounded(self):
+        path = self._write("minified.js", "ą" * 500_000 + " error " + "ę" * 500_000)
+        block = render_excerpt_block(path, max_bytes=40_000)
+        self.assertLess(len(block.encode("utf-8")), 42_000)
+        self.assertIn("error", block)
+        self.assertNotIn("�", block)
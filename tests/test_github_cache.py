@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from core.github_cache import GitHubCache
+
+
+class GitHubCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_and_lookup_round_trip(self):
+        cache = GitHubCache(self.tmp.name)
+        cache.store("octo/repo", "main", "src/app.py", "ab" * 20, b"print(1)", etag='"xyz"')
+
+        entry = GitHubCache(self.tmp.name).lookup("octo/repo", "main", "src/app.py")
+        self.assertEqual((entry.etag, entry.sha, entry.content), ('"xyz"', "ab" * 20, b"print(1)"))
+        self.assertIsNone(cache.lookup("octo/repo", "dev", "src/app.py"))
+        self.assertEqual(cache.get_blob("ab" * 20), b"print(1)")
+
+    def test_least_recently_used_blobs_are_evicted(self):
+        cache = GitHubCache(self.tmp.name, max_bytes=250)
+        for index, sha in enumerate(("a1" * 20, "b2" * 20)):
+            cache.store("octo/repo", "main", f"f{index}", sha, b"x" * 100)
+            time.sleep(0.01)
+        cache.get_blob("a1" * 20)  # refresh the older blob
+        time.sleep(0.01)
+        cache.store("octo/repo", "main", "f2", "c3" * 20, b"y" * 100)
+
+        self.assertIsNotNone(cache.lookup("octo/repo", "main", "f0"))
+        self.assertIsNone(cache.lookup("octo/repo", "main", "f1"))
+        self.assertIsNotNone(cache.lookup("octo/repo", "main", "f2"))
+
+    def _records(self):
+        index = os.path.join(self.tmp.name, "octo_repo", ".index")
+        return sorted(os.listdir(index))
+
+    def test_evicted_blobs_take_their_records_along(self):
+        cache = GitHubCache(self.tmp.name, max_bytes=250)
+        cache.store("octo/repo", "main", "a", "a1" * 20, b"x" * 100)
+        cache.store("octo/repo", "dev", "a", "a1" * 20, b"x" * 100)
+        cache.store("octo/repo", "main", "b", "b2" * 20, b"x" * 100)
+        self.assertEqual(len(self._records()), 3)
+
+        cache.store("octo/repo", "main", "c", "c3" * 20, b"y" * 100)
+        self.assertEqual(len(self._records()), 2)
+        self.assertIsNone(cache.lookup("octo/repo", "dev", "a"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, ".blobs", "a1", "a1" * 20)))
+
+    def test_disk_is_scanned_once_and_orphan_records_dropped(self):
+        GitHubCache(self.tmp.name).store("octo/repo", "main", "a", "a1" * 20, b"x" * 100)
+        os.remove(os.path.join(self.tmp.name, ".blobs", "a1", "a1" * 20))
+
+        cache = GitHubCache(self.tmp.name, max_bytes=250)
+        cache.store("octo/repo", "main", "b", "b2" * 20, b"x" * 100)
+        self.assertEqual(len(self._records()), 1)
+        with mock.patch("core.github_cache.os.walk", side_effect=AssertionError("rescanned")):
+            for index in range(5):
+                cache.store("octo/repo", "main", f"f{index}", f"{index:02d}" * 20, b"z" * 100)
+        self.assertEqual(cache._total, 200)
+        self.assertEqual(len(self._records()), 2)
+
+    def test_rejects_non_hex_sha(self):
+        cache = GitHubCache(self.tmp.name)
+        cache.store("octo/repo", "main", "a", "../../etc", b"data")
+        self.assertIsNone(cache.lookup("octo/repo", "main", "a"))
+        self.assertEqual(os.listdir(self.tmp.name), [])
@@ -1,19 +1,30 @@
 import base64
+import http.client
+import os
+import tempfile
 import json
-import urllib.request
 from unittest import TestCase, mock
 
+from benchmarks.github_stub import StubGitHubServer, git_blob_sha
+from core.github_cache import GitHubCache
 from core.github_client import (
+    GitHubBatchError,
     GitHubFetcher,
     GitHubFetchError,
+    RateLimitScheduler,
     sanitize_repo_path,
     sanitize_repository,
+    _ConnectionPool,
 )
 
 
 class DummyResponse:
+    status = 200
+    reason = "OK"
+
     def __init__(self, payload: bytes):
         self.payload = payload
+        self.headers = {}
 
     def read(self):
         return self.payload
@@ -30,7 +41,7 @@ class GitHubFetcherTests(TestCase):
         encoded = base64.b64encode(b"hello world").decode("utf-8")
         payload = json.dumps({"content": encoded}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher()
             result = fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
 
@@ -39,7 +50,7 @@ class GitHubFetcherTests(TestCase):
     def test_fetch_files_raises_on_missing_content(self):
         payload = json.dumps({"name": "file.txt"}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher()
             with self.assertRaises(GitHubFetchError):
                 fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
@@ -49,12 +60,12 @@ class GitHubFetcherTests(TestCase):
         payload = json.dumps({"content": encoded}).encode("utf-8")
         captured_headers = {}
 
-        def fake_urlopen(request, timeout=10):
+        def fake_urlopen(request):
             captured_headers["Authorization"] = request.get_header("Authorization")
             captured_headers["User-Agent"] = request.get_header("User-agent")
             return DummyResponse(payload)
 
-        with mock.patch.object(urllib.request, "urlopen", side_effect=fake_urlopen):
+        with mock.patch.object(GitHubFetcher, "_urlopen", side_effect=fake_urlopen):
             fetcher = GitHubFetcher(token="secret")
             fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="dev")
 
@@ -69,7 +80,7 @@ class GitHubFetcherTests(TestCase):
     def test_rejects_non_base64_encoding(self):
         payload = json.dumps({"encoding": "gzip", "content": "abc"}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher()
             with self.assertRaises(GitHubFetchError):
                 fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
@@ -78,7 +89,7 @@ class GitHubFetcherTests(TestCase):
         encoded = base64.b64encode(b"content").decode("utf-8")
         payload = json.dumps({"content": encoded, "size": 2_000_000}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher(max_bytes=1)
             with self.assertRaises(GitHubFetchError):
                 fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
@@ -87,7 +98,7 @@ class GitHubFetcherTests(TestCase):
         encoded = "a" * 3_000_000
         payload = json.dumps({"content": encoded}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher(max_bytes=1)
             with self.assertRaises(GitHubFetchError):
                 fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
@@ -98,7 +109,7 @@ class GitHubFetcherTests(TestCase):
         encoded = base64.b64encode(content).decode("utf-8")
         payload = json.dumps({"content": encoded}).encode("utf-8")
 
-        with mock.patch.object(urllib.request, "urlopen", return_value=DummyResponse(payload)):
+        with mock.patch.object(GitHubFetcher, "_urlopen", return_value=DummyResponse(payload)):
             fetcher = GitHubFetcher(max_bytes=5)
             with self.assertRaises(GitHubFetchError):
                 fetcher.fetch_files("octocat/Hello-World", ["README.md"], branch="main")
@@ -129,3 +140,287 @@ class GitHubFetcherTests(TestCase):
             "https://api.github.com/repos/octocat/Hello-World/contents/docs/Read%20me.md?ref=feature%2Fnew%20branch",
             request.full_url,
         )
+
+
+class GitHubFetcherStubServerTests(TestCase):
+    def test_fetches_concurrently_over_keepalive_connections(self):
+        files = {f"src/mod_{i}.py": f"value = {i}\n".encode() for i in range(16)}
+        with StubGitHubServer(files, delay=0.05) as server:
+            fetcher = GitHubFetcher(api_url=server.url, max_workers=4)
+            result = fetcher.fetch_files("octocat/Hello-World", list(files), branch="main")
+            fetcher.fetch_files("octocat/Hello-World", list(files), branch="main")
+            fetcher.close()
+
+        self.assertEqual(result, {path: body.decode() for path, body in files.items()})
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.connections, 4)
+        self.assertEqual(len(server.requests), 32)
+
+    def test_collects_per_file_errors(self):
+        with StubGitHubServer({"ok.txt": b"fine"}) as server:
+            fetcher = GitHubFetcher(api_url=server.url)
+            report = fetcher.fetch_report("octocat/Hello-World", ["ok.txt", "missing.txt"])
+            with self.assertRaises(GitHubBatchError) as ctx:
+                fetcher.fetch_files("octocat/Hello-World", ["missing.txt", "ok.txt"])
+
+        self.assertEqual(report.files, {"ok.txt": "fine"})
+        self.assertIn("HTTP 404", report.errors["missing.txt"])
+        self.assertEqual(ctx.exception.report.files, {"ok.txt": "fine"})
+        self.assertIsInstance(ctx.exception, GitHubFetchError)
+
+    def test_connection_errors_are_reported_per_file(self):
+        with StubGitHubServer({}) as server:
+            url = server.url
+        fetcher = GitHubFetcher(api_url=url, timeout=1)
+        report = fetcher.fetch_report("octocat/Hello-World", ["a.txt", "b.txt"])
+        self.assertEqual(set(report.errors), {"a.txt", "b.txt"})
+
+
+class GitHubFetcherCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_root = os.path.join(self.tmp.name, "github_cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_conditional_requests_reuse_cached_content(self):
+        files = {"README.md": b"# hello\n" * 20}
+        with StubGitHubServer(files) as server:
+            first = GitHubFetcher(api_url=server.url, cache=GitHubCache(self.cache_root))
+            self.assertEqual(first.fetch_files("octocat/Hello-World", ["README.md"]), {"README.md": "# hello\n" * 20})
+
+            # A fresh fetcher (e.g. after restart) revalidates from disk and gets a 304.
+            second = GitHubFetcher(api_url=server.url, cache=GitHubCache(self.cache_root))
+            self.assertEqual(second.fetch_files("octocat/Hello-World", ["README.md"]), {"README.md": "# hello\n" * 20})
+
+            server.files["README.md"] = b"changed"
+            self.assertEqual(second.fetch_files("octocat/Hello-World", ["README.md"]), {"README.md": "changed"})
+
+        conditional = [headers.get("If-None-Match") for _, headers in server.requests]
+        self.assertIsNone(conditional[0])
+        self.assertEqual(conditional[1], f'"{git_blob_sha(files["README.md"])}"')
+        self.assertTrue(os.path.isdir(os.path.join(self.cache_root, "octocat_Hello-World")))
+
+    def test_cache_is_keyed_by_ref(self):
+        with StubGitHubServer({"a.txt": b"A"}) as server:
+            fetcher = GitHubFetcher(api_url=server.url, cache=GitHubCache(self.cache_root))
+            fetcher.fetch_files("octocat/Hello-World", ["a.txt"], branch="main")
+            fetcher.fetch_files("octocat/Hello-World", ["a.txt"], branch="dev")
+
+        self.assertEqual([headers.get("If-None-Match") for _, headers in server.requests], [None, None])
+
+
+class GitHubFetcherTreeTests(TestCase):
+    FILES = {
+        "README.md": b"# readme",
+        "src/app.py": b"print('app')",
+        "src/pkg/util.py": b"def util(): pass",
+        "src/pkg/data.json": b"{}",
+        "src/huge.py": b"x" * 5000,
+        "docs/conf.py": b"project = 'x'",
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fetch_tree_filters_by_glob_and_size(self):
+        with StubGitHubServer(self.FILES) as server:
+            fetcher = GitHubFetcher(api_url=server.url, max_bytes=1000)
+            report = fetcher.fetch_tree("octocat/Hello-World", ["src/**/*.py"], branch="main")
+
+        self.assertEqual(report.files, {"src/app.py": "print('app')", "src/pkg/util.py": "def util(): pass"})
+        self.assertEqual(report.skipped, ["src/huge.py"])
+        self.assertEqual(report.errors, {})
+        self.assertEqual(len(server.requests), 4)  # commit + tree + 2 blobs
+
+    def test_fetch_tree_extension_filter_and_cached_blobs(self):
+        cache = GitHubCache(os.path.join(self.tmp.name, "cache"))
+        with StubGitHubServer(self.FILES) as server:
+            fetcher = GitHubFetcher(api_url=server.url, cache=cache)
+            first = fetcher.fetch_tree("octocat/Hello-World", ["**"], extensions=[".md", "json"])
+            second = fetcher.fetch_tree("octocat/Hello-World", ["**"], extensions=[".md", "json"])
+
+        self.assertEqual(set(first.files), {"README.md", "src/pkg/data.json"})
+        self.assertEqual(first.files, second.files)
+        blob_requests = [path for path, _ in server.requests if "/git/blobs/" in path]
+        self.assertEqual(len(blob_requests), 2)
+
+    def test_glob_semantics(self):
+        from core.github_client import _compile_glob
+
+        self.assertTrue(_compile_glob("src/**/*.py").match("src/a.py"))
+        self.assertTrue(_compile_glob("src/**/*.py").match("src/a/b/c.py"))
+        self.assertFalse(_compile_glob("src/*.py").match("src/a/b.py"))
+        self.assertFalse(_compile_glob("*.py").match("src/a.py"))
+        self.assertTrue(_compile_glob("**").match("any/path.txt"))
+
+
+class GitHubFetcherArchiveTests(TestCase):
+    FILES = {
+        "README.md": b"# readme",
+        "src/app.py": b"print('app')",
+        "src/pkg/util.py": b"def util(): pass",
+        "src/huge.py": b"x" * 5000,
+    }
+
+    def test_fetch_archive_streams_matching_members(self):
+        extras = [("../escape.py", b"evil"), ("src/../../up.py", b"evil")]
+        with StubGitHubServer(self.FILES, tar_extras=extras) as server:
+            fetcher = GitHubFetcher(token="secret", api_url=server.url, max_bytes=1000)
+            report = fetcher.fetch_archive("octocat/Hello-World", ["**/*.py"], branch="main")
+
+        self.assertEqual(report.files, {"src/app.py": "print('app')", "src/pkg/util.py": "def util(): pass"})
+        self.assertEqual(report.skipped, ["src/huge.py"])
+        paths = [path for path, _ in server.requests]
+        self.assertEqual(paths, ["/repos/octocat/Hello-World/tarball/main", "/codeload/octocat/Hello-World/tar.gz/main"])
+
+    def test_fetch_archive_drops_token_on_cross_origin_redirect(self):
+        with StubGitHubServer(self.FILES) as codeload, StubGitHubServer(self.FILES) as server:
+            server.codeload_url = codeload.url
+            fetcher = GitHubFetcher(token="secret", api_url=server.url, max_bytes=1000)
+            report = fetcher.fetch_archive("octocat/Hello-World", ["**/*.py"], branch="main")
+
+        self.assertIn("src/app.py", report.files)
+        self.assertEqual([headers.get("Authorization") for _, headers in server.requests], ["Bearer secret"])
+        self.assertEqual([path for path, _ in codeload.requests], ["/codeload/octocat/Hello-World/tar.gz/main"])
+        self.assertIsNone(codeload.requests[0][1].get("Authorization"))
+
+    def test_fetch_archive_extension_filter(self):
+        with StubGitHubServer(self.FILES) as server:
+            report = GitHubFetcher(api_url=server.url).fetch_archive("octocat/Hello-World", extensions=["md"])
+        self.assertEqual(report.files, {"README.md": "# readme"})
+
+    def test_fetch_archive_rejects_corrupt_archive(self):
+        with StubGitHubServer(self.FILES) as server:
+            fetcher = GitHubFetcher(api_url=server.url)
+            with mock.patch.object(StubGitHubServer, "tarball", return_value=b"not a tarball"):
+                with self.assertRaises(GitHubFetchError):
+                    fetcher.fetch_archive("octocat/Hello-World")
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class GitHubFetcherRetryTests(TestCase):
+    FILES = {"a.py": b"a = 1", "b.py": b"b = 2"}
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = RateLimitScheduler(clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_transient_errors_retried_with_backoff(self):
+        with StubGitHubServer(self.FILES) as server:
+            server.faults = [(502, {}, b"bad gateway"), (503, {}, b"busy")]
+            fetcher = GitHubFetcher(api_url=server.url, max_workers=1, scheduler=self.scheduler)
+            self.assertEqual(fetcher.fetch_files("octocat/Hello-World", ["a.py"]), {"a.py": "a = 1"})
+
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(len(self.clock.sleeps), 2)
+        self.assertTrue(0.25 <= self.clock.sleeps[0] <= 0.5)
+        self.assertTrue(0.5 <= self.clock.sleeps[1] <= 1.0)
+
+    def test_retry_after_and_exhausted_retries(self):
+        with StubGitHubServer(self.FILES) as server:
+            server.faults = [(429, {"Retry-After": "7"}, b"")]
+            fetcher = GitHubFetcher(api_url=server.url, max_workers=1, max_retries=2, scheduler=self.scheduler)
+            self.assertEqual(fetcher.fetch_files("octocat/Hello-World", ["a.py"]), {"a.py": "a = 1"})
+            self.assertEqual(self.clock.sleeps, [7.0])
+
+            server.faults = [(500, {}, b"")] * 3
+            with self.assertRaisesRegex(GitHubFetchError, "HTTP 500"):
+                fetcher.fetch_files("octocat/Hello-World", ["b.py"])
+
+    def test_primary_rate_limit_waits_for_reset_or_fails_fast(self):
+        with StubGitHubServer(self.FILES) as server:
+            reset = int(self.clock.now) + 30
+            server.extra_headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}
+            fetcher = GitHubFetcher(api_url=server.url, max_workers=1, scheduler=self.scheduler)
+            fetcher.fetch_files("octocat/Hello-World", ["a.py"])
+            fetcher.fetch_files("octocat/Hello-World", ["b.py"])
+            self.assertEqual(self.clock.now, reset)
+
+            server.extra_headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset + 3600)}
+            fetcher.fetch_files("octocat/Hello-World", ["a.py"])
+            requests_before = len(server.requests)
+            report = fetcher.fetch_report("octocat/Hello-World", ["a.py", "b.py"])
+
+        self.assertEqual(len(server.requests), requests_before)
+        self.assertIn("rate limit exhausted", report.errors["a.py"])
+
+    def test_scheduler_paces_requests_when_budget_is_low(self):
+        self.scheduler.observe({"X-RateLimit-Remaining": "4", "X-RateLimit-Reset": str(self.clock.now + 40)})
+        for _ in range(3):
+            self.scheduler.acquire()
+        self.assertEqual(self.clock.sleeps, [10.0, 10.0])
+
+
+class FakeConnection:
+    def __init__(self, error):
+        self.error = error
+        self.sock = None
+        self.closed = False
+
+    def request(self, method, target, headers=None):
+        pass
+
+    def getresponse(self):
+        raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    KEY = ("https", "api.github.com", 443, "")
+
+    def test_failed_retry_closes_the_fresh_connection(self):
+        pool = _ConnectionPool(proxies={})
+        stale = FakeConnection(http.client.RemoteDisconnected("closed by peer"))
+        fresh = FakeConnection(ConnectionResetError("reset"))
+        pool.release(self.KEY, stale)
+        request = GitHubFetcher()._api_request("/repos/octocat/Hello-World")
+
+        with mock.patch.object(_ConnectionPool, "_connect", return_value=fresh):
+            with self.assertRaises(ConnectionResetError):
+                pool.open(request, timeout=1)
+
+        self.assertTrue(stale.closed)
+        self.assertTrue(fresh.closed)
+        self.assertEqual(pool._idle[self.KEY], [])
+
+    def test_plain_http_goes_through_the_environment_proxy(self):
+        with StubGitHubServer({"a.py": b"a = 1"}) as server:
+            proxy = server.url.replace("http://", "http://user:s%40cret@")
+            with mock.patch.dict(os.environ, {"http_proxy": proxy, "HTTP_PROXY": proxy, "no_proxy": "", "NO_PROXY": ""}):
+                fetcher = GitHubFetcher(api_url="http://api.github.invalid")
+            self.assertEqual(fetcher.fetch_files("octocat/Hello-World", ["a.py"]), {"a.py": "a = 1"})
+            fetcher.close()
+
+        target, headers = server.requests[0]
+        self.assertTrue(target.startswith("http://api.github.invalid/repos/octocat/Hello-World/contents/a.py"))
+        self.assertEqual(headers["Proxy-Authorization"], "Basic " + base64.b64encode(b"user:s@cret").decode())
+
+    def test_https_is_tunnelled_unless_bypassed(self):
+        pool = _ConnectionPool(proxies={"https": "http://user:pw@proxy.local:3128", "no": "ghe.internal"})
+        self.assertEqual(pool._proxy_for("https", "ghe.internal"), "")
+
+        proxy = pool._proxy_for("https", "api.github.com")
+        connection = pool._connect(("https", "api.github.com", 443, proxy), timeout=5)
+        self.assertIsInstance(connection, http.client.HTTPSConnection)
+        self.assertEqual((connection.host, connection.port), ("proxy.local", 3128))
+        self.assertEqual((connection._tunnel_host, connection._tunnel_port), ("api.github.com", 443))
+        self.assertIn("Proxy-Authorization", connection._tunnel_headers)
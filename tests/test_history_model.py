@@ -0,0 +1,44 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from core.database import DatabaseManager
+from ui.history_model import message_pager, session_pager, session_row
+
+
+class HistoryPagingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "history.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_session_pager_walks_all_sessions_once(self):
+        ids = [self.db.create_session(f"s{i}") for i in range(23)]
+        pager = session_pager(self.db, page_size=10)
+
+        first = pager.next_page()
+        self.assertEqual([row["id"] for row in first], ids[::-1][:10])
+        rest = pager.next_page() + pager.next_page()
+        self.assertFalse(pager.has_more)
+        self.assertEqual(pager.next_page(), [])
+        self.assertEqual([row["id"] for row in first + rest], ids[::-1])
+
+        pager.reset()
+        self.assertEqual(pager.next_page(), first)
+
+    def test_message_pager_goes_newest_page_first(self):
+        session_id = self.db.create_session("chat")
+        for i in range(7):
+            self.db.add_message(session_id, "user" if i % 2 == 0 else "assistant", f"m{i}")
+        pager = message_pager(self.db, session_id, page_size=3)
+
+        pages = [[row["content"] for row in pager.next_page()] for _ in range(3)]
+        self.assertEqual(pages, [["m4", "m5", "m6"], ["m1", "m2", "m3"], ["m0"]])
+        self.assertFalse(pager.has_more)
+
+    def test_session_row_uses_cached_metadata(self):
+        row = session_row({"id": 4, "title": "", "message_count": 12, "last_activity": "2024-05-01 12:34:56"})
+        self.assertEqual(row, {"session_id": 4, "title": "Nowa Sesja", "secondary_text": "12 wiad. · 2024-05-01 12:34"})
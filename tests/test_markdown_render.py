@@ -0,0 +1,76 @@
+import random
+from unittest import TestCase, mock
+
+from ui import markdown_render
+from ui.chat_model import ChatTranscript
+from ui.markdown_render import StreamRenderer, escape, render_cache, render_markdown
+
+MESSAGE = (
+    "# Plan\n"
+    "Use **bold**, *italic* and `x[0]` here.\n\n"
+    "- first\n"
+    "- second\n\n"
+    "```python\n"
+    "def f(items):\n"
+    "    return items[0]  # first\n"
+    "```\n"
+    "Done.\n"
+)
+
+
+class MarkdownRenderTests(TestCase):
+    def setUp(self) -> None:
+        render_cache.clear()
+
+    def test_renders_subset_and_escapes_markup(self):
+        markup = render_markdown(MESSAGE)
+
+        self.assertIn("[b][size=22sp]Plan[/size][/b]", markup)
+        self.assertIn("[b]bold[/b]", markup)
+        self.assertIn("[i]italic[/i]", markup)
+        self.assertIn("x&bl;0&br;", markup)
+        self.assertIn("• first", markup)
+        self.assertIn("[color=#c678dd]def[/color] f(items):", markup)
+        self.assertIn("[color=#7f848e]# first[/color]", markup)
+        self.assertNotIn("```", markup)
+        self.assertEqual(escape("[b]&"), "&bl;b&br;&amp;")
+
+    def test_streamed_chunks_match_full_render(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            renderer = StreamRenderer()
+            position = 0
+            while position < len(MESSAGE):
+                size = rng.randint(1, 9)
+                renderer.feed(MESSAGE[position:position + size])
+                position += size
+            self.assertEqual(renderer.finish(), render_markdown(MESSAGE))
+
+    def test_finished_blocks_are_rendered_once(self):
+        renderer = StreamRenderer()
+        renderer.feed("intro paragraph\n\n```python\nx = 1\n```\n")
+        with mock.patch.object(markdown_render, "render_text", wraps=markdown_render.render_text) as text, \
+                mock.patch.object(markdown_render, "render_code", wraps=markdown_render.render_code) as code:
+            for word in ["tail ", "grows ", "here"]:
+                renderer.feed(word)
+        self.assertEqual(code.call_count, 0)
+        self.assertEqual([call.args[0] for call in text.call_args_list], ["tail ", "tail grows ", "tail grows here"])
+
+        render_markdown("intro paragraph\n\n")
+        self.assertGreaterEqual(render_cache.info()["hits"], 1)
+
+    def test_transcript_renders_streamed_messages(self):
+        transcript = ChatTranscript(render=StreamRenderer)
+        index = transcript.append("**Hi** [")
+        transcript.append_text(index, "there]")
+        raw = transcript.append("[color=#00ff00]ok[/color]", formatted=True)
+
+        self.assertEqual(transcript[index].text, "[b]Hi[/b] &bl;there&br;")
+        self.assertEqual(transcript.row(index, 400)["source"], "**Hi** [there]")
+        self.assertEqual(transcript[raw].text, "[color=#00ff00]ok[/color]")
+
+        transcript.finish(index)
+        self.assertIsNone(transcript[index].renderer)
+        transcript.append_text(index, "!")
+        self.assertEqual(transcript[index].source, "**Hi** [there]!")
+        self.assertTrue(transcript[index].text.endswith("&br;!"))
@@ -0,0 +1,70 @@
+import queue
+from unittest import TestCase
+
+from ui.update_pump import UpdatePump
+
+
+class FakeClock:
+    def __init__(self, step: float = 0.0) -> None:
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+def _queue(*items):
+    source = queue.Queue()
+    for item in items:
+        source.put(item)
+    return source
+
+
+class UpdatePumpTests(TestCase):
+    def test_chunks_are_joined_into_one_assignment_per_tick(self):
+        texts = []
+        source = _queue(*[("MSG_CHUNK", f"{i} ") for i in range(500)])
+        pump = UpdatePump(source, on_text=texts.append, clock=FakeClock())
+
+        self.assertTrue(pump.tick())
+        self.assertEqual(texts, ["".join(f"{i} " for i in range(500))])
+        self.assertTrue(pump.tick())
+        self.assertEqual(len(texts), 1)
+
+    def test_budget_leaves_the_rest_for_the_next_frame(self):
+        texts = []
+        source = _queue(*[("MSG_CHUNK", "x") for _ in range(10)])
+        pump = UpdatePump(source, on_text=texts.append, budget=0.004, clock=FakeClock(step=0.001))
+
+        pump.tick()
+        self.assertEqual(texts, ["xxxx"])
+        pump.tick()
+        self.assertEqual(texts, ["xxxx", "xxxx"])
+        self.assertEqual(source.qsize(), 2)
+
+    def test_order_is_kept_around_errors_and_done_stops_the_pump(self):
+        events = []
+        source = _queue(
+            ("MSG_CHUNK", "a"),
+            ("MSG_CHUNK", "b"),
+            ("S", "boom"),
+            ("AGENTE_SPRECHEN", "c"),
+            ("END", True),
+            ("MSG_CHUNK", "late"),
+        )
+        pump = UpdatePump(
+            source,
+            on_text=lambda text: events.append(("text", text)),
+            on_error=lambda message: events.append(("error", message)),
+            on_done=lambda: events.append(("done", None)),
+            chunk_types=("MSG_CHUNK", "AGENTE_SPRECHEN"),
+            error_types=("ERROR", "S"),
+            done_types=("DONE", "END"),
+            clock=FakeClock(),
+        )
+
+        self.assertFalse(pump.tick())
+        self.assertEqual(events, [("text", "ab"), ("error", "boom"), ("text", "c"), ("done", None)])
+        self.assertFalse(pump.tick())
+        self.assertEqual(source.qsize(), 1)
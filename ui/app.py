@@ -6,18 +6,19 @@ from kivy.properties import StringProperty, BooleanProperty, NumericProperty
 from kivy.clock import Clock
 from kivymd.app import MDApp
 from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.list import OneLineListItem
-from kivymd.toast import toast
 
 from src.config import CFG
+from ui.deferred import Deferred, after_first_frame, warm_imports
+from ui.history_model import message_pager, session_pager
+
+# Mock Database (zachowane z poprzedniej fazy) - prawdziwa baza ładuje się w tle, patrz _load_backend
+class _OfflineDatabase:
+    def get_sessions(self): return []
+    def get_sessions_page(self, before=None, page_size=50): return []
+    def get_session(self, x): return None
+    def get_messages_before(self, x, before_id=None, page_size=50): return []
+    def delete_session(self, x): pass
 
-# Mock Database & Logger imports (zachowane z poprzedniej fazy)
-try:
-    from core.database import DatabaseManager
-except ImportError:
-    class DatabaseManager:
-        def get_sessions(self): return []
-        def delete_session(self, x): pass
 try:
     from core.logger import KivyLogHandler
 except ImportError:
@@ -67,34 +68,82 @@ class DebugDruidApp(MDApp):
         except: pass
         
         if KivyLogHandler: logging.getLogger().addHandler(KivyLogHandler(self))
-        self.db = DatabaseManager()
-        
-        # Lazy Load Engine
-        logging.info("Booting Neural Engine...")
-        try:
-            from src.engine import SystemBrain
-            self.brain = SystemBrain()
-        except Exception as e:
-            logging.critical(f"Engine Failure: {e}")
-            self.brain = None
+        # Baza i silnik startują w tle po pierwszej klatce; do tego czasu pusta baza offline
+        self.db = _OfflineDatabase()
+        self.brain = None
+        self.backend = Deferred(
+            _load_backend,
+            on_ready=lambda result: Clock.schedule_once(self._on_backend_ready),
+            name="backend-loader",
+        )
         
         kv_path = resource_path(os.path.join("ui", "layout.kv"))
         Builder.load_file(kv_path)
         return MainLayout()
 
     def on_start(self):
-        # Clean start
-        pass
+        after_first_frame(self._warm_up)
+
+    def _warm_up(self):
+        self.backend.start()
+        warm_imports(("kivymd.toast",))
+
+    def _on_backend_ready(self, dt):
+        db, brain = self.backend.value or (None, None)
+        if db is not None: self.db = db
+        self.brain = brain
+        # Lista sesji dopiero z prawdziwą bazą - tylko pierwsza strona, bez dotykania messages
+        self.refresh_sessions_list()
 
     # --- Actions ---
     def start_new_chat(self):
         self.root.ids.chat_screen.clear_view()
         self.current_session_title = "Nowa Sesja"
+        self.current_session_id = -1
         if self.brain and self.brain.chat_session:
             self.brain.chat_session.history = []
 
-    def refresh_sessions_list(self): pass 
+    def refresh_sessions_list(self):
+        self.root.ids.session_list.open(session_pager(self.db))
+
+    def load_session(self, session_id):
+        meta = self.db.get_session(session_id)
+        if meta is None:
+            self.refresh_sessions_list()
+            return
+        self.current_session_id = session_id
+        self.current_session_title = meta["title"] or "Nowa Sesja"
+        # Wiadomości dopiero przy otwarciu: ostatnia strona, starsze przy przewijaniu w górę
+        self.root.ids.chat_screen.open_history(message_pager(self.db, session_id))
+
+    def delete_session(self, session_id):
+        self.db.delete_session(session_id)
+        if session_id == self.current_session_id:
+            self.start_new_chat()
+        self.refresh_sessions_list()
+
     def append_log(self, msg): self.logs_text += msg + "\n"
-    def update_api_key(self, text): toast("Access Denied: ENV Variables Only")
-    def fetch_github_files(self): toast("Module Offline")
-    def refresh_model_discovery(self): toast("Model Locked")
\ No newline at end of file
+    def update_api_key(self, text): _toast("Access Denied: ENV Variables Only")
+    def fetch_github_files(self): _toast("Module Offline")
+    def refresh_model_discovery(self): _toast("Model Locked")
+
+def _toast(text):
+    from kivymd.toast import toast
+    toast(text)
+
+def _load_backend():
+    # Wątek w tle: sqlite + migracje i silnik (SDK Gemini) nie blokują pierwszej klatki
+    try:
+        from core.database import DatabaseManager
+        db = DatabaseManager()
+    except Exception as e:
+        logging.error(f"Database Offline: {e}")
+        db = None
+    logging.info("Booting Neural Engine...")
+    try:
+        from src.engine import SystemBrain
+        brain = SystemBrain()
+    except Exception as e:
+        logging.critical(f"Engine Failure: {e}")
+        brain = None
+    return db, brain
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""Kivy-free data model behind the virtualized chat list.
+
+The chat views keep every message here as plain data and hand the
+RecycleView one row dict per message. Only the rows on screen get a widget;
+the rest are laid out from the ``height`` stored in their row, which comes
+from the per-message measurement cache or, before the first measurement,
+from a cheap text-based estimate.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass, field
+
+_MARKUP_TAG = re.compile(r"\[/?[a-z_]+(?:=[^\]]*)?\]")
+
+CHAR_WIDTH = 8.0
+LINE_HEIGHT = 20.0
+ROW_PADDING = 30.0
+
+
+def estimate_height(
+    text: str,
+    width: float,
+    char_width: float = CHAR_WIDTH,
+    line_height: float = LINE_HEIGHT,
+    padding: float = ROW_PADDING,
+    inset: float | None = None,
+) -> float:
+    """Rough row height for ``text`` wrapped at ``width`` pixels.
+
+    ``padding`` is the row's height besides the text lines and ``inset`` the
+    width the text does not get (``padding`` when not given). Used only until
+    the row is shown once and reports its real height, so it only has to
+    keep the scrollbar roughly right for unseen messages.
+    """
+
+    usable = max(width - (padding if inset is None else inset), char_width)
+    per_line = max(1, int(usable // char_width))
+    plain = _MARKUP_TAG.sub("", text)
+    lines = sum(max(1, math.ceil(len(line) / per_line)) for line in plain.split("\n"))
+    return padding + lines * line_height
+
+
+@dataclass(eq=False)
+class ChatMessage:
+    """One chat entry; ``attrs`` are extra view properties such as colours.
+
+    ``text`` is what the view shows. For rendered messages ``source`` keeps
+    the raw text and ``renderer`` the stream renderer while the message grows.
+    """
+
+    text: str
+    is_user: bool = False
+    attrs: dict = field(default_factory=dict)
+    heights: dict[int, float] = field(default_factory=dict, repr=False)
+    source: str | None = None
+    renderer: object = field(default=None, repr=False)
+
+    def set_text(self, text: str) -> None:
+        if text != self.text:
+            self.text = text
+            self.heights.clear()
+
+
+class ChatTranscript:
+    """Ordered messages plus the row dicts the RecycleView renders from."""
+
+    def __init__(self, estimate=estimate_height, render=None) -> None:
+        self.messages: list[ChatMessage] = []
+        # ``estimate(text, width)`` sizes rows that were not measured yet
+        self.estimate = estimate
+        # Factory of stream renderers (``feed(chunk) -> markup``, ``finish()``); None shows raw text
+        self.render = render
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __getitem__(self, index: int) -> ChatMessage:
+        return self.messages[index]
+
+    def append(self, text: str, is_user: bool = False, formatted: bool = False, **attrs) -> int:
+        """Add a message that may still grow; ``formatted`` text is shown as given."""
+
+        self.messages.append(self._message(text, is_user, attrs, formatted=formatted))
+        return len(self.messages) - 1
+
+    def _message(self, text: str, is_user: bool, attrs: dict, formatted: bool = False, complete: bool = False) -> ChatMessage:
+        if self.render is None or formatted:
+            return ChatMessage(text, is_user, attrs)
+        renderer = self.render()
+        shown = renderer.feed(text)
+        if complete:
+            shown, renderer = renderer.finish(), None
+        return ChatMessage(shown, is_user, attrs, source=text, renderer=renderer)
+
+    def extend(self, items) -> range:
+        """Append ``(text, is_user)`` pairs; returns the range of their indices."""
+
+        start = len(self.messages)
+        self.messages.extend(self._message(text, is_user, {}, complete=True) for text, is_user in items)
+        return range(start, len(self.messages))
+
+    def prepend(self, items) -> int:
+        """Insert ``(text, is_user)`` pairs before the first message; returns how many.
+
+        Every existing index shifts by the returned count.
+        """
+
+        messages = [self._message(text, is_user, {}, complete=True) for text, is_user in items]
+        self.messages[:0] = messages
+        return len(messages)
+
+    def set_text(self, index: int, text: str) -> None:
+        message = self.messages[index]
+        if message.source is None:
+            message.set_text(text)
+            return
+        message.renderer = self.render()
+        message.source = text
+        message.set_text(message.renderer.feed(text))
+
+    def append_text(self, index: int, text: str) -> None:
+        message = self.messages[index]
+        if message.source is None:
+            message.set_text(message.text + text)
+            return
+        if message.renderer is None:
+            message.renderer = self.render()
+            message.renderer.feed(message.source)
+        message.source += text
+        # Only the open block is re-rendered; finished blocks come from the renderer's prefix
+        message.set_text(message.renderer.feed(text))
+
+    def finish(self, index: int) -> None:
+        """Mark a streamed message complete so its last block is rendered and cached as final."""
+
+        message = self.messages[index]
+        if message.renderer is not None:
+            message.set_text(message.renderer.finish())
+            message.renderer = None
+
+    def clear(self) -> None:
+        self.messages.clear()
+
+    def remember_height(self, index: int, width: float, height: float) -> bool:
+        """Store a measured height; returns ``True`` when it changed."""
+
+        if not 0 <= index < len(self.messages) or height <= 0:
+            return False
+        heights = self.messages[index].heights
+        key = int(width)
+        if heights.get(key) == height:
+            return False
+        heights[key] = height
+        return True
+
+    def height(self, index: int, width: float) -> float:
+        message = self.messages[index]
+        cached = message.heights.get(int(width))
+        if cached is not None:
+            return cached
+        return self.estimate(message.text, width)
+
+    def row(self, index: int, width: float) -> dict:
+        message = self.messages[index]
+        return {
+            **message.attrs,
+            "text": message.text,
+            "is_user": message.is_user,
+            "source": message.text if message.source is None else message.source,
+            "index": index,
+            "height": self.height(index, width),
+        }
+
+    def rows(self, width: float) -> list[dict]:
+        return [self.row(index, width) for index in range(len(self.messages))]
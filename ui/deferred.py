@@ -0,0 +1,103 @@
+"""Cold-start helpers: paint the window first, load heavy backends afterwards.
+
+The Gemini SDK, ``backend`` and the SQLite layer are imported on a daemon thread
+by :class:`Deferred`; widget modules that are not needed for the first frame are
+imported one per frame on the main thread by :func:`warm_imports`. Kivy itself is
+only imported inside the scheduling helpers, so the loader stays testable without it.
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+
+class Deferred:
+    """Build a value on a background thread; callers block only when they need it.
+
+    ``factory`` runs at most once, started by :meth:`start` or by the first :meth:`get`.
+    A failing factory leaves ``error`` set and yields ``None``. ``on_ready`` is called on
+    the loader thread with the value (or ``None``), so UI code should hop back to the
+    main thread from there, e.g. via ``Clock.schedule_once``.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        on_ready: Optional[Callable[[Any], None]] = None,
+        name: str = "deferred",
+    ) -> None:
+        self.factory = factory
+        self.on_ready = on_ready
+        self.name = name
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> "Deferred":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the value, waiting up to ``timeout`` seconds; ``None`` if not ready or failed."""
+        self.start()
+        if not self._done.wait(timeout):
+            return None
+        return self.value
+
+    def _run(self) -> None:
+        try:
+            self.value = self.factory()
+        except Exception as exc:  # surfaced through ``error``; the UI keeps running
+            self.error = exc
+        try:
+            if self.on_ready is not None:
+                self.on_ready(self.value)
+        finally:
+            self._done.set()
+
+
+def import_modules(names: Iterable[str]) -> list[str]:
+    """Import ``names`` in order and return the ones that failed to import."""
+    failed = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            failed.append(name)
+    return failed
+
+
+def after_first_frame(callback: Callable[[], None]) -> None:
+    """Call ``callback`` on the main thread once the first frame has been flipped."""
+    from kivy.core.window import Window
+
+    def _once(*args):
+        Window.unbind(on_flip=_once)
+        callback()
+
+    Window.bind(on_flip=_once)
+
+
+def warm_imports(names: Iterable[str]) -> None:
+    """Import widget modules on the main thread, one per frame, so no frame stalls on all of them."""
+    from kivy.clock import Clock
+
+    pending = list(names)
+
+    def _step(dt):
+        if pending:
+            import_modules([pending.pop(0)])
+            Clock.schedule_once(_step)
+
+    Clock.schedule_once(_step)
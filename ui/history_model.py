@@ -0,0 +1,69 @@
+"""Kivy-free paging for the session browser and for reopening a session.
+
+Both lists are read with keyset pagination: the cursor for the next page is
+taken from the edge row of the previous one, so every page costs the same
+however long the history is. Only the first page is read when a list opens.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+SESSION_PAGE_SIZE = 50
+MESSAGE_PAGE_SIZE = 50
+
+
+class KeysetPager:
+    """Pulls pages from ``fetch(cursor, page_size)`` until a short page comes back."""
+
+    def __init__(self, fetch: Callable[[object, int], list], cursor_of: Callable[[list], object], page_size: int) -> None:
+        self.fetch = fetch
+        self.cursor_of = cursor_of
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self) -> None:
+        self.cursor = None
+        self.has_more = True
+        self.loaded = 0
+
+    def next_page(self) -> list:
+        if not self.has_more:
+            return []
+        page = self.fetch(self.cursor, self.page_size)
+        self.has_more = len(page) == self.page_size
+        if page:
+            self.cursor = self.cursor_of(page)
+            self.loaded += len(page)
+        return page
+
+
+def session_pager(db, page_size: int = SESSION_PAGE_SIZE) -> KeysetPager:
+    """Sessions by most recent activity, read from ``DatabaseManager.get_sessions_page``."""
+
+    return KeysetPager(
+        db.get_sessions_page,
+        lambda page: (page[-1]["last_activity"], page[-1]["id"]),
+        page_size,
+    )
+
+
+def message_pager(db, session_id: int, page_size: int = MESSAGE_PAGE_SIZE) -> KeysetPager:
+    """A session's messages newest page first; each page is in chronological order."""
+
+    return KeysetPager(
+        lambda before_id, size: db.get_messages_before(session_id, before_id, size),
+        lambda page: page[0]["id"],
+        page_size,
+    )
+
+
+def session_row(meta: dict) -> dict:
+    """RecycleView row for one ``get_sessions_page`` entry."""
+
+    count = meta.get("message_count") or 0
+    activity = (meta.get("last_activity") or "")[:16]
+    return {
+        "session_id": meta["id"],
+        "title": meta.get("title") or "Nowa Sesja",
+        "secondary_text": f"{count} wiad. · {activity}" if activity else f"{count} wiad.",
+    }
@@ -0,0 +1,345 @@
+"""Incremental Markdown-to-Kivy-markup renderer for streamed chat answers.
+
+A streamed answer is split into blocks: fenced code blocks, and text blocks
+that end at a blank line. Once a block is finished its markup never changes,
+so it is rendered once, kept in :data:`render_cache` under a hash of its
+source, and appended to the already-rendered prefix. Each new chunk only
+re-renders the block that is still open. The cost of an update therefore
+follows the chunk and the open block, not the whole message.
+
+Only a small Markdown subset is handled: headings, bullet lists, quotes,
+``**bold**``, ``*italic*``, inline code, and fenced code with keyword
+highlighting. Everything else is shown as escaped text.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Mapping
+
+from core.architect import detect_language
+
+RENDER_CACHE_SIZE = 512
+CODE_FONT = "RobotoMono-Regular"
+HEADING_SIZES = ("22sp", "19sp", "17sp", "16sp", "15sp", "15sp")
+COLORS: Mapping[str, str] = {
+    "keyword": "#c678dd",
+    "string": "#98c379",
+    "comment": "#7f848e",
+    "number": "#d19a66",
+    "inline_code": "#e5c07b",
+    "info": "#7f848e",
+    "quote": "#9e9e9e",
+}
+
+_FENCE_OPEN = re.compile(r"[ ]{0,3}(`{3,}|~{3,})[ \t]*([^\n`]*)\n")
+_FENCE_LINE = re.compile(r"^[ ]{0,3}(?:`{3,}|~{3,})", re.MULTILINE)
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+_HEADING = re.compile(r"(#{1,6})\s+(.*)")
+_BULLET = re.compile(r"(\s*)[-*+]\s+(.*)")
+_ORDERED = re.compile(r"(\s*\d+[.)])\s+(.*)")
+_QUOTE = re.compile(r">\s?(.*)")
+_INLINE_CODE = re.compile(r"`([^`\n]+)`")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__")
+_ITALIC = re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])")
+
+_LANGUAGE_ALIASES: Mapping[str, str] = {
+    "py": "Python", "python": "Python", "python3": "Python",
+    "js": "JavaScript", "javascript": "JavaScript", "jsx": "JavaScript", "node": "JavaScript",
+    "ts": "TypeScript", "typescript": "TypeScript", "tsx": "TypeScript",
+    "sh": "Shell", "bash": "Shell", "shell": "Shell", "zsh": "Shell", "console": "Shell",
+    "sql": "SQL", "go": "Go", "golang": "Go", "rs": "Rust", "rust": "Rust", "java": "Java",
+    "c": "C++", "h": "C++", "cpp": "C++", "c++": "C++", "cs": "C#", "csharp": "C#",
+    "php": "PHP", "rb": "Ruby", "ruby": "Ruby", "json": "JSON", "yaml": "YAML", "yml": "YAML",
+}
+_COMMENTS: Mapping[str, tuple[str, ...]] = {
+    "Python": ("#",), "Shell": ("#",), "Ruby": ("#",), "YAML": ("#",), "SQL": ("--",),
+    "JavaScript": ("//",), "TypeScript": ("//",), "Go": ("//",), "Rust": ("//",),
+    "Java": ("//",), "C++": ("//",), "C#": ("//",), "PHP": ("//", "#"),
+}
+_KEYWORDS: Mapping[str, frozenset[str]] = {
+    "Python": frozenset(
+        "and as assert async await break class continue def del elif else except finally for from global if "
+        "import in is lambda nonlocal not or pass raise return try while with yield None True False self".split()
+    ),
+    "JavaScript": frozenset(
+        "async await break case catch class const continue default delete do else export extends finally for "
+        "function if import in instanceof let new return switch this throw try typeof var void while yield "
+        "null undefined true false".split()
+    ),
+    "Shell": frozenset("if then else elif fi for while do done case esac function in return export local echo".split()),
+    "SQL": frozenset(
+        "select from where insert into values update set delete create table index join left right inner on "
+        "group by order limit and or not null as distinct having union primary key".split()
+    ),
+    "Go": frozenset(
+        "break case chan const continue default defer else fallthrough for func go goto if import interface "
+        "map package range return select struct switch type var nil true false".split()
+    ),
+    "Rust": frozenset(
+        "as async await break const continue crate else enum extern false fn for if impl in let loop match mod "
+        "move mut pub ref return self Self static struct super trait true type unsafe use where while".split()
+    ),
+    "Java": frozenset(
+        "abstract boolean break case catch class continue default do double else enum extends final finally "
+        "float for if implements import instanceof int interface long new null package private protected "
+        "public return static super switch this throw throws try void while true false".split()
+    ),
+    "Ruby": frozenset("def end class module if elsif else unless while until do yield return nil true false self require".split()),
+    "PHP": frozenset("function class public private protected return if else foreach as echo new namespace use null true false".split()),
+    "JSON": frozenset("true false null".split()),
+}
+_KEYWORDS = {
+    **_KEYWORDS,
+    "TypeScript": _KEYWORDS["JavaScript"] | frozenset("interface type enum implements readonly private public".split()),
+    "C++": _KEYWORDS["Java"] | frozenset("auto const namespace std template typename using struct".split()),
+    "C#": _KEYWORDS["Java"] | frozenset("namespace using var async await string object".split()),
+}
+_CASE_INSENSITIVE = frozenset({"SQL"})
+_TOKEN_PATTERNS: dict[tuple[str, ...], re.Pattern[str]] = {}
+_UNSET = object()
+
+
+def escape(text: str) -> str:
+    """Escape text for a Kivy label with ``markup: True``."""
+
+    return text.replace("&", "&amp;").replace("[", "&bl;").replace("]", "&br;")
+
+
+def _token_pattern(comments: tuple[str, ...]) -> re.Pattern[str]:
+    pattern = _TOKEN_PATTERNS.get(comments)
+    if pattern is None:
+        parts = [rf"(?P<comment>(?:{'|'.join(re.escape(marker) for marker in comments)})[^\n]*)"] if comments else []
+        parts += [
+            r"""(?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?)""",
+            r"(?P<number>\b\d+(?:\.\d+)?\b)",
+            r"(?P<word>\b[A-Za-z_]\w*\b)",
+        ]
+        pattern = _TOKEN_PATTERNS[comments] = re.compile("|".join(parts))
+    return pattern
+
+
+def highlight(code: str, language: str | None) -> str:
+    """Escaped ``code`` with comments, strings, numbers and keywords coloured."""
+
+    keywords = _KEYWORDS.get(language or "", frozenset())
+    fold = language in _CASE_INSENSITIVE
+    out: list[str] = []
+    last = 0
+    for match in _token_pattern(_COMMENTS.get(language or "", ())).finditer(code):
+        kind = match.lastgroup
+        token = match.group()
+        if kind == "word" and (token.lower() if fold else token) not in keywords:
+            continue
+        out.append(escape(code[last:match.start()]))
+        out.append(f"[color={COLORS['keyword' if kind == 'word' else kind]}]{escape(token)}[/color]")
+        last = match.end()
+    out.append(escape(code[last:]))
+    return "".join(out)
+
+
+def language_for(info: str, code: str) -> str | None:
+    """Language from the fence info string, else detected from the code itself."""
+
+    word = info.split()[0].lower() if info.strip() else ""
+    if word:
+        return _LANGUAGE_ALIASES.get(word)
+    detected = detect_language(code).language
+    return detected if detected in _KEYWORDS else None
+
+
+def render_inline(text: str) -> str:
+    out: list[str] = []
+    last = 0
+    for match in _INLINE_CODE.finditer(text):
+        out.append(_emphasis(escape(text[last:match.start()])))
+        out.append(f"[font={CODE_FONT}][color={COLORS['inline_code']}]{escape(match.group(1))}[/color][/font]")
+        last = match.end()
+    out.append(_emphasis(escape(text[last:])))
+    return "".join(out)
+
+
+def _emphasis(text: str) -> str:
+    text = _BOLD.sub(lambda m: f"[b]{m.group(1) or m.group(2)}[/b]", text)
+    return _ITALIC.sub(lambda m: f"[i]{m.group(1)}[/i]", text)
+
+
+def render_text(block: str) -> str:
+    lines = []
+    for line in block.split("\n"):
+        if match := _HEADING.fullmatch(line):
+            size = HEADING_SIZES[len(match.group(1)) - 1]
+            lines.append(f"[b][size={size}]{render_inline(match.group(2))}[/size][/b]")
+        elif match := _BULLET.fullmatch(line):
+            lines.append(f"{match.group(1)}• {render_inline(match.group(2))}")
+        elif match := _ORDERED.fullmatch(line):
+            lines.append(f"{match.group(1)} {render_inline(match.group(2))}")
+        elif match := _QUOTE.fullmatch(line):
+            lines.append(f"[color={COLORS['quote']}]│ {render_inline(match.group(1))}[/color]")
+        else:
+            lines.append(render_inline(line))
+    return "\n".join(lines)
+
+
+def render_code(info: str, code: str, language: str | None = None) -> str:
+    if language is None:
+        language = language_for(info, code)
+    return _wrap_code(info, highlight(code.rstrip("\n"), language))
+
+
+def _wrap_code(info: str, body: str) -> str:
+    header = f"[size=12sp][color={COLORS['info']}]{escape(info.strip())}[/color][/size]\n" if info.strip() else ""
+    return f"{header}[font={CODE_FONT}]{body}[/font]"
+
+
+class RenderCache:
+    """Bounded LRU of rendered blocks keyed by ``(len, hash)`` of their source."""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[int, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[int, int]) -> str | None:
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return markup
+
+    def put(self, key: tuple[int, int], markup: str) -> None:
+        with self._lock:
+            self._entries[key] = markup
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def info(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_entries": self.max_entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+render_cache = RenderCache()
+
+
+def render_block(source: str) -> str:
+    """Markup for one finished block, served from :data:`render_cache` when seen before."""
+
+    key = (len(source), hash(source))
+    markup = render_cache.get(key)
+    if markup is None:
+        fence = _FENCE_OPEN.match(source)
+        if fence:
+            body = source[fence.end():]
+            close = list(_FENCE_LINE.finditer(body))
+            code = body[:close[-1].start()] if close else body
+            markup = render_code(fence.group(2), code)
+        else:
+            markup = render_text(source.rstrip("\n"))
+        markup += "\n" * (len(source) - len(source.rstrip("\n")))
+        render_cache.put(key, markup)
+    return markup
+
+
+class StreamRenderer:
+    """Turns a growing Markdown answer into markup, re-rendering only its open block."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._done = ""
+        self._open = ""
+        self._reset_open()
+
+    def _reset_open(self) -> None:
+        self._scan_from = 0
+        self._open_language: str | None = None
+        # Highlighting is line-local, so whole lines of an open code block are highlighted once
+        self._code_language: object = _UNSET
+        self._code_markup = ""
+        self._code_upto = 0
+
+    def feed(self, chunk: str) -> str:
+        """Add ``chunk`` and return the markup of everything received so far."""
+
+        self._open += chunk
+        self._close_blocks()
+        return self._done + self._render_open()
+
+    def finish(self) -> str:
+        """Treat the open block as finished (cached) and return the final markup."""
+
+        if self._open:
+            self._done += render_block(self._open)
+            self._open = ""
+        self._reset_open()
+        return self._done
+
+    def _close_blocks(self) -> None:
+        while True:
+            end = self._block_end()
+            if end is None:
+                return
+            self._done += render_block(self._open[:end])
+            self._open = self._open[end:]
+            self._reset_open()
+
+    def _block_end(self) -> int | None:
+        # Only whole lines can finish a block; scanning resumes at the last unfinished line
+        start = self._scan_from
+        complete = self._open.rfind("\n") + 1
+        self._scan_from = complete
+        fence = _FENCE_OPEN.match(self._open)
+        if fence:
+            marker = fence.group(1)
+            close = re.compile(rf"^[ ]{{0,3}}{re.escape(marker[0])}{{{len(marker)},}}[ \t]*\n", re.MULTILINE)
+            match = close.search(self._open, max(start, fence.end()), complete)
+            return match.end() if match else None
+        blank = _BLANK_LINE.search(self._open, max(start - 1, 0), complete)
+        opener = _FENCE_LINE.search(self._open, max(start, 1), complete)
+        if opener and opener.start() > 0 and self._open[opener.start() - 1] == "\n":
+            if blank is None or opener.start() < blank.end():
+                return opener.start()
+        return blank.end() if blank else None
+
+    def _render_open(self) -> str:
+        if not self._open:
+            return ""
+        fence = _FENCE_OPEN.match(self._open)
+        if not fence:
+            return render_text(self._open)
+        code = self._open[fence.end():]
+        info = fence.group(2)
+        if self._open_language is None and not info.strip() and code.count("\n") >= 3:
+            # Untagged fence: detect once from the first lines and keep it while the block streams
+            self._open_language = language_for("", code) or ""
+        language = language_for(info, "") if info.strip() else (self._open_language or None)
+        if language != self._code_language:
+            self._code_language, self._code_markup, self._code_upto = language, "", 0
+        complete = code.rfind("\n") + 1
+        if complete > self._code_upto:
+            self._code_markup += highlight(code[self._code_upto:complete], language)
+            self._code_upto = complete
+        body = self._code_markup + highlight(code[complete:], language)
+        return _wrap_code(info, body.rstrip("\n"))
+
+
+def render_markdown(text: str) -> str:
+    """Markup for a complete message; its blocks go through :data:`render_cache`."""
+
+    renderer = StreamRenderer()
+    renderer.feed(text)
+    return renderer.finish()
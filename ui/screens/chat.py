@@ -2,11 +2,12 @@ import time
 import threading
 import queue
 from kivy.core.window import Window
-from kivy.clock import Clock, mainthread
+from kivy.clock import Clock
 from kivy.properties import BooleanProperty, StringProperty, NumericProperty
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.app import MDApp
-from ui.widgets.bubble import ChatBubble
+from ui.update_pump import UpdatePump
+from ui.widgets.bubble import ChatBubble  # rejestruje viewclass dla ChatListView
 from ui.widgets.file_item import FileItem # Upewnij się że masz ten plik, jeśli nie - usuń ten import
 
 class ChatScreenLogic(MDBoxLayout):
@@ -14,7 +15,9 @@ class ChatScreenLogic(MDBoxLayout):
     status_message = StringProperty("SYSTEM IDLE")
     response_time = StringProperty("0.00s")
     start_timestamp = 0
-    current_streaming_bubble = None
+    current_streaming_index = None
+    pump_event = None
+    history_pager = None
     loaded_files = []
 
     def on_kv_post(self, base_widget):
@@ -22,6 +25,8 @@ class ChatScreenLogic(MDBoxLayout):
         Window.bind(on_key_down=self._on_keyboard_down)
         # Drag & Drop Support
         Window.bind(on_drop_file=self._on_file_drop)
+        # Starsze strony historii doczytywane przy dojechaniu do góry
+        self.ids.chat_list.bind(on_scroll_top=self._load_older)
 
     def _on_keyboard_down(self, instance, keyboard, keycode, text, modifiers):
         # keycode[1] to nazwa klawisza np. 'enter'
@@ -36,7 +41,8 @@ class ChatScreenLogic(MDBoxLayout):
 
     def send_message(self):
         text = self.ids.message_input.text.strip()
-        if not text: return
+        # Jedna odpowiedź naraz - dymek strumienia i chat_session są wspólne
+        if not text or self.is_processing: return
         
         self.ids.message_input.text = ""
         self.add_bubble(text, is_user=True)
@@ -46,49 +52,61 @@ class ChatScreenLogic(MDBoxLayout):
         self.status_message = "NEURAL PROCESSING..."
         
         app = MDApp.get_running_app()
-        if hasattr(app, 'brain') and app.brain:
-            self.response_queue = queue.Queue()
-            threading.Thread(
-                target=app.brain.worker_gemini_generator,
-                args=(text, self.response_queue),
-                daemon=True
-            ).start()
-            Clock.schedule_interval(self._consume_queue, 0.05)
-        else:
-            self.add_bubble("CRITICAL: Brain Disconnected", is_user=False)
-            self.stop_timer()
-
-    def _consume_queue(self, dt):
-        try:
-            while not self.response_queue.empty():
-                msg_type, content = self.response_queue.get_nowait()
-                
-                if msg_type == "MSG_CHUNK":
-                    self._update_streaming_bubble(content)
-                elif msg_type == "ERROR":
-                    self.add_bubble(f"ERROR: {content}", is_user=False)
-                elif msg_type == "DONE":
-                    self.stop_timer()
-                    self.status_message = "RESPONSE COMPLETE"
-                    self.current_streaming_bubble = None
-                    return False 
-        except: pass
-        return True
-
-    @mainthread
+        self.response_queue = queue.Queue()
+        threading.Thread(
+            target=_brain_worker,
+            args=(app, text, self.response_queue),
+            daemon=True
+        ).start()
+        # Pompa co klatkę: drenaż kolejki w budżecie czasu, jedno przypisanie tekstu na klatkę
+        self.pump = UpdatePump(
+            self.response_queue,
+            on_text=self._update_streaming_bubble,
+            on_error=lambda content: self.add_bubble(f"ERROR: {content}", is_user=False),
+            on_done=self._on_stream_done,
+        )
+        if self.pump_event is not None:
+            self.pump_event.cancel()
+        self.pump_event = Clock.schedule_interval(self.pump.tick, 0)
+
+    def _on_stream_done(self):
+        self.stop_timer()
+        self.status_message = "RESPONSE COMPLETE"
+        if self.current_streaming_index is not None:
+            self.ids.chat_list.finish_message(self.current_streaming_index)
+        self.current_streaming_index = None
+        self.pump_event = None
+        self.ids.chat_list.flush_stale()
+
     def _update_streaming_bubble(self, chunk):
-        if not self.current_streaming_bubble:
-            self.current_streaming_bubble = self.add_bubble("", is_user=False)
-        self.current_streaming_bubble.text += chunk
+        if self.current_streaming_index is None:
+            self.current_streaming_index = self.add_bubble(chunk, is_user=False)
+        else:
+            self.ids.chat_list.append_text(self.current_streaming_index, chunk)
 
     def add_bubble(self, text, is_user):
-        bubble = ChatBubble(text=text, is_user=is_user)
-        self.ids.chat_list.add_widget(bubble)
-        self.ids.scroll_view.scroll_to(bubble)
-        return bubble
+        # Zwraca indeks wiersza w modelu listy, nie widget (widgety są recyklingowane)
+        return self.ids.chat_list.add_message(text, is_user=is_user)
 
     def clear_view(self):
-        self.ids.chat_list.clear_widgets()
+        self.current_streaming_index = None
+        self.history_pager = None
+        self.ids.chat_list.clear()
+
+    # --- Historia sesji (najnowsza strona najpierw) ---
+    def open_history(self, pager):
+        self.clear_view()
+        self.history_pager = pager
+        self.ids.chat_list.extend_messages(_as_items(pager.next_page()))
+        self.ids.chat_list.scroll_to_end()
+
+    def _load_older(self, chat_list):
+        pager = self.history_pager
+        if pager is None or not pager.has_more:
+            return
+        shift = chat_list.prepend_messages(_as_items(pager.next_page()))
+        if self.current_streaming_index is not None:
+            self.current_streaming_index += shift
 
     # --- Timer Logic ---
     def start_timer(self):
@@ -102,4 +120,17 @@ class ChatScreenLogic(MDBoxLayout):
 
     def update_timer(self, dt):
         delta = time.time() - self.start_timestamp
-        self.response_time = f"{delta:.2f}s"
\ No newline at end of file
+        self.response_time = f"{delta:.2f}s"
+
+def _brain_worker(app, text, out_queue):
+    # Silnik ładuje się w tle po starcie - pierwsza wiadomość czeka na niego tutaj, nie w wątku UI
+    loader = getattr(app, 'backend', None)
+    brain = (loader.get() or (None, None))[1] if loader is not None else getattr(app, 'brain', None)
+    if not brain:
+        out_queue.put(("ERROR", "CRITICAL: Brain Disconnected"))
+        out_queue.put(("DONE", None))
+        return
+    brain.worker_gemini_generator(text, out_queue)
+
+def _as_items(rows):
+    return [(row["content"], row["role"] == "user") for row in rows]
@@ -0,0 +1,84 @@
+"""Frame-budgeted pump that moves streamed chunks from a queue to the UI.
+
+Worker threads put ``("MSG_CHUNK", text)`` / ``("ERROR", msg)`` /
+``("DONE", None)`` tuples on a queue. The UI schedules :meth:`UpdatePump.tick`
+once per frame. Each tick drains as much as fits in the time budget and joins
+all pending chunks, so the label gets one text assignment (one re-layout) per
+frame no matter how many chunks arrived. The module does not import Kivy, so
+the pump can be tested without a window.
+"""
+from __future__ import annotations
+
+import queue
+import time
+from typing import Callable, Iterable
+
+FRAME_BUDGET = 0.004  # s; a 60 fps frame is ~16.7 ms and layout/render need the rest
+CHUNK_TYPES = ("MSG_CHUNK",)
+ERROR_TYPES = ("ERROR",)
+DONE_TYPES = ("DONE",)
+
+
+class UpdatePump:
+    """Drains ``source`` within ``budget`` seconds per tick, joining chunks into one ``on_text`` call.
+
+    ``on_error`` and ``on_done`` are called in queue order; pending text is
+    flushed before them so an error never overtakes the text streamed before it.
+    ``tick`` returns ``False`` after ``DONE``, so it can be passed straight to
+    ``Clock.schedule_interval``.
+    """
+
+    def __init__(
+        self,
+        source: queue.Queue,
+        on_text: Callable[[str], None],
+        on_error: Callable[[str], None] | None = None,
+        on_done: Callable[[], None] | None = None,
+        budget: float = FRAME_BUDGET,
+        chunk_types: Iterable[str] = CHUNK_TYPES,
+        error_types: Iterable[str] = ERROR_TYPES,
+        done_types: Iterable[str] = DONE_TYPES,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.source = source
+        self.on_text = on_text
+        self.on_error = on_error
+        self.on_done = on_done
+        self.budget = budget
+        self.chunk_types = frozenset(chunk_types)
+        self.error_types = frozenset(error_types)
+        self.done_types = frozenset(done_types)
+        self.clock = clock
+        self.finished = False
+
+    def tick(self, dt: float | None = None) -> bool:
+        if self.finished:
+            return False
+        deadline = self.clock() + self.budget
+        chunks: list[str] = []
+        while True:
+            try:
+                kind, payload = self.source.get_nowait()
+            except queue.Empty:
+                break
+            if kind in self.chunk_types:
+                chunks.append(payload)
+            elif kind in self.error_types:
+                self._flush(chunks)
+                if self.on_error:
+                    self.on_error(payload)
+            elif kind in self.done_types:
+                self._flush(chunks)
+                self.finished = True
+                if self.on_done:
+                    self.on_done()
+                return False
+            if self.clock() >= deadline:
+                break
+        self._flush(chunks)
+        return True
+
+    def _flush(self, chunks: list[str]) -> None:
+        if chunks:
+            self.on_text("".join(chunks))
+            chunks.clear()
@@ -2,11 +2,12 @@ from kivymd.uix.boxlayout import MDBoxLayout
 from kivy.properties import StringProperty, BooleanProperty
 from kivy.core.clipboard import Clipboard
 from kivymd.toast import toast
+from ui.widgets.chat_list import RecycledRow
 
-class ChatBubble(MDBoxLayout):
+class ChatBubble(RecycledRow, MDBoxLayout):
     text = StringProperty("")
     is_user = BooleanProperty(True)
     
     def copy_content(self):
-        Clipboard.copy(self.text)
+        Clipboard.copy(self.source or self.text)
         toast("Skopiowano")
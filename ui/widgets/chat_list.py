@@ -0,0 +1,190 @@
+from functools import partial
+
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.metrics import dp
+from kivy.properties import BooleanProperty, DictProperty, ListProperty, NumericProperty, StringProperty
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+from ui.chat_model import ChatTranscript, estimate_height
+from ui.markdown_render import StreamRenderer
+
+# Wirtualizowana lista czatu: widgety powstają tylko dla widocznych wierszy,
+# reszta jest układana z wysokości zapisanych w danych (pomiar albo szacunek).
+Builder.load_string('''
+<ChatListView>:
+    effect_cls: "ScrollEffect"
+    do_scroll_x: False
+    bar_width: dp(6)
+
+    RecycleBoxLayout:
+        orientation: 'vertical'
+        default_size: None, dp(56)
+        default_size_hint: 1, None
+        size_hint_y: None
+        height: self.minimum_height
+        spacing: root.row_spacing
+        padding: root.row_padding
+''')
+
+
+class RecycledRow(RecycleDataViewBehavior):
+    """Domieszka dla widoków wiersza: zgłasza zmierzoną wysokość do listy."""
+    index = NumericProperty(-1)
+    source = StringProperty("")  # surowy tekst (np. do kopiowania), gdy text to wyrenderowany markup
+    _list = None
+
+    def __init__(self, **kwargs):
+        # Trigger przed super(): reguły KV mogą ruszyć height już w __init__
+        self._sync_trigger = Clock.create_trigger(self._sync_height)
+        super().__init__(**kwargs)
+        self.bind(height=self._sync_trigger)
+
+    def natural_height(self):
+        return self.minimum_height
+
+    def refresh_view_attrs(self, rv, index, data):
+        self._list = rv
+        return super().refresh_view_attrs(rv, index, data)
+
+    def refresh_view_layout(self, rv, index, layout, viewport):
+        # Layout wymusza wysokość z danych (szacunek) - po nim wracamy do prawdziwej
+        super().refresh_view_layout(rv, index, layout, viewport)
+        self._sync_trigger()
+
+    def _sync_height(self, *args):
+        height = self.natural_height()
+        if height <= 0 or self._list is None or self.index < 0:
+            return
+        if height != self.height:
+            self.height = height
+        self._list.remember_height(self.index, height)
+
+
+class ChatListView(RecycleView):
+    __events__ = ("on_scroll_top",)
+    row_spacing = NumericProperty(dp(15))
+    row_padding = ListProperty([dp(20), dp(20), dp(20), dp(20)])
+    auto_scroll = BooleanProperty(True)
+    markdown = BooleanProperty(False)
+    # Argumenty estimate_height dla wierszy jeszcze niezmierzonych (marginesy dymka, czcionka)
+    row_metrics = DictProperty({})
+
+    def __init__(self, **kwargs):
+        self.transcript = ChatTranscript()
+        super().__init__(**kwargs)
+        self._stale = set()
+        self._at_top = True
+        self._rebuild_trigger = Clock.create_trigger(self._rebuild)
+        self._flush_trigger = Clock.create_trigger(self.flush_stale)
+        self.bind(width=self._rebuild_trigger, scroll_y=self._on_scroll)
+
+    def on_markdown(self, instance, value):
+        # Markdown -> markup przyrostowo: przy każdym chunku renderowany jest tylko otwarty blok
+        self.transcript.render = StreamRenderer if value else None
+
+    def on_row_metrics(self, instance, value):
+        # Szacunek blisko prawdziwej wysokości = mniej przeliczeń layoutu po pierwszym pomiarze
+        self.transcript.estimate = partial(estimate_height, **value)
+        self._rebuild_trigger()
+
+    def add_message(self, text, is_user=False, formatted=False, **attrs):
+        index = self.transcript.append(text, is_user, formatted=formatted, **attrs)
+        self.data.append(self.transcript.row(index, self.width))
+        if self.auto_scroll:
+            self.scroll_to_end()
+        return index
+
+    def extend_messages(self, items):
+        # Cała strona historii jednym przypisaniem do data
+        indices = self.transcript.extend(items)
+        self.data.extend(self.transcript.row(index, self.width) for index in indices)
+        return indices
+
+    def prepend_messages(self, items):
+        """Wstawia starsze wiadomości na górę, zachowując widoczny fragment; zwraca przesunięcie indeksów."""
+        count = self.transcript.prepend(items)
+        if not count:
+            return 0
+        distance = self.scroll_y * max(self.viewport_size[1] - self.height, 0)
+        self._stale = {index + count for index in self._stale}
+        self.data = self.transcript.rows(self.width)
+        Clock.schedule_once(lambda dt: self._restore_distance(distance))
+        return count
+
+    def on_scroll_top(self):
+        pass
+
+    def append_text(self, index, text):
+        self.transcript.append_text(index, text)
+        self._refresh_row(index)
+
+    def set_text(self, index, text):
+        self.transcript.set_text(index, text)
+        self._refresh_row(index)
+
+    def finish_message(self, index):
+        self.transcript.finish(index)
+        self._refresh_row(index)
+
+    def remember_height(self, index, height):
+        # Zapis w miejscu, bez dispatchu: layout i tak bierze rozmiar z widoku,
+        # a dane muszą go znać, gdy wiersz wypadnie z ekranu
+        if self.transcript.remember_height(index, self.width, height) and index < len(self.data):
+            self.data[index]["height"] = height
+
+    def clear(self):
+        self.transcript.clear()
+        self._stale.clear()
+        self.data = []
+
+    def is_row_visible(self, index):
+        manager = self.layout_manager
+        if manager is None:
+            return True
+        if index in manager.view_indices.values():
+            return True
+        # Świeżo dodany ostatni wiersz nie ma jeszcze widoku, a przy śledzeniu końca zaraz go dostanie
+        return index == len(self.data) - 1 and self.is_at_end()
+
+    def flush_stale(self, *args):
+        stale, self._stale = self._stale, set()
+        for index in sorted(stale):
+            if index < len(self.data):
+                self.data[index] = self.transcript.row(index, self.width)
+
+    def is_at_end(self):
+        return self.scroll_y <= 0.01 or self.viewport_size[1] <= self.height
+
+    def scroll_to_end(self, *args):
+        Clock.schedule_once(lambda dt: setattr(self, "scroll_y", 0))
+
+    def _on_scroll(self, instance, value):
+        self._flush_trigger()
+        # Zdarzenie tylko przy dojechaniu do góry, nie przy każdym ruchu na górze
+        at_top = value >= 0.99
+        if at_top and not self._at_top and self.data:
+            self.dispatch("on_scroll_top")
+        self._at_top = at_top
+
+    def _restore_distance(self, distance):
+        # Dopisanie na górze nie zmienia odległości od dołu - trzymamy ją po przeliczeniu layoutu
+        scrollable = self.viewport_size[1] - self.height
+        if scrollable > 0:
+            self.scroll_y = min(1.0, distance / scrollable)
+
+    def _refresh_row(self, index):
+        if not self.is_row_visible(index):
+            # Poza ekranem zmieniamy tylko model - bez re-layoutu; dane dogonią przy przewinięciu
+            self._stale.add(index)
+            return
+        follow = self.auto_scroll and self.is_at_end()
+        self.data[index] = self.transcript.row(index, self.width)
+        if follow:
+            self.scroll_to_end()
+
+    def _rebuild(self, *args):
+        # Nowa szerokość = inne zawijanie; wysokości z cache dla tej szerokości albo szacunek
+        self._stale.clear()
+        self.data = self.transcript.rows(self.width)
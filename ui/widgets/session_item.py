@@ -1,6 +1,7 @@
-from kivymd.uix.list import OneLineAvatarIconListItem
+from kivymd.uix.list import TwoLineAvatarIconListItem
 from kivy.properties import StringProperty, NumericProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 
-class SessionItem(OneLineAvatarIconListItem):
+class SessionItem(RecycleDataViewBehavior, TwoLineAvatarIconListItem):
     session_id = NumericProperty(0)
     title = StringProperty("")
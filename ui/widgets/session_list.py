@@ -0,0 +1,43 @@
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.uix.recycleview import RecycleView
+
+from ui.history_model import session_row
+
+# Lista sesji: RecycleView + stronicowanie po kluczu; kolejna strona dopiero przy dojechaniu do dołu
+Builder.load_string('''
+<SessionListView>:
+    viewclass: 'SessionItem'
+    effect_cls: "ScrollEffect"
+    do_scroll_x: False
+
+    RecycleBoxLayout:
+        orientation: 'vertical'
+        default_size: None, dp(72)
+        default_size_hint: 1, None
+        size_hint_y: None
+        height: self.minimum_height
+''')
+
+
+class SessionListView(RecycleView):
+    pager = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._more_trigger = Clock.create_trigger(self.load_more)
+        self.bind(scroll_y=self._on_scroll)
+
+    def open(self, pager):
+        self.pager = pager
+        pager.reset()
+        self.data = [session_row(meta) for meta in pager.next_page()]
+        self.scroll_y = 1
+
+    def load_more(self, *args):
+        if self.pager is not None and self.pager.has_more:
+            self.data.extend(session_row(meta) for meta in self.pager.next_page())
+
+    def _on_scroll(self, instance, value):
+        if value <= 0.05:
+            self._more_trigger()